@@ -0,0 +1,342 @@
+import asyncio
+import inspect
+import os
+import subprocess
+import sys
+import timeit
+from functools import wraps
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    ParamSpec,
+    TypeVar,
+    TypeVarTuple,
+    get_type_hints,
+)
+
+from task1.solution import (
+    _BASE_TYPES_BITS,
+    STRICT_MODE_ENVIRONMENT_VARIABLE,
+    _get_types_mask,
+    allowed_types,
+    set_strict_mode,
+    strict,
+    strict_class,
+    strict_map,
+)
+
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+NUMBER = 200_000
+
+
+def _bind_based_strict(
+    func: Callable[P, R], skip_first_argument: bool = False
+) -> Callable[P, R]:
+    # Per-call work of the original `inspect.Signature.bind` based wrapper
+    func_singature = inspect.signature(func)
+    func_type_hints = get_type_hints(func)
+
+    @wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        bound_arguments = func_singature.bind(*args, **kwargs)
+        bound_arguments.apply_defaults()
+        for argument_name, argument_value in tuple(bound_arguments.arguments.items())[
+            skip_first_argument:
+        ]:
+            if not isinstance(argument_value, func_type_hints[argument_name]):
+                raise TypeError(argument_name)
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def _ns_per_call(call: Callable[[], Any], number: int = NUMBER) -> float:
+    return min(timeit.repeat(call, number=number, repeat=5)) / number * 1e9
+
+
+def _print_results(title: str, results: dict[str, float]) -> None:
+    print(title)
+    for name, ns_per_call in results.items():
+        print(f"    {name:<32}{ns_per_call:>10.1f} ns/call")
+
+
+def _sum_three(a: int, b: int, c: float) -> float:
+    return a + b + c
+
+
+def benchmark_compiled_signature() -> None:
+    bind_based = _bind_based_strict(_sum_three)
+    compiled = strict(_sum_three)
+    generated = strict(_sum_three, codegen=True)
+    _print_results(
+        "Compiled signature and generated wrapper vs `inspect.Signature.bind` wrapper",
+        {
+            "undecorated": _ns_per_call(lambda: _sum_three(1, 2, 3.0)),
+            "bind-based, positional": _ns_per_call(lambda: bind_based(1, 2, 3.0)),
+            "compiled, positional": _ns_per_call(lambda: compiled(1, 2, 3.0)),
+            "bind-based, keyword": _ns_per_call(lambda: bind_based(1, b=2, c=3.0)),
+            "compiled, keyword": _ns_per_call(lambda: compiled(1, b=2, c=3.0)),
+            "codegen, positional": _ns_per_call(lambda: generated(1, 2, 3.0)),
+            "codegen, keyword": _ns_per_call(lambda: generated(1, b=2, c=3.0)),
+        },
+    )
+
+
+T = TypeVar("T")
+C = TypeVar("C", bool, int, float, str)
+Ts = TypeVarTuple("Ts")
+
+
+def _type_var_heavy(a: T, b: T, c: C, d: C, *args: *Ts) -> None:
+    pass
+
+
+def benchmark_types_resolution() -> None:
+    allowed_types_mask = _get_types_mask(allowed_types)
+    base_types_bits_get = _BASE_TYPES_BITS.get
+    results = {}
+    for value in (True, 1.25, "spam", [1]):
+        value_type = type(value)
+        results[f"tuple scan, {value_type.__name__}"] = _ns_per_call(
+            lambda: value_type in allowed_types
+        )
+        results[f"mask lookup, {value_type.__name__}"] = _ns_per_call(
+            lambda: base_types_bits_get(value_type, 0) & allowed_types_mask
+        )
+        results[f"scan, then mask, {value_type.__name__}"] = _ns_per_call(
+            lambda: value_type in allowed_types
+            or base_types_bits_get(value_type, 0) & allowed_types_mask
+        )
+    _print_results("Membership of a value type in `allowed_types`", results)
+
+    compiled = strict(_type_var_heavy)
+    generated = strict(_type_var_heavy, codegen=True)
+    args = ("a", "b", 1.25, 2.5, True, 1, 1.25, "spam")
+    _print_results(
+        "TypeVar-heavy signature",
+        {
+            "undecorated": _ns_per_call(lambda: _type_var_heavy(*args)),
+            "compiled": _ns_per_call(lambda: compiled(*args)),
+            "codegen": _ns_per_call(lambda: generated(*args)),
+        },
+    )
+
+
+def benchmark_strict_modes() -> None:
+    compiled = strict(_sum_three)
+    generated = strict(_sum_three, codegen=True)
+    results = {"undecorated": _ns_per_call(lambda: _sum_three(1, 2, 3.0))}
+    for mode in ("full", "sample", "off"):
+        set_strict_mode(mode)
+        results[f"{mode}, compiled"] = _ns_per_call(lambda: compiled(1, 2, 3.0))
+        results[f"{mode}, codegen"] = _ns_per_call(lambda: generated(1, 2, 3.0))
+    set_strict_mode("full")
+
+    # The environment is read on import, so this runs in a fresh interpreter
+    disabled_benchmark = subprocess.run(
+        (
+            sys.executable,
+            "-c",
+            "from task1.benchmark_for_task1 import _ns_per_call, _sum_three\n"
+            "from task1.solution import strict\n"
+            "disabled = strict(_sum_three)\n"
+            "print(_ns_per_call(lambda: disabled(1, 2, 3.0)))",
+        ),
+        cwd=Path(__file__).parent.parent,
+        env={**os.environ, STRICT_MODE_ENVIRONMENT_VARIABLE: "off"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    results["off in the environment"] = float(disabled_benchmark.stdout)
+    _print_results("Strict modes", results)
+
+
+def _scale(a: int, b: T, c: T) -> int:
+    return a
+
+
+def benchmark_batch_validation() -> None:
+    rows_count = 100_000
+    columns = (
+        list(range(rows_count)),
+        [float(i) for i in range(rows_count)],
+        [i / 2 for i in range(rows_count)],
+    )
+    compiled = strict(_scale)
+    generated = strict(_scale, codegen=True)
+    results = {}
+    for name, call in (
+        ("undecorated, loop", lambda: list(map(_scale, *columns))),
+        ("compiled, loop", lambda: list(map(compiled, *columns))),
+        ("codegen, loop", lambda: list(map(generated, *columns))),
+        ("compiled, strict_map", lambda: strict_map(compiled, *columns)),
+    ):
+        results[name] = _ns_per_call(call, number=5) / rows_count
+    _print_results(f"Batch of {rows_count} rows, per row", results)
+
+
+def benchmark_stats() -> None:
+    results = {"undecorated": _ns_per_call(lambda: _sum_three(1, 2, 3.0))}
+    for codegen in (False, True):
+        wrapper_name = "codegen" if codegen else "compiled"
+        for stats in (False, True):
+            decorated = strict(_sum_three, codegen=codegen, stats=stats)
+            results[f"{wrapper_name}, stats {'on' if stats else 'off'}"] = _ns_per_call(
+                lambda: decorated(1, 2, 3.0)
+            )
+    _print_results("Validation statistics", results)
+
+
+class _Point:
+    __slots__ = ("x", "y")
+
+    def __init__(self, x: float, y: float) -> None:
+        self.x = x
+        self.y = y
+
+    def move(self, dx: float, dy: float) -> None:
+        self.x += dx
+        self.y += dy
+
+
+def benchmark_methods() -> None:
+    class BindBasedPoint(_Point):
+        __slots__ = ()
+        move = _bind_based_strict(_Point.move, skip_first_argument=True)
+
+    class SkipFirstArgumentPoint(_Point):
+        __slots__ = ()
+        move = strict(_Point.move, skip_first_argument=True)
+
+    @strict_class
+    class StrictPoint(_Point):
+        __slots__ = ()
+        move = _Point.move
+
+    @strict_class(codegen=True)
+    class GeneratedStrictPoint(_Point):
+        __slots__ = ()
+        move = _Point.move
+
+    results = {}
+    for name, point in (
+        ("undecorated", _Point(0.0, 0.0)),
+        ("bind-based, skip_first_argument", BindBasedPoint(0.0, 0.0)),
+        ("compiled, skip_first_argument", SkipFirstArgumentPoint(0.0, 0.0)),
+        ("strict_class", StrictPoint(0.0, 0.0)),
+        ("strict_class, codegen", GeneratedStrictPoint(0.0, 0.0)),
+    ):
+        results[name] = _ns_per_call(lambda: point.move(1.0, 1.0))
+    _print_results("Method of a `__slots__` class", results)
+
+
+async def _handler(request_id: int, path: str) -> int:
+    return request_id
+
+
+def benchmark_coroutine_function() -> None:
+    calls_count = 100_000
+
+    async def call_in_loop(handler: Callable[[int, str], Any]) -> None:
+        for request_id in range(calls_count):
+            await handler(request_id, "/")
+
+    results = {}
+    for name, handler in (
+        ("undecorated", _handler),
+        ("compiled", strict(_handler)),
+        ("codegen", strict(_handler, codegen=True)),
+    ):
+        results[name] = (
+            min(
+                timeit.repeat(
+                    lambda: asyncio.run(call_in_loop(handler)), number=1, repeat=5
+                )
+            )
+            / calls_count
+            * 1e9
+        )
+    _print_results("Asyncio handler awaited in a loop", results)
+
+
+def _pick(a: T, b: T, first: bool) -> T:
+    return a if first else b
+
+
+def benchmark_check_return() -> None:
+    results = {"undecorated": _ns_per_call(lambda: _pick(1, 2, True))}
+    for codegen in (False, True):
+        wrapper_name = "codegen" if codegen else "compiled"
+        for check_return in (False, True):
+            decorated = strict(_pick, codegen=codegen, check_return=check_return)
+            results[
+                f"{wrapper_name}, check_return {'on' if check_return else 'off'}"
+            ] = _ns_per_call(lambda: decorated(1, 2, True))
+    _print_results("Return value validation", results)
+
+
+def _generate_module_source(decorator: str, functions_count: int) -> str:
+    lines = [
+        "from typing import TypeVar",
+        "from task1.solution import strict",
+        'T = TypeVar("T")',
+    ]
+    for i in range(functions_count):
+        lines.extend(
+            (
+                decorator,
+                f"def function_{i}(a: int, b: str, c: T, d: T, e: float) -> int:",
+                "    return a",
+            )
+        )
+    return "\n".join(lines)
+
+
+def benchmark_import_time() -> None:
+    # The generated module is compiled beforehand, so only executing its body,
+    # i.e. creating and decorating the functions, is measured
+    functions_count = 3000
+    results = {}
+    for name, decorator in (
+        ("undecorated", ""),
+        ("eager", "@strict"),
+        ("eager, codegen", "@strict(codegen=True)"),
+        ("lazy", "@strict(lazy=True)"),
+        ("lazy, codegen", "@strict(codegen=True, lazy=True)"),
+    ):
+        module_code = compile(
+            _generate_module_source(decorator, functions_count),
+            "<strict import benchmark>",
+            "exec",
+        )
+        results[name] = (
+            min(
+                timeit.repeat(
+                    lambda: exec(module_code, {"__name__": "strict_import_benchmark"}),
+                    number=1,
+                    repeat=3,
+                )
+            )
+            / functions_count
+            * 1e9
+        )
+    _print_results(
+        f"Import of a module with {functions_count} functions, per function", results
+    )
+
+
+if __name__ == "__main__":
+    benchmark_compiled_signature()
+    benchmark_types_resolution()
+    benchmark_strict_modes()
+    benchmark_batch_validation()
+    benchmark_stats()
+    benchmark_methods()
+    benchmark_coroutine_function()
+    benchmark_check_return()
+    benchmark_import_time()
@@ -1,15 +1,36 @@
 import inspect
+import os
+import warnings
+import weakref
 from functools import (
+    lru_cache,
     reduce,
     wraps,
 )
-from itertools import combinations
-from types import UnionType
+from itertools import (
+    combinations,
+    count,
+)
+from operator import or_
+from time import perf_counter_ns
+from types import (
+    CodeType,
+    FunctionType,
+    NoneType,
+    UnionType,
+)
 from typing import (
+    Any,
+    Awaitable,
     Callable,
+    Iterable,
+    Literal,
+    NamedTuple,
     ParamSpec,
+    Sequence,
     TypeVar,
     Unpack,
+    get_args,
     get_origin,
     get_type_hints,
     overload,
@@ -18,6 +39,7 @@ from typing import (
 
 P = ParamSpec("P")
 R = TypeVar("R")
+T = TypeVar("T")
 
 # DON'T ADD PARAMETRIZED GENERIC TYPES
 ALLOWED_TYPES_BASE = (bool, int, float, str)
@@ -28,144 +50,1343 @@ allowed_types = tuple(
     for types_group in combinations(ALLOWED_TYPES_BASE, r)
 )
 
+AllowedType = type[bool] | type[int] | type[float] | type[str] | UnionType
 
-@overload
-def strict(_func: Callable[P, R]) -> Callable[P, R]: ...
+# Constant-time type resolution: one bit per base type and one mask per allowed
+# annotation, e.g. `int | str` -> 0b1010
+_BASE_TYPES_BITS: dict[type, int] = {
+    allowed_type: 1 << i for i, allowed_type in enumerate(ALLOWED_TYPES_BASE)
+}
+_ALLOWED_TYPES_MASKS: dict[AllowedType, int] = {
+    allowed_type: reduce(
+        or_,
+        map(_BASE_TYPES_BITS.__getitem__, get_args(allowed_type) or (allowed_type,)),
+    )
+    for allowed_type in allowed_types
+}
+# Masks of the annotations `isinstance()` accepts a value of the base type for
+# (`bool` is a subclass of `int`)
+_INSTANCE_MASKS: dict[type, int] = {
+    base_type: reduce(
+        or_,
+        (
+            bit
+            for allowed_type, bit in _BASE_TYPES_BITS.items()
+            if issubclass(base_type, allowed_type)
+        ),
+    )
+    for base_type in ALLOWED_TYPES_BASE
+}
 
+# Kinds of the per-argument checks compiled by `_CompiledSignature`
+_ANNOTATED = 0
+_UNANNOTATED = 1
+_TYPE_VAR = 2
+_TYPE_VAR_REPEATED = 3
+_TYPE_VAR_TUPLE = 4
+_RETURNS_NONE = 5
 
-@overload
-def strict(
-    *, skip_first_argument: bool = False
-) -> Callable[[Callable[P, R]], Callable[P, R]]: ...
+StrictMode = Literal["off", "sample", "full"]
 
+StrictErrorHook = Callable[[Callable[..., Any], TypeError], None]
 
-def strict(
-    _func: Callable[P, R] | None = None,
-    *,
-    skip_first_argument: bool = False,
-) -> Callable[P, R] | Callable[[Callable[P, R]], Callable[P, R]]:
-    def decorator(func: Callable[P, R]) -> Callable[P, R]:
-        func_singature = inspect.signature(func)
-        func_type_hints = get_type_hints(func)
-        type_vars = []
-        type_var_tuple_arg = None
-        for argument_name, argument_type in func_type_hints.items():
-            if argument_name == "return":
+STRICT_MODE_ENVIRONMENT_VARIABLE = "STRICT_MODE"
+STRICT_SAMPLE_RATE_ENVIRONMENT_VARIABLE = "STRICT_SAMPLE_RATE"
+STRICT_STATS_ENVIRONMENT_VARIABLE = "STRICT_STATS"
+DEFAULT_STRICT_SAMPLE_RATE = 100
+
+_POSITIONAL_KINDS = (
+    inspect.Parameter.POSITIONAL_ONLY,
+    inspect.Parameter.POSITIONAL_OR_KEYWORD,
+)
+
+
+class _ArgumentCheck(NamedTuple):
+    position: int
+    name: str
+    kind: int
+    # Annotation for `_ANNOTATED`, allowed types for `_TYPE_VAR`
+    expected: Any
+    # Bits of the allowed base types, see `_ALLOWED_TYPES_MASKS`
+    mask: int = 0
+    # First argument annotated with the same TypeVar (`_TYPE_VAR_REPEATED` only)
+    first_index: int = -1
+    first_name: str = ""
+
+
+# Process-wide mode shared by all `strict` wrappers: `check_every` is 1 for "full",
+# N for "sample" (1 in N calls of each function is validated) and 0 for "off"
+class _StrictState:
+    __slots__ = ("check_every", "error_hook")
+
+    def __init__(self) -> None:
+        self.check_every = 1
+        self.error_hook: StrictErrorHook | None = None
+
+
+_strict_state = _StrictState()
+
+
+# Per-function statistics recorded by `strict(stats=True)`.
+# `validation_time_ns` is the time spent on validations that passed
+class StrictStats:
+    __slots__ = (
+        "calls",
+        "rejections",
+        "rejections_by_argument",
+        "validated_calls",
+        "validation_time_ns",
+    )
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.validated_calls = 0
+        self.rejections = 0
+        self.rejections_by_argument: dict[str, int] = {}
+        self.validation_time_ns = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "validated_calls": self.validated_calls,
+            "rejections": self.rejections,
+            "rejections_by_argument": dict(self.rejections_by_argument),
+            "validation_time_ns": self.validation_time_ns,
+        }
+
+
+_strict_stats_registry: weakref.WeakKeyDictionary[Callable[..., Any], StrictStats] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_strict_stats() -> dict[str, dict[str, Any]]:
+    return {
+        f"{func.__module__}.{func.__qualname__}": stats.as_dict()
+        for func, stats in list(_strict_stats_registry.items())
+    }
+
+
+def reset_strict_stats() -> None:
+    for stats in list(_strict_stats_registry.values()):
+        stats.reset()
+
+
+# The hook is called with the decorated function and the error on every rejected
+# call, so it costs nothing until a check fails
+def set_strict_error_hook(error_hook: StrictErrorHook | None) -> None:
+    _strict_state.error_hook = error_hook
+
+
+# Already decorated functions stay wrapped when the mode is "off", so each call
+# still costs the wrapper call and the mode check. Only `STRICT_MODE=off` in the
+# environment removes the overhead, see `_strict_disabled`
+def set_strict_mode(mode: StrictMode, sample_rate: int | None = None) -> None:
+    if mode == "full":
+        _strict_state.check_every = 1
+    elif mode == "off":
+        _strict_state.check_every = 0
+    elif mode == "sample":
+        if sample_rate is None:
+            sample_rate = DEFAULT_STRICT_SAMPLE_RATE
+        if sample_rate < 1:
+            raise ValueError(f"Sample rate must be positive, but found '{sample_rate}'")
+        _strict_state.check_every = sample_rate
+    else:
+        raise ValueError(
+            f"Strict mode must be one of ('off', 'sample', 'full'), "
+            f"but found '{mode}' instead"
+        )
+
+
+def get_strict_mode() -> StrictMode:
+    if _strict_state.check_every == 1:
+        return "full"
+    elif _strict_state.check_every:
+        return "sample"
+    return "off"
+
+
+def _read_strict_mode_from_environment() -> tuple[StrictMode, int]:
+    mode = os.environ.get(STRICT_MODE_ENVIRONMENT_VARIABLE, "full").strip().lower()
+    if mode not in ("off", "sample", "full"):
+        raise ValueError(
+            f"Environment variable '{STRICT_MODE_ENVIRONMENT_VARIABLE}' "
+            f"must be one of ('off', 'sample', 'full'), but found '{mode}' instead"
+        )
+    sample_rate = DEFAULT_STRICT_SAMPLE_RATE
+    # The sample rate is read in the "sample" mode only, and a malformed one falls
+    # back to the default rather than breaking the import
+    raw_sample_rate = os.environ.get(STRICT_SAMPLE_RATE_ENVIRONMENT_VARIABLE)
+    if mode == "sample" and raw_sample_rate is not None:
+        try:
+            sample_rate = int(raw_sample_rate)
+        except ValueError:
+            sample_rate = 0
+        if sample_rate < 1:
+            warnings.warn(
+                f"Environment variable '{STRICT_SAMPLE_RATE_ENVIRONMENT_VARIABLE}' "
+                f"must be a positive integer, but found '{raw_sample_rate}' "
+                f"instead, {DEFAULT_STRICT_SAMPLE_RATE} is used",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+            sample_rate = DEFAULT_STRICT_SAMPLE_RATE
+    return mode, sample_rate  # type: ignore[return-value]
+
+
+_environment_strict_mode, _environment_sample_rate = (
+    _read_strict_mode_from_environment()
+)
+set_strict_mode(_environment_strict_mode, _environment_sample_rate)
+# "off" in the environment makes `strict` return functions undecorated, so they have
+# no overhead at all. `set_strict_mode("off")` at runtime turns the checks of
+# already decorated functions off instead
+_strict_disabled = _environment_strict_mode == "off"
+_strict_stats_by_default = os.environ.get(
+    STRICT_STATS_ENVIRONMENT_VARIABLE, ""
+).strip().lower() in ("1", "true", "on")
+
+
+def _validate_type_hints(func_type_hints: dict[str, Any]) -> None:
+    for argument_name, argument_type in func_type_hints.items():
+        if argument_name == "return":
+            continue
+        if get_origin(argument_type) is Unpack:
+            continue
+        elif isinstance(argument_type, TypeVar):
+            if (
+                argument_type.__bound__ is not None
+                and argument_type.__bound__ not in _ALLOWED_TYPES_MASKS
+            ):
+                raise TypeError(
+                    f"Bound of TypeVar argument '{argument_name}' "
+                    f"must be one of {allowed_types}, "
+                    f"but found '{argument_type.__bound__}' instead"
+                )
+            for constraint in argument_type.__constraints__:
+                if constraint not in _ALLOWED_TYPES_MASKS:
+                    raise TypeError(
+                        f"Constraints of TypeVar argument '{argument_name}' "
+                        f"must be in {allowed_types}, "
+                        f"but found '{constraint}' instead"
+                    )
+        elif argument_type not in _ALLOWED_TYPES_MASKS:
+            raise TypeError(
+                f"The type annotation for argument '{argument_name}' "
+                f"in the function signature must be one of {allowed_types}, "
+                f"but found '{argument_type}' instead"
+            )
+
+
+def _validate_return_type_hint(return_type: Any) -> None:
+    if isinstance(return_type, TypeVar):
+        _validate_type_hints({"return value": return_type})
+    elif return_type is not NoneType and return_type not in _ALLOWED_TYPES_MASKS:
+        raise TypeError(
+            f"The return type annotation in the function signature "
+            f"must be one of {allowed_types} or None, "
+            f"but found '{return_type}' instead"
+        )
+
+
+def _get_types_mask(types: Iterable[AllowedType]) -> int:
+    return reduce(or_, map(_ALLOWED_TYPES_MASKS.__getitem__, types), 0)
+
+
+_ALL_ALLOWED_TYPES_MASK = _get_types_mask(allowed_types)
+
+
+def _get_type_var_allowed_types(type_var: TypeVar) -> tuple[AllowedType, ...]:
+    if type_var_bound := type_var.__bound__:
+        return (type_var_bound,)
+    elif type_var_constraints := type_var.__constraints__:
+        return type_var_constraints
+    return allowed_types
+
+
+class _Parameter(NamedTuple):
+    name: str
+    kind: inspect._ParameterKind
+    has_default: bool
+    default: Any = None
+
+
+def _get_parameters(func: Callable[..., Any]) -> tuple[_Parameter, ...]:
+    if (
+        type(func) is not FunctionType
+        or hasattr(func, "__wrapped__")
+        or hasattr(func, "__signature__")
+    ):
+        return tuple(
+            _Parameter(
+                parameter.name,
+                parameter.kind,
+                parameter.default is not parameter.empty,
+                None if parameter.default is parameter.empty else parameter.default,
+            )
+            for parameter in inspect.signature(func).parameters.values()
+        )
+
+    # Same as `inspect.signature()` for plain functions, but without creating
+    # `inspect.Parameter` objects
+    func_code = func.__code__
+    names = func_code.co_varnames
+    positional_count = func_code.co_argcount
+    keyword_only_count = func_code.co_kwonlyargcount
+    defaults = func.__defaults__ or ()
+    first_default_index = positional_count - len(defaults)
+    keyword_defaults = func.__kwdefaults__ or {}
+    parameters = [
+        _Parameter(
+            names[i],
+            (
+                inspect.Parameter.POSITIONAL_ONLY
+                if i < func_code.co_posonlyargcount
+                else inspect.Parameter.POSITIONAL_OR_KEYWORD
+            ),
+            i >= first_default_index,
+            defaults[i - first_default_index] if i >= first_default_index else None,
+        )
+        for i in range(positional_count)
+    ]
+    var_index = positional_count + keyword_only_count
+    if func_code.co_flags & inspect.CO_VARARGS:
+        parameters.append(
+            _Parameter(names[var_index], inspect.Parameter.VAR_POSITIONAL, False)
+        )
+        var_index += 1
+    parameters.extend(
+        _Parameter(
+            name,
+            inspect.Parameter.KEYWORD_ONLY,
+            name in keyword_defaults,
+            keyword_defaults.get(name),
+        )
+        for name in names[positional_count : positional_count + keyword_only_count]
+    )
+    if func_code.co_flags & inspect.CO_VARKEYWORDS:
+        parameters.append(
+            _Parameter(names[var_index], inspect.Parameter.VAR_KEYWORD, False)
+        )
+    return tuple(parameters)
+
+
+def _get_type_hints(func: Callable[..., Any]) -> dict[str, Any]:
+    # Annotations of plain types, unions and TypeVars are used as is, as
+    # `get_type_hints()` only has to evaluate strings, forward references, etc.
+    annotations = getattr(func, "__annotations__", None)
+    if type(func) is not FunctionType or annotations is None:
+        return get_type_hints(func)
+    func_type_hints = {}
+    for argument_name, argument_type in annotations.items():
+        if argument_type is None:
+            argument_type = NoneType
+        elif type(argument_type) not in (type, UnionType, TypeVar):
+            return get_type_hints(func)
+        func_type_hints[argument_name] = argument_type
+    return func_type_hints
+
+
+# Signature of a `strict` function compiled once, at decoration time or on the first
+# call for the lazy mode: `bind()` maps call arguments to values in the parameters
+# order (the `args` tuple itself for an all-positional call), `check()` validates
+# them with a flat loop over the precompiled `argument_checks`
+class _CompiledSignature:
+    __slots__ = (
+        "argument_checks",
+        "check_return",
+        "exact_positional_count",
+        "func",
+        "func_signature",
+        "is_compiled",
+        "keyword_names",
+        "parameters",
+        "parameters_count",
+        "positional_count",
+        "positional_only_count",
+        "return_check",
+        "skip_first_argument",
+        "star_index",
+        "stats",
+        "var_positional_index",
+    )
+
+    def __init__(
+        self,
+        func: Callable[..., Any],
+        skip_first_argument: bool,
+        stats: StrictStats | None = None,
+        check_return: bool = False,
+    ) -> None:
+        self.func = func
+        self.skip_first_argument = skip_first_argument
+        self.stats = stats
+        # The items of a generator are not checked, nor its return annotation
+        self.check_return = check_return and not (
+            inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func)
+        )
+        self.func_signature: inspect.Signature | None = None
+        self.is_compiled = False
+
+    def compile(self) -> None:
+        if self.is_compiled:
+            return
+        func_type_hints = _get_type_hints(self.func)
+        self.parameters = parameters = _get_parameters(self.func)
+        if self.skip_first_argument and parameters:
+            # `self` and `cls` may be annotated with the class itself
+            func_type_hints.pop(parameters[0].name, None)
+        _validate_type_hints(func_type_hints)
+        if self.check_return and "return" in func_type_hints:
+            _validate_return_type_hint(func_type_hints["return"])
+        parameter_kinds = tuple(parameter.kind for parameter in parameters)
+        self.parameters_count = len(parameters)
+
+        self.positional_count = 0
+        for parameter_kind in parameter_kinds:
+            if parameter_kind not in _POSITIONAL_KINDS:
+                break
+            self.positional_count += 1
+        self.positional_only_count = parameter_kinds.count(
+            inspect.Parameter.POSITIONAL_ONLY
+        )
+        has_var_parameters = (
+            inspect.Parameter.VAR_POSITIONAL in parameter_kinds
+            or inspect.Parameter.VAR_KEYWORD in parameter_kinds
+        )
+        self.exact_positional_count = (
+            self.parameters_count
+            if self.positional_count == self.parameters_count
+            else -1
+        )
+        # `(a, b, *args)`-like signatures are bound without `inspect` as well
+        self.star_index = (
+            self.positional_count
+            if parameter_kinds[self.positional_count :]
+            == (inspect.Parameter.VAR_POSITIONAL,)
+            else -1
+        )
+        self.var_positional_index = (
+            parameter_kinds.index(inspect.Parameter.VAR_POSITIONAL)
+            if inspect.Parameter.VAR_POSITIONAL in parameter_kinds
+            else -1
+        )
+        # Parameters that can be looked up in `kwargs` directly
+        self.keyword_names = (
+            ()
+            if has_var_parameters
+            else tuple(parameter.name for parameter in parameters)
+        )
+
+        argument_checks = []
+        type_vars_to_first_arguments: dict[TypeVar, tuple[int, str]] = {}
+        for index, parameter in enumerate(parameters):
+            argument_name = parameter.name
+            argument_type = func_type_hints.get(argument_name)
+            if index == 0 and self.skip_first_argument:
                 continue
-            if get_origin(argument_type) is Unpack:
-                type_var_tuple_arg = argument_name
+            if not argument_type:
+                argument_checks.append(
+                    _ArgumentCheck(
+                        index,
+                        argument_name,
+                        _UNANNOTATED,
+                        allowed_types,
+                        _ALL_ALLOWED_TYPES_MASK,
+                    )
+                )
+            elif get_origin(argument_type) is Unpack:
+                argument_checks.append(
+                    _ArgumentCheck(
+                        index,
+                        argument_name,
+                        _TYPE_VAR_TUPLE,
+                        allowed_types,
+                        _ALL_ALLOWED_TYPES_MASK,
+                    )
+                )
             elif isinstance(argument_type, TypeVar):
-                if argument_type.__bound__ not in (*allowed_types, None):
-                    raise TypeError(
-                        f"Bound of TypeVar argument '{argument_name}' "
-                        f"must be one of {allowed_types}, "
-                        f"but found '{argument_type.__bound__}' instead"
+                if argument_type in type_vars_to_first_arguments:
+                    first_index, first_name = type_vars_to_first_arguments[
+                        argument_type
+                    ]
+                    argument_checks.append(
+                        _ArgumentCheck(
+                            index,
+                            argument_name,
+                            _TYPE_VAR_REPEATED,
+                            None,
+                            first_index=first_index,
+                            first_name=first_name,
+                        )
                     )
-                for constraint in argument_type.__constraints__:
-                    if constraint not in allowed_types:
-                        raise TypeError(
-                            f"Constraints of TypeVar argument '{argument_name}' "
-                            f"must be in {allowed_types}, "
-                            f"but found '{constraint}' instead"
+                else:
+                    type_vars_to_first_arguments[argument_type] = (
+                        index,
+                        argument_name,
+                    )
+                    type_var_allowed_types = _get_type_var_allowed_types(argument_type)
+                    argument_checks.append(
+                        _ArgumentCheck(
+                            index,
+                            argument_name,
+                            _TYPE_VAR,
+                            type_var_allowed_types,
+                            _get_types_mask(type_var_allowed_types),
                         )
-                type_vars.append(argument_name)
-            elif argument_type not in allowed_types:
-                raise TypeError(
-                    f"The type annotation for argument '{argument_name}' "
-                    f"in the function signature must be one of {allowed_types}, "
-                    f"but found '{argument_type}' instead"
+                    )
+            else:
+                argument_checks.append(
+                    _ArgumentCheck(
+                        index,
+                        argument_name,
+                        _ANNOTATED,
+                        argument_type,
+                        _ALLOWED_TYPES_MASKS[argument_type],
+                    )
                 )
+        self.argument_checks = tuple(argument_checks)
 
-        @wraps(func)
-        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-            bound_arguments = func_singature.bind(*args, **kwargs)
-            bound_arguments.apply_defaults()
-            type_vars_to_its_actual_types = {}
+        self.return_check: _ArgumentCheck | None = None
+        if self.check_return and "return" in func_type_hints:
+            return_type = func_type_hints["return"]
+            if return_type is NoneType:
+                self.return_check = _ArgumentCheck(
+                    self.parameters_count, "return", _RETURNS_NONE, None
+                )
+            elif return_type in type_vars_to_first_arguments:
+                first_index, first_name = type_vars_to_first_arguments[return_type]
+                self.return_check = _ArgumentCheck(
+                    self.parameters_count,
+                    "return",
+                    _TYPE_VAR_REPEATED,
+                    None,
+                    first_index=first_index,
+                    first_name=first_name,
+                )
+            elif isinstance(return_type, TypeVar):
+                type_var_allowed_types = _get_type_var_allowed_types(return_type)
+                self.return_check = _ArgumentCheck(
+                    self.parameters_count,
+                    "return",
+                    _TYPE_VAR,
+                    type_var_allowed_types,
+                    _get_types_mask(type_var_allowed_types),
+                )
+            else:
+                self.return_check = _ArgumentCheck(
+                    self.parameters_count,
+                    "return",
+                    _ANNOTATED,
+                    return_type,
+                    _ALLOWED_TYPES_MASKS[return_type],
+                )
+        self.is_compiled = True
 
-            for argument_name, argument_value in (
-                tuple(bound_arguments.arguments.items())[1:]
-                if skip_first_argument
-                else bound_arguments.arguments.items()
-            ):
-                if argument_name in type_vars:
-                    type_var_argument = func_type_hints[argument_name]
-                    if type_var_argument not in type_vars_to_its_actual_types:
-                        if type_var_argument_bound := type_var_argument.__bound__:
-                            type_var_allowed_types: tuple[
-                                type[bool]
-                                | type[int]
-                                | type[float]
-                                | type[str]
-                                | UnionType,
-                                ...,
-                            ] = (type_var_argument_bound,)
-                        elif (
-                            type_var_argument_constraints := type_var_argument.__constraints__
-                        ):
-                            type_var_allowed_types = type_var_argument_constraints
-                        else:
-                            type_var_allowed_types = allowed_types
-                        if (
-                            argument_value_type := type(argument_value)
-                        ) not in type_var_allowed_types:
-                            raise TypeError(
-                                f"Argument '{argument_name}' "
-                                f"must be one of {type_var_allowed_types}, "
-                                f"but received value of type '{argument_value_type}"
-                            )
-                        type_vars_to_its_actual_types[type_var_argument] = (
-                            argument_name,  # Only for exception logs
-                            argument_value_type,
-                        )
-                    else:
-                        if not isinstance(
-                            argument_value,
-                            type_vars_to_its_actual_types[type_var_argument][1],
-                        ):
-                            raise TypeError(
-                                f"TypeVar arguments types must match: "
-                                f"'{argument_name}' has type {type(argument_value)}, "
-                                f"which is not equal to '{
-                                    type_vars_to_its_actual_types[
-                                        type_var_argument
-                                    ][0]
-                                }', "
-                                f"that has type '{
-                                    type_vars_to_its_actual_types[
-                                        type_var_argument
-                                    ][1]
-                                }'"
-                            )
-                elif argument_name == type_var_tuple_arg:
-                    for i, arg in enumerate(argument_value):
-                        if type(arg) not in allowed_types:
-                            raise TypeError(
-                                f"Argument '{argument_name}[{i}]' "
-                                f"must be one of {allowed_types}, "
-                                f"but received value of type '{type(arg)}' "
-                            )
-                elif not func_type_hints.get(argument_name):
-                    if (
-                        argument_value_type := type(argument_value)
-                    ) not in allowed_types:
-                        raise TypeError(
-                            f"Argument '{argument_name}' "
-                            f"must be one of {allowed_types}, "
-                            f"but received value of type '{argument_value_type}"
-                        )
-                elif not isinstance(argument_value, func_type_hints[argument_name]):
+    def bind(self, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Sequence[Any]:
+        args_count = len(args)
+        if not kwargs:
+            if args_count == self.exact_positional_count:
+                return args
+            if 0 <= self.star_index <= args_count:
+                return (*args[: self.star_index], args[self.star_index :])
+        elif (
+            self.keyword_names
+            and self.positional_only_count <= args_count <= self.positional_count
+            and args_count + len(kwargs) == self.parameters_count
+        ):
+            try:
+                return (
+                    *args,
+                    *[kwargs[name] for name in self.keyword_names[args_count:]],
+                )
+            except KeyError:
+                pass
+        # Defaults, unexpected or missing arguments and other rare cases
+        if self.func_signature is None:
+            self.func_signature = inspect.signature(self.func)
+        bound_arguments = self.func_signature.bind(*args, **kwargs)
+        bound_arguments.apply_defaults()
+        return tuple(bound_arguments.arguments.values())
+
+    def check(
+        self,
+        argument_values: Sequence[Any],
+        argument_checks: tuple[_ArgumentCheck, ...] = (),
+    ) -> None:
+        base_types_bits_get = _BASE_TYPES_BITS.get
+        instance_masks_get = _INSTANCE_MASKS.get
+        for (
+            index,
+            argument_name,
+            kind,
+            expected,
+            mask,
+            first_index,
+            first_name,
+        ) in (
+            argument_checks or self.argument_checks
+        ):
+            argument_value = argument_values[index]
+            if kind == _ANNOTATED:
+                # `isinstance()` only for subclasses of the base types
+                if not (
+                    instance_masks_get(type(argument_value), 0) & mask
+                ) and not isinstance(argument_value, expected):
                     raise TypeError(
                         f"Argument '{argument_name}' "
-                        f"must be of type '{func_type_hints[argument_name]}' "
+                        f"must be of type '{expected}' "
                         f"but received value of type '{type(argument_value)}'"
                     )
+            elif kind == _TYPE_VAR_REPEATED:
+                first_value_type = type(argument_values[first_index])
+                if not isinstance(argument_value, first_value_type):
+                    raise TypeError(
+                        f"TypeVar arguments types must match: "
+                        f"'{argument_name}' has type {type(argument_value)}, "
+                        f"which is not equal to '{first_name}', "
+                        f"that has type '{first_value_type}'"
+                    )
+            elif kind == _TYPE_VAR_TUPLE:
+                for i, arg in enumerate(argument_value):
+                    if type(arg) not in expected and not (
+                        base_types_bits_get(type(arg), 0) & mask
+                    ):
+                        raise TypeError(
+                            f"Argument '{argument_name}[{i}]' "
+                            f"must be one of {expected}, "
+                            f"but received value of type '{type(arg)}' "
+                        )
+            elif (argument_value_type := type(argument_value)) not in expected and not (
+                base_types_bits_get(argument_value_type, 0) & mask
+            ):
+                # `_UNANNOTATED` and the first argument of a `_TYPE_VAR`. The
+                # allowed base types come first in `expected`, so a scan finds them
+                # faster than the mask lookup, which is left for unions
+                raise TypeError(
+                    f"Argument '{argument_name}' "
+                    f"must be one of {expected}, "
+                    f"but received value of type '{argument_value_type}"
+                )
+
+    # Called by the wrappers only after `check()` has failed
+    def reject(
+        self,
+        argument_values: Sequence[Any],
+        error: TypeError,
+        rejected_name: str | None = None,
+    ) -> None:
+        if self.stats is not None:
+            self.stats.rejections += 1
+            if rejected_name is None:
+                for argument_check in self.argument_checks:
+                    try:
+                        self.check(argument_values, (argument_check,))
+                    except TypeError:
+                        rejected_name = argument_check.name
+                        break
+            if rejected_name is not None:
+                rejections_by_argument = self.stats.rejections_by_argument
+                rejections_by_argument[rejected_name] = (
+                    rejections_by_argument.get(rejected_name, 0) + 1
+                )
+        if (error_hook := _strict_state.error_hook) is not None:
+            error_hook(self.func, error)
+
+    def check_or_reject(self, argument_values: Sequence[Any]) -> None:
+        try:
+            self.check(argument_values)
+        except TypeError as error:
+            self.reject(argument_values, error)
+            raise
+
+    def check_result(self, argument_values: Sequence[Any], result: Any) -> None:
+        if (return_check := self.return_check) is None:
+            return
+        kind = return_check.kind
+        expected = return_check.expected
+        if kind == _RETURNS_NONE:
+            if result is not None:
+                raise TypeError(
+                    f"Return value must be None, "
+                    f"but received value of type '{type(result)}'"
+                )
+        elif kind == _TYPE_VAR_REPEATED:
+            first_value_type = type(argument_values[return_check.first_index])
+            if not isinstance(result, first_value_type):
+                raise TypeError(
+                    f"TypeVar return value type must match: "
+                    f"return value has type {type(result)}, "
+                    f"which is not equal to '{return_check.first_name}', "
+                    f"that has type '{first_value_type}'"
+                )
+        elif kind == _ANNOTATED:
+            if not (
+                _INSTANCE_MASKS.get(type(result), 0) & return_check.mask
+            ) and not isinstance(result, expected):
+                raise TypeError(
+                    f"Return value must be of type '{expected}' "
+                    f"but received value of type '{type(result)}'"
+                )
+        elif type(result) not in expected and not (
+            _BASE_TYPES_BITS.get(type(result), 0) & return_check.mask
+        ):
+            raise TypeError(
+                f"Return value must be one of {expected}, "
+                f"but received value of type '{type(result)}'"
+            )
+
+    def check_result_or_reject(
+        self, argument_values: Sequence[Any], result: Any
+    ) -> None:
+        try:
+            self.check_result(argument_values, result)
+        except TypeError as error:
+            self.reject(argument_values, error, "return")
+            raise
+
+    async def check_awaited_result(
+        self, argument_values: Sequence[Any], awaitable: Awaitable[Any]
+    ) -> Any:
+        result = await awaitable
+        self.check_result_or_reject(argument_values, result)
+        return result
+
+    def check_batch(self, columns: Sequence[Sequence[Any]]) -> None:
+        if not columns:
+            raise ValueError("At least one column is required")
+        rows_count = len(columns[0])
+        for i, column in enumerate(columns):
+            if len(column) != rows_count:
+                raise ValueError(
+                    f"All columns must have the same length: column {i} has "
+                    f"{len(column)} rows, but column 0 has {rows_count}"
+                )
+        # Columns are bound to the parameters like positional arguments of a call:
+        # a parameter gets a column, `Unpack[TypeVarTuple]` star-args get a tuple of
+        # columns and a parameter with a default value gets it repeated for every row
+        star_indexes = {
+            argument_check.position
+            for argument_check in self.argument_checks
+            if argument_check.kind == _TYPE_VAR_TUPLE
+        }
+        bound_columns: list[Any] = []
+        for index, bound_value in enumerate(
+            self.bind(tuple(map(_ColumnIndex, range(len(columns)))), {})
+        ):
+            if type(bound_value) is _ColumnIndex:
+                bound_columns.append(columns[bound_value])
+            elif index == self.var_positional_index:
+                star_columns = tuple(columns[i] for i in bound_value)
+                bound_columns.append(
+                    star_columns
+                    if index in star_indexes
+                    else [
+                        tuple(column[row] for column in star_columns)
+                        for row in range(rows_count)
+                    ]
+                )
+            else:
+                bound_columns.append((bound_value,) * rows_count)
+
+        base_types_bits_get = _BASE_TYPES_BITS.get
+        instance_masks_get = _INSTANCE_MASKS.get
+        for index, _, kind, expected, mask, first_index, _ in self.argument_checks:
+            bound_column = bound_columns[index]
+            if kind == _ANNOTATED:
+                is_valid = all(
+                    instance_masks_get(value_type, 0) & mask
+                    or issubclass(value_type, expected)
+                    for value_type in set(map(type, bound_column))
+                )
+            elif kind == _TYPE_VAR_REPEATED:
+                first_column = bound_columns[first_index]
+                first_types = set(map(type, first_column))
+                if len(first_types) == 1:
+                    first_type = first_types.pop()
+                    is_valid = all(
+                        issubclass(value_type, first_type)
+                        for value_type in set(map(type, bound_column))
+                    )
+                else:
+                    is_valid = all(
+                        map(isinstance, bound_column, map(type, first_column))
+                    )
+            else:
+                is_valid = all(
+                    base_types_bits_get(value_type, 0) & mask
+                    for column in (
+                        bound_column if index in star_indexes else (bound_column,)
+                    )
+                    for value_type in set(map(type, column))
+                )
+            if not is_valid:
+                break
+        else:
+            return
+
+        # Rows are checked one by one only to report the first invalid one
+        for row in range(rows_count):
+            argument_values = [
+                (
+                    tuple(column[row] for column in bound_column)
+                    if index in star_indexes
+                    else bound_column[row]
+                )
+                for index, bound_column in enumerate(bound_columns)
+            ]
+            try:
+                self.check(argument_values)
+            except TypeError as error:
+                row_error = TypeError(f"Row {row}: {error}")
+                self.reject(argument_values, row_error)
+                raise row_error from error
+
+    # Every row counts as a call in the stats, the whole batch is validated unless
+    # the mode is "off"
+    def check_batch_or_reject(self, columns: Sequence[Sequence[Any]]) -> None:
+        stats = self.stats
+        rows_count = len(columns[0]) if columns else 0
+        if stats is not None:
+            stats.calls += rows_count
+        if not _strict_state.check_every:
+            return
+        if stats is not None:
+            stats.validated_calls += rows_count
+            start = perf_counter_ns()
+        self.check_batch(columns)
+        if stats is not None:
+            stats.validation_time_ns += perf_counter_ns() - start
+
+    def call_and_check_result(self, *args: Any) -> Any:
+        result = self.func(*args)
+        argument_values = self.bind(args, {})
+        if inspect.iscoroutinefunction(self.func):
+            return self.check_awaited_result(argument_values, result)
+        self.check_result_or_reject(argument_values, result)
+        return result
+
+
+class _ColumnIndex(int):
+    pass
+
+
+# Functions with the same parameters and annotations share the compiled source,
+# which is the most expensive part of generating a wrapper
+@lru_cache(maxsize=1024)
+def _compile_wrapper_source(wrapper_source: str) -> CodeType:
+    return compile(wrapper_source, "<strict wrapper>", "exec")
+
+
+def _generate_wrapper(
+    func: Callable[P, R], compiled_signature: _CompiledSignature
+) -> Callable[P, R]:
+    # Builds the source of a wrapper with the exact parameter list of `func`,
+    # where every argument check is inlined:
+    #
+    #     def wrapper(a, b, /, *args):
+    #         <mode check>
+    #         if not __strict_isinstance(a, __strict_expected_0):
+    #             __strict_check((a, b, args))
+    #         ...
+    #         return __strict_func(a, b, *args)
+    #
+    # Error messages are produced by `_CompiledSignature.check_or_reject()`, which
+    # is called only when an inlined check has already failed.
+    parameters = compiled_signature.parameters
+    parameters_source = []
+    call_source = []
+    previous_kind = None
+    for parameter in parameters:
+        name = parameter.name
+        if (
+            previous_kind == inspect.Parameter.POSITIONAL_ONLY
+            and parameter.kind != previous_kind
+        ):
+            parameters_source.append("/")
+        if parameter.kind == inspect.Parameter.KEYWORD_ONLY and previous_kind not in (
+            inspect.Parameter.KEYWORD_ONLY,
+            inspect.Parameter.VAR_POSITIONAL,
+        ):
+            parameters_source.append("*")
+        default_source = "=None" if parameter.has_default else ""
+        if parameter.kind == inspect.Parameter.VAR_POSITIONAL:
+            parameters_source.append(f"*{name}")
+            call_source.append(f"*{name}")
+        elif parameter.kind == inspect.Parameter.VAR_KEYWORD:
+            parameters_source.append(f"**{name}")
+            call_source.append(f"**{name}")
+        elif parameter.kind == inspect.Parameter.KEYWORD_ONLY:
+            parameters_source.append(f"{name}{default_source}")
+            call_source.append(f"{name}={name}")
+        else:
+            parameters_source.append(f"{name}{default_source}")
+            call_source.append(name)
+        previous_kind = parameter.kind
+    if previous_kind == inspect.Parameter.POSITIONAL_ONLY:
+        parameters_source.append("/")
+
+    values_source = "".join(f"{parameter.name}, " for parameter in parameters)
+    call_expression = f"__strict_func({', '.join(call_source)})"
+    namespace: dict[str, Any] = {
+        "__strict_func": func,
+        "__strict_state": _strict_state,
+        "__strict_next_call": count().__next__,
+        "__strict_check": compiled_signature.check_or_reject,
+        "__strict_check_result": compiled_signature.check_result_or_reject,
+        "__strict_check_awaited_result": compiled_signature.check_awaited_result,
+        "__strict_stats": compiled_signature.stats,
+        "__strict_perf_counter_ns": perf_counter_ns,
+        "__strict_isinstance": isinstance,
+        "__strict_type": type,
+        "__strict_base_types_bits_get": _BASE_TYPES_BITS.get,
+        "__strict_instance_masks_get": _INSTANCE_MASKS.get,
+    }
+    with_stats = compiled_signature.stats is not None
+    body_source = [
+        *(("    __strict_stats.calls += 1",) if with_stats else ()),
+        "    __strict_check_every = __strict_state.check_every",
+        "    if __strict_check_every != 1 and (",
+        "        not __strict_check_every",
+        "        or __strict_next_call() % __strict_check_every",
+        "    ):",
+        f"        return {call_expression}",
+    ]
+    if with_stats:
+        body_source.append("    __strict_stats.validated_calls += 1")
+        body_source.append("    __strict_start = __strict_perf_counter_ns()")
+
+    def get_condition_source(
+        argument_check: _ArgumentCheck, name: str, expected_name: str
+    ) -> str:
+        namespace[expected_name] = argument_check.expected
+        mask = argument_check.mask
+        if argument_check.kind == _ANNOTATED:
+            # A single `isinstance()` is cheaper than a mask lookup for a plain type
+            if isinstance(argument_check.expected, type):
+                return f"not __strict_isinstance({name}, {expected_name})"
+            return (
+                f"not __strict_instance_masks_get(__strict_type({name}), 0) "
+                f"& {mask} and not __strict_isinstance({name}, {expected_name})"
+            )
+        elif argument_check.kind == _TYPE_VAR_REPEATED:
+            first_name = parameters[argument_check.first_index].name
+            return f"not __strict_isinstance({name}, __strict_type({first_name}))"
+        elif argument_check.kind == _RETURNS_NONE:
+            return f"{name} is not None"
+        return (
+            f"__strict_type({name}) not in {expected_name} "
+            f"and not __strict_base_types_bits_get(__strict_type({name}), 0) & {mask}"
+        )
+
+    for index, argument_check in enumerate(compiled_signature.argument_checks):
+        name = parameters[argument_check.position].name
+        if argument_check.kind == _TYPE_VAR_TUPLE:
+            expected_name = f"__strict_expected_{index}"
+            namespace[expected_name] = argument_check.expected
+            body_source.append(f"    for __strict_arg in {name}:")
+            body_source.append(
+                f"        if __strict_type(__strict_arg) not in {expected_name} "
+                "and not __strict_base_types_bits_get("
+                f"__strict_type(__strict_arg), 0) & {argument_check.mask}:"
+            )
+            body_source.append(f"            __strict_check(({values_source}))")
+            continue
+        condition_source = get_condition_source(
+            argument_check, name, f"__strict_expected_{index}"
+        )
+        body_source.append(f"    if {condition_source}:")
+        body_source.append(f"        __strict_check(({values_source}))")
+    if with_stats:
+        body_source.append(
+            "    __strict_stats.validation_time_ns += "
+            "__strict_perf_counter_ns() - __strict_start"
+        )
+    if (return_check := compiled_signature.return_check) is None:
+        body_source.append(f"    return {call_expression}")
+    elif inspect.iscoroutinefunction(func):
+        body_source.append(
+            f"    return __strict_check_awaited_result(({values_source}), "
+            f"{call_expression})"
+        )
+    else:
+        condition_source = get_condition_source(
+            return_check, "__strict_result", "__strict_expected_return"
+        )
+        body_source.append(f"    __strict_result = {call_expression}")
+        body_source.append(f"    if {condition_source}:")
+        body_source.append(
+            f"        __strict_check_result(({values_source}), __strict_result)"
+        )
+        body_source.append("    return __strict_result")
+
+    wrapper_source = "\n".join(
+        (f"def wrapper({', '.join(parameters_source)}):", *body_source)
+    )
+    exec(_compile_wrapper_source(wrapper_source), namespace)
+    wrapper: Callable[P, R] = namespace["wrapper"]
+    wrapper.__code__ = wrapper.__code__.replace(
+        co_name=func.__name__, co_qualname=func.__qualname__
+    )
+    # Defaults of the signature, which are those of the wrapped function if
+    # `func` is a wrapper itself
+    wrapper.__defaults__ = (
+        tuple(
+            parameter.default
+            for parameter in parameters
+            if parameter.has_default
+            and parameter.kind != inspect.Parameter.KEYWORD_ONLY
+        )
+        or None
+    )
+    wrapper.__kwdefaults__ = {
+        parameter.name: parameter.default
+        for parameter in parameters
+        if parameter.has_default and parameter.kind == inspect.Parameter.KEYWORD_ONLY
+    } or None
+    return wraps(func)(wrapper)
+
+
+def _can_generate_wrapper(compiled_signature: _CompiledSignature) -> bool:
+    return not any(
+        parameter.name.startswith("__strict_")
+        for parameter in compiled_signature.parameters
+    )
+
+
+def _make_wrapper(
+    func: Callable[P, R], compiled_signature: _CompiledSignature
+) -> Callable[P, R]:
+    bind: Callable[[tuple[Any, ...], dict[str, Any]], Sequence[Any]]
+    exact_positional_count: int
+    check = compiled_signature.check
+    reject = compiled_signature.reject
+    next_call = count().__next__
+
+    def warm_up() -> None:
+        nonlocal bind, exact_positional_count
+        compiled_signature.compile()
+        bind = compiled_signature.bind
+        exact_positional_count = compiled_signature.exact_positional_count
+
+    def warm_up_and_bind(
+        args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> Sequence[Any]:
+        warm_up()
+        return bind(args, kwargs)
+
+    if compiled_signature.is_compiled:
+        bind = compiled_signature.bind
+        exact_positional_count = compiled_signature.exact_positional_count
+    else:
+        # Lazy mode: the first call compiles the signature and rebinds these
+        bind = warm_up_and_bind
+        exact_positional_count = -1
+
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        check_every = _strict_state.check_every
+        if check_every != 1 and (not check_every or next_call() % check_every):
             return func(*args, **kwargs)
+        argument_values = (
+            args
+            if not kwargs and len(args) == exact_positional_count
+            else bind(args, kwargs)
+        )
+        try:
+            check(argument_values)
+        except TypeError as error:
+            reject(argument_values, error)
+            raise
+        return func(*args, **kwargs)
+
+    # A separate wrapper, so there is no overhead with stats and return value
+    # checks off
+    stats = compiled_signature.stats
+    check_return = compiled_signature.check_return
+    if stats is not None or check_return:
+        check_result = compiled_signature.check_result_or_reject
+        check_awaited_result = compiled_signature.check_awaited_result
+        is_coroutine_function = inspect.iscoroutinefunction(func)
+
+        def instrumented_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if stats is not None:
+                stats.calls += 1
+            check_every = _strict_state.check_every
+            if check_every != 1 and (not check_every or next_call() % check_every):
+                return func(*args, **kwargs)
+            if stats is not None:
+                stats.validated_calls += 1
+                start = perf_counter_ns()
+            argument_values = (
+                args
+                if not kwargs and len(args) == exact_positional_count
+                else bind(args, kwargs)
+            )
+            try:
+                check(argument_values)
+            except TypeError as error:
+                reject(argument_values, error)
+                raise
+            if stats is not None:
+                stats.validation_time_ns += perf_counter_ns() - start
+            if not check_return:
+                return func(*args, **kwargs)
+            result = func(*args, **kwargs)
+            if is_coroutine_function:
+                return check_awaited_result(  # type: ignore[return-value]
+                    argument_values, result  # type: ignore[arg-type]
+                )
+            check_result(argument_values, result)
+            return result
+
+        wrapper = instrumented_wrapper
+    wrapper = wraps(func)(wrapper)
+    setattr(wrapper, "__strict_warm_up__", warm_up)
+    return wrapper
+
+
+def _make_lazy_generated_wrapper(
+    func: Callable[P, R], compiled_signature: _CompiledSignature
+) -> Callable[P, R]:
+    generated_wrapper: Callable[P, R] | None = None
+
+    def warm_up() -> None:
+        nonlocal generated_wrapper
+        if generated_wrapper is None:
+            compiled_signature.compile()
+            generated_wrapper = (
+                _generate_wrapper(func, compiled_signature)
+                if _can_generate_wrapper(compiled_signature)
+                else _make_wrapper(func, compiled_signature)
+            )
 
+    # One more call than the eagerly generated wrapper has
+    @wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        if generated_wrapper is None:
+            warm_up()
+        return generated_wrapper(*args, **kwargs)  # type: ignore[misc]
+
+    setattr(wrapper, "__strict_warm_up__", warm_up)
+    return wrapper
+
+
+@overload
+def strict(
+    _func: Callable[P, R],
+    *,
+    skip_first_argument: bool = False,
+    codegen: bool = False,
+    lazy: bool = False,
+    stats: bool | None = None,
+    check_return: bool = False,
+) -> Callable[P, R]: ...
+
+
+@overload
+def strict(
+    *,
+    skip_first_argument: bool = False,
+    codegen: bool = False,
+    lazy: bool = False,
+    stats: bool | None = None,
+    check_return: bool = False,
+) -> Callable[[Callable[P, R]], Callable[P, R]]: ...
+
+
+def strict(
+    _func: Callable[P, R] | None = None,
+    *,
+    skip_first_argument: bool = False,
+    codegen: bool = False,
+    lazy: bool = False,
+    stats: bool | None = None,
+    check_return: bool = False,
+) -> Callable[P, R] | Callable[[Callable[P, R]], Callable[P, R]]:
+    # `lazy=True` postpones resolving the type hints and compiling the signature
+    # until the first call or `warm_up()`, so decorating costs almost nothing and
+    # annotations may contain forward references unresolvable at decoration time.
+    # `stats=True` records `StrictStats`, see `get_strict_stats()`, by default
+    # it's enabled with the `STRICT_STATS` environment variable.
+    # `check_return=True` validates the returned value against the return
+    # annotation (`None` included), awaited for coroutine functions, and is
+    # ignored for generator functions
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        if _strict_disabled:
+            return func
+        func_stats = (
+            StrictStats()
+            if (_strict_stats_by_default if stats is None else stats)
+            else None
+        )
+        compiled_signature = _CompiledSignature(
+            func, skip_first_argument, func_stats, check_return
+        )
+        if lazy:
+            wrapper = (
+                _make_lazy_generated_wrapper(func, compiled_signature)
+                if codegen
+                else _make_wrapper(func, compiled_signature)
+            )
+        else:
+            compiled_signature.compile()
+            wrapper = (
+                _generate_wrapper(func, compiled_signature)
+                if codegen and _can_generate_wrapper(compiled_signature)
+                else _make_wrapper(func, compiled_signature)
+            )
+        # Wrappers are always sync and return the coroutine, generator or async
+        # generator created by `func`, so arguments are validated when it's
+        # called, before anything is awaited or iterated, and no frame is added
+        if inspect.iscoroutinefunction(func):
+            inspect.markcoroutinefunction(wrapper)
+        setattr(wrapper, "__strict_signature__", compiled_signature)
+        if func_stats is not None:
+            _strict_stats_registry[wrapper] = func_stats
         return wrapper
 
     return decorator(_func) if _func else decorator
 
 
+def _has_annotated_parameters(func: Callable[..., Any]) -> bool:
+    return any(name != "return" for name in getattr(func, "__annotations__", ()))
+
+
+@overload
+def strict_class(
+    _cls: type[T],
+    *,
+    codegen: bool = False,
+    lazy: bool = False,
+    stats: bool | None = None,
+    check_return: bool = False,
+) -> type[T]: ...
+
+
+@overload
+def strict_class(
+    *,
+    codegen: bool = False,
+    lazy: bool = False,
+    stats: bool | None = None,
+    check_return: bool = False,
+) -> Callable[[type[T]], type[T]]: ...
+
+
+def strict_class(
+    _cls: type[T] | None = None,
+    *,
+    codegen: bool = False,
+    lazy: bool = False,
+    stats: bool | None = None,
+    check_return: bool = False,
+) -> type[T] | Callable[[type[T]], type[T]]:
+    # Decorates `__init__` and the methods, classmethods, staticmethods and
+    # property accessors of the class with annotated parameters. `self` and `cls`
+    # are skipped when the signature is compiled. Dunder methods other than
+    # `__init__` and functions already decorated with `strict` are left as is
+    def decorate(
+        func: Callable[..., Any], skip_first_argument: bool
+    ) -> Callable[..., Any]:
+        if (
+            not isinstance(func, FunctionType)
+            or hasattr(func, "__strict_signature__")
+            or not _has_annotated_parameters(func)
+        ):
+            return func
+        return strict(
+            func,
+            skip_first_argument=skip_first_argument,
+            codegen=codegen,
+            lazy=lazy,
+            stats=stats,
+            check_return=check_return,
+        )
+
+    def decorator(cls: type[T]) -> type[T]:
+        if _strict_disabled:
+            return cls
+        for name, attribute in tuple(vars(cls).items()):
+            if name.startswith("__") and name.endswith("__") and name != "__init__":
+                continue
+            if isinstance(attribute, (staticmethod, classmethod)):
+                func = attribute.__func__
+                decorated_func = decorate(func, isinstance(attribute, classmethod))
+                if decorated_func is not func:
+                    setattr(cls, name, type(attribute)(decorated_func))
+            elif isinstance(attribute, property):
+                fget, fset, fdel = (
+                    accessor and decorate(accessor, True)
+                    for accessor in (attribute.fget, attribute.fset, attribute.fdel)
+                )
+                if (fget, fset, fdel) != (
+                    attribute.fget,
+                    attribute.fset,
+                    attribute.fdel,
+                ):
+                    setattr(cls, name, property(fget, fset, fdel, attribute.__doc__))
+            else:
+                decorated_func = decorate(attribute, True)
+                if decorated_func is not attribute:
+                    setattr(cls, name, decorated_func)
+        return cls
+
+    return decorator(_cls) if _cls else decorator
+
+
+def warm_up(*funcs: Callable[..., Any]) -> None:
+    for func in funcs:
+        if (func_warm_up := getattr(func, "__strict_warm_up__", None)) is not None:
+            func_warm_up()
+        else:
+            _get_compiled_signature(func)
+
+
+def _get_compiled_signature(func: Callable[..., Any]) -> _CompiledSignature | None:
+    compiled_signature = getattr(func, "__strict_signature__", None)
+    if compiled_signature is None:
+        if not _strict_disabled:
+            raise TypeError(f"Function '{func}' is not decorated with `strict`")
+    else:
+        compiled_signature.compile()
+    return compiled_signature
+
+
+def _materialize_columns(columns: Iterable[Iterable[Any]]) -> list[Sequence[Any]]:
+    return [
+        column if isinstance(column, Sequence) else tuple(column) for column in columns
+    ]
+
+
+# `columns[i][row]` is the i-th positional argument of the call number `row`.
+# The stats and the error hook of `func` see the rows like separate calls
+def validate_batch(func: Callable[..., Any], *columns: Iterable[Any]) -> None:
+    compiled_signature = _get_compiled_signature(func)
+    if compiled_signature is not None:
+        compiled_signature.check_batch_or_reject(_materialize_columns(columns))
+
+
+# Calls the undecorated function for the validated rows, with the return values
+# checked if `func` is decorated with `check_return=True`
+def strict_map(func: Callable[..., R], *columns: Iterable[Any]) -> list[R]:
+    materialized_columns = _materialize_columns(columns)
+    validate_batch(func, *materialized_columns)
+    compiled_signature = getattr(func, "__strict_signature__", None)
+    if (
+        compiled_signature is not None
+        and compiled_signature.return_check is not None
+        and _strict_state.check_every
+    ):
+        return list(
+            map(compiled_signature.call_and_check_result, *materialized_columns)
+        )
+    return list(map(getattr(func, "__wrapped__", func), *materialized_columns))
+
+
 if __name__ == "__main__":
 
     @strict
@@ -1,17 +1,30 @@
+import asyncio
+import inspect
+from functools import (
+    partial,
+    wraps,
+)
 from itertools import combinations
 from typing import (
+    AsyncIterator,
+    Generator,
+    Iterator,
     MutableSequence,
+    Self,
     Sequence,
     TypeVar,
     TypeVarTuple,
+    get_args,
 )
 
 import pytest
 
+import task1.solution
 from task1.solution import (
     ALLOWED_TYPES_BASE,
     allowed_types,
     strict,
+    strict_class,
 )
 
 
@@ -76,6 +89,19 @@ all_invalid_values_examples_combinations = tuple(
 )
 
 
+@pytest.fixture(autouse=True, params=(False, True), ids=("table", "codegen"))
+def strict_mode(request, monkeypatch):
+    # Every test runs against both the table-driven and the code-generated wrapper
+    monkeypatch.setitem(
+        globals(), "strict", partial(task1.solution.strict, codegen=request.param)
+    )
+    monkeypatch.setitem(
+        globals(),
+        "strict_class",
+        partial(task1.solution.strict_class, codegen=request.param),
+    )
+
+
 def test_no_arguments():
     @strict
     def foo():
@@ -299,3 +325,620 @@ def test_call_type_var_tuple_annotation_invalid(invalid_value_tuple):
 
     with pytest.raises(TypeError):
         foo(*invalid_value_tuple)
+
+
+def test_call_keyword_arguments():
+    T = TypeVar("T")
+
+    @strict
+    def foo(a: int, /, b: T, *, c: T, d: str = "spam"):
+        return a, b, c, d
+
+    assert foo(1, 2, c=3) == (1, 2, 3, "spam")
+    assert foo(1, c="3", b="2", d="eggs") == (1, "2", "3", "eggs")
+
+    with pytest.raises(TypeError):
+        foo(1, b=2, c="3")
+    with pytest.raises(TypeError):
+        foo(1, 2, c=3, d=4)
+    with pytest.raises(TypeError):
+        foo(a=1, b=2, c=3)
+    with pytest.raises(TypeError):
+        foo(1, 2)
+
+
+def test_call_invalid_default():
+    @strict
+    def foo(a: int, b: str = 1):
+        pass
+
+    foo(1, "2")
+    with pytest.raises(TypeError):
+        foo(1)
+
+
+def test_call_skip_first_argument():
+    Ts = TypeVarTuple("Ts")
+
+    class Foo:
+        @strict(skip_first_argument=True)
+        def bar(self, a: int, *args: *Ts):
+            return a, args
+
+    assert Foo().bar(1, 2.5, "3") == (1, (2.5, "3"))
+    assert Foo().bar(a=1) == (1, ())
+    with pytest.raises(TypeError):
+        Foo().bar("1")
+    with pytest.raises(TypeError):
+        Foo().bar(1, [2])
+
+
+def test_codegen_wrapper():
+    Ts = TypeVarTuple("Ts")
+
+    @task1.solution.strict(codegen=True)
+    def foo(type: int, isinstance: str, /, *args: *Ts, d: float = 1.0):
+        return type, isinstance, args, d
+
+    assert foo.__code__.co_filename.startswith("<strict ")
+    assert foo.__code__.co_qualname == foo.__qualname__
+    assert foo.__wrapped__.__name__ == foo.__name__ == "foo"
+    assert foo(1, "2", 3, "4") == (1, "2", (3, "4"), 1.0)
+    assert foo(1, "2", d=2.5) == (1, "2", (), 2.5)
+
+    with pytest.raises(TypeError, match=r"Argument 'args\[1\]'"):
+        foo(1, "2", 3, [4])
+    with pytest.raises(TypeError, match="Argument 'd'"):
+        foo(1, "2", d="3")
+
+
+@pytest.mark.parametrize("codegen", (False, True))
+def test_defaults_of_wrapped_function(codegen):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    @task1.solution.strict(codegen=codegen)
+    @decorator
+    def foo(a: int, b: int = 2, *, c: int = 3):
+        return a, b, c
+
+    assert foo(1) == (1, 2, 3)
+    assert foo(1, 4, c=5) == (1, 4, 5)
+    with pytest.raises(TypeError, match="Argument 'b'"):
+        foo(1, "2")
+
+
+@pytest.mark.parametrize("allowed_type", allowed_types)
+def test_call_type_var_annotation_union_bound(allowed_type):
+    T = TypeVar("T", bound=allowed_type)
+
+    @strict
+    def foo(a: T, b: T):
+        pass
+
+    for base_type in ALLOWED_TYPES_BASE:
+        for allowed_value in ALLOWED_EXAMPLES[base_type]:
+            if base_type in get_args(allowed_type) or base_type is allowed_type:
+                foo(allowed_value, allowed_value)
+            else:
+                with pytest.raises(TypeError):
+                    foo(allowed_value, allowed_value)
+
+
+@pytest.fixture
+def restore_strict_mode():
+    strict_mode = task1.solution.get_strict_mode()
+    check_every = task1.solution._strict_state.check_every
+    yield
+    task1.solution.set_strict_mode(strict_mode, check_every or None)
+
+
+def test_strict_mode(restore_strict_mode):
+    @strict
+    def foo(a: int):
+        pass
+
+    task1.solution.set_strict_mode("off")
+    assert task1.solution.get_strict_mode() == "off"
+    for _ in range(3):
+        foo("1")
+
+    task1.solution.set_strict_mode("sample", 3)
+    assert task1.solution.get_strict_mode() == "sample"
+    rejected_calls = 0
+    for _ in range(9):
+        try:
+            foo("1")
+        except TypeError:
+            rejected_calls += 1
+    assert rejected_calls == 3
+
+    task1.solution.set_strict_mode("full")
+    assert task1.solution.get_strict_mode() == "full"
+    with pytest.raises(TypeError):
+        foo("1")
+
+
+@pytest.mark.parametrize(
+    "mode, sample_rate", (("on", None), ("sample", 0), ("sample", -1))
+)
+def test_strict_mode_invalid(restore_strict_mode, mode, sample_rate):
+    with pytest.raises(ValueError):
+        task1.solution.set_strict_mode(mode, sample_rate)
+
+
+def test_strict_mode_from_environment(monkeypatch):
+    monkeypatch.setenv(task1.solution.STRICT_MODE_ENVIRONMENT_VARIABLE, " Sample ")
+    monkeypatch.setenv(task1.solution.STRICT_SAMPLE_RATE_ENVIRONMENT_VARIABLE, "10")
+    assert task1.solution._read_strict_mode_from_environment() == ("sample", 10)
+
+    monkeypatch.setenv(task1.solution.STRICT_MODE_ENVIRONMENT_VARIABLE, "on")
+    with pytest.raises(ValueError):
+        task1.solution._read_strict_mode_from_environment()
+
+
+@pytest.mark.parametrize("sample_rate", ("ten", "0", ""))
+def test_strict_sample_rate_from_environment_invalid(monkeypatch, sample_rate):
+    monkeypatch.setenv(
+        task1.solution.STRICT_SAMPLE_RATE_ENVIRONMENT_VARIABLE, sample_rate
+    )
+    monkeypatch.setenv(task1.solution.STRICT_MODE_ENVIRONMENT_VARIABLE, "full")
+    assert task1.solution._read_strict_mode_from_environment() == (
+        "full",
+        task1.solution.DEFAULT_STRICT_SAMPLE_RATE,
+    )
+
+    monkeypatch.setenv(task1.solution.STRICT_MODE_ENVIRONMENT_VARIABLE, "sample")
+    with pytest.warns(RuntimeWarning):
+        assert task1.solution._read_strict_mode_from_environment() == (
+            "sample",
+            task1.solution.DEFAULT_STRICT_SAMPLE_RATE,
+        )
+
+
+def test_strict_disabled_from_environment(monkeypatch):
+    monkeypatch.setattr(task1.solution, "_strict_disabled", True)
+
+    def foo(a: int):
+        pass
+
+    assert strict(foo) is foo
+
+
+def test_strict_map():
+    T = TypeVar("T")
+    Ts = TypeVarTuple("Ts")
+
+    @strict
+    def foo(a: int, b: T, c: T, *args: *Ts):
+        return a, b, c, args
+
+    assert task1.solution.strict_map(
+        foo, [1, True], ("2", 2.5), iter(("3", 3.5)), [4, "5"]
+    ) == [(1, "2", "3", (4,)), (True, 2.5, 3.5, ("5",))]
+    assert task1.solution.strict_map(foo, [], [], []) == []
+
+
+@pytest.mark.parametrize(
+    "columns, invalid_row, invalid_argument",
+    (
+        (([1, 2, "3"], [1, 1, 1], [1, 1, 1]), 2, "'a'"),
+        (([1, 2, 3], [1, "2", "3"], [1, "2", 3]), 2, "'c'"),
+        (([1, 2, 3], [1, "2", 3.0], [1, 2, 3.0]), 1, "'c'"),
+        (([1, 2], [1, [2]], [1, [2]]), 1, "'b'"),
+        (([1, 2], [1, 2], [1, 2], [1, 2], [3, [4]]), 1, r"'args\[1\]'"),
+    ),
+)
+def test_validate_batch_invalid(columns, invalid_row, invalid_argument):
+    T = TypeVar("T")
+    Ts = TypeVarTuple("Ts")
+
+    @strict
+    def foo(a: int, b: T, c: T, *args: *Ts):
+        pass
+
+    with pytest.raises(TypeError, match=f"^Row {invalid_row}: .*{invalid_argument}"):
+        task1.solution.validate_batch(foo, *columns)
+
+
+def test_validate_batch_invalid_columns():
+    @strict
+    def foo(a: int, b: int):
+        pass
+
+    with pytest.raises(ValueError):
+        task1.solution.validate_batch(foo, [1, 2], [1])
+    with pytest.raises(ValueError):
+        task1.solution.validate_batch(foo)
+    with pytest.raises(TypeError):
+        task1.solution.validate_batch(foo, [1, 2])
+    with pytest.raises(TypeError):
+        task1.solution.validate_batch(foo.__wrapped__, [1], [2])
+
+
+def test_lazy_forward_reference():
+    @strict(lazy=True)
+    def foo(a: "LaterAlias", b: int) -> None:
+        return a
+
+    global LaterAlias
+    LaterAlias = str
+    try:
+        assert foo("1", 2) == "1"
+        with pytest.raises(TypeError):
+            foo(1, 2)
+    finally:
+        del LaterAlias
+
+
+@pytest.mark.parametrize("invalid_type", INVALID_TYPES)
+def test_lazy_invalid_annotation(invalid_type):
+    @strict(lazy=True)
+    def foo(a: invalid_type):
+        pass
+
+    with pytest.raises(TypeError):
+        task1.solution.warm_up(foo)
+    with pytest.raises(TypeError):
+        foo(INVALID_EXAMPLES[invalid_type])
+
+
+def test_lazy_warm_up():
+    T = TypeVar("T")
+
+    @strict(lazy=True)
+    def foo(a: int, b: T, c: T):
+        return a, b, c
+
+    task1.solution.warm_up(foo)
+    assert foo(1, "2", "3") == (1, "2", "3")
+    assert foo(1, c=2, b=3) == (1, 3, 2)
+    with pytest.raises(TypeError):
+        foo(1, "2", 3)
+    with pytest.raises(TypeError, match="^Row 1: "):
+        task1.solution.validate_batch(foo, [1, 2], [1, 2], [1, "2"])
+
+    with pytest.raises(TypeError):
+        task1.solution.warm_up(foo.__wrapped__)
+
+
+def test_parameters_without_inspect():
+    def foo(a, b=1, /, c=2, *args, d, e=3, **kwargs):
+        pass
+
+    def bar(a, *, b):
+        pass
+
+    for func in (foo, bar, lambda: None, lambda *args: None):
+        assert task1.solution._get_parameters(func) == tuple(
+            task1.solution._Parameter(
+                parameter.name,
+                parameter.kind,
+                parameter.default is not parameter.empty,
+                None if parameter.default is parameter.empty else parameter.default,
+            )
+            for parameter in inspect.signature(func).parameters.values()
+        )
+
+
+def test_stats(restore_strict_mode):
+    T = TypeVar("T")
+
+    @strict(stats=True)
+    def foo(a: int, b: T, c: T):
+        pass
+
+    task1.solution.reset_strict_stats()
+    foo(1, "2", "3")
+    foo(1, c=2, b=3)
+    for args in ((1, "2", 3), ("1", 2, 3), (1, 2.5, 3)):
+        with pytest.raises(TypeError):
+            foo(*args)
+    task1.solution.set_strict_mode("off")
+    foo("1", 2, 3)
+
+    stats = task1.solution.get_strict_stats()[f"{__name__}.{foo.__qualname__}"]
+    assert stats["calls"] == 6
+    assert stats["validated_calls"] == 5
+    assert stats["rejections"] == 3
+    assert stats["rejections_by_argument"] == {"a": 1, "c": 2}
+    assert stats["validation_time_ns"] > 0
+
+    task1.solution.reset_strict_stats()
+    stats = task1.solution.get_strict_stats()[f"{__name__}.{foo.__qualname__}"]
+    assert stats == task1.solution.StrictStats().as_dict()
+
+
+def test_stats_disabled():
+    @strict
+    def foo(a: int):
+        pass
+
+    foo(1)
+    assert f"{__name__}.{foo.__qualname__}" not in task1.solution.get_strict_stats()
+
+
+def test_error_hook():
+    @strict
+    def foo(a: int, b: str):
+        pass
+
+    errors = []
+    task1.solution.set_strict_error_hook(
+        lambda func, error: errors.append((func, error))
+    )
+    try:
+        foo(1, "2")
+        with pytest.raises(TypeError) as error_info:
+            foo(1, 2)
+        with pytest.raises(TypeError):
+            foo(1)
+    finally:
+        task1.solution.set_strict_error_hook(None)
+    assert errors == [(foo.__wrapped__, error_info.value)]
+
+
+def test_strict_map_stats_and_error_hook(restore_strict_mode):
+    @strict(stats=True)
+    def foo(a: int, b: str):
+        pass
+
+    task1.solution.reset_strict_stats()
+    errors = []
+    task1.solution.set_strict_error_hook(
+        lambda func, error: errors.append((func, error))
+    )
+    try:
+        task1.solution.strict_map(foo, [1, 2], ["1", "2"])
+        with pytest.raises(TypeError) as error_info:
+            task1.solution.strict_map(foo, [1, 2, 3], ["1", 2, "3"])
+        task1.solution.set_strict_mode("off")
+        task1.solution.strict_map(foo, [1], [2])
+    finally:
+        task1.solution.set_strict_error_hook(None)
+    assert errors == [(foo.__wrapped__, error_info.value)]
+    stats = task1.solution.get_strict_stats()[f"{__name__}.{foo.__qualname__}"]
+    assert stats["calls"] == 6
+    assert stats["validated_calls"] == 5
+    assert stats["rejections"] == 1
+    assert stats["rejections_by_argument"] == {"b": 1}
+
+
+def test_strict_map_check_return():
+    T = TypeVar("T")
+
+    @strict(check_return=True)
+    def foo(a: T, b: int) -> T:
+        return a if b else str(a)
+
+    @strict(check_return=True)
+    async def bar(a: int) -> int:
+        return a if a else str(a)
+
+    assert task1.solution.strict_map(foo, [1, 2.5], [1, 1]) == [1, 2.5]
+    with pytest.raises(TypeError, match="^TypeVar return value"):
+        task1.solution.strict_map(foo, [1, 2.5], [1, 0])
+    coroutines = task1.solution.strict_map(bar, [1, 0])
+    assert asyncio.run(coroutines[0]) == 1
+    with pytest.raises(TypeError):
+        asyncio.run(coroutines[1])
+
+
+def test_strict_class():
+    T = TypeVar("T")
+
+    @strict_class
+    class Foo:
+        __slots__ = ("_a",)
+
+        def __init__(self, a: int):
+            self._a = a
+
+        def __repr__(self) -> str:
+            return f"Foo({self._a})"
+
+        def add(self: Self, b: T, c: T):
+            return self._a + b + c
+
+        def unannotated(self, b):
+            return b
+
+        @classmethod
+        def create(cls, a: int):
+            return cls(a)
+
+        @staticmethod
+        def double(a: int):
+            return 2 * a
+
+        @property
+        def a(self) -> int:
+            return self._a
+
+        @a.setter
+        def a(self, a: int):
+            self._a = a
+
+    foo = Foo.create(1)
+    assert foo.add(2, 3) == 6
+    assert foo.add(2.5, c=3.5) == 7
+    assert Foo.double(2) == 4
+    assert foo.unannotated([1]) == [1]
+    assert repr(foo) == "Foo(1)"
+    foo.a = 3
+    assert foo.a == 3
+
+    for call in (
+        lambda: Foo("1"),
+        lambda: foo.add(2, 3.5),
+        lambda: Foo.create(1.5),
+        lambda: foo.double("2"),
+    ):
+        with pytest.raises(TypeError):
+            call()
+    with pytest.raises(TypeError):
+        foo.a = "3"
+    assert foo.a == 3
+
+
+def test_strict_class_already_decorated():
+    @strict_class
+    class Foo:
+        @strict(skip_first_argument=True)
+        def foo(self, a: int):
+            return a
+
+    assert not hasattr(Foo.foo.__wrapped__, "__wrapped__")
+    with pytest.raises(TypeError):
+        Foo().foo("1")
+
+
+def test_coroutine_function():
+    @strict
+    async def foo(a: int, b: str):
+        return a, b
+
+    assert inspect.iscoroutinefunction(foo)
+    assert asyncio.run(foo(1, "2")) == (1, "2")
+    with pytest.raises(TypeError):
+        foo(1, 2)
+
+
+def test_generator_function():
+    @strict
+    def foo(a: int, b: int):
+        yield from range(a, b)
+
+    @strict
+    async def bar(a: int, b: int):
+        for i in range(a, b):
+            yield i
+
+    async def collect(async_iterable):
+        return [i async for i in async_iterable]
+
+    assert list(foo(1, 3)) == [1, 2]
+    assert asyncio.run(collect(bar(1, 3))) == [1, 2]
+    with pytest.raises(TypeError):
+        foo(1, "3")
+    with pytest.raises(TypeError):
+        bar(1, "3")
+
+
+def test_check_return():
+    T = TypeVar("T")
+    U = TypeVar("U", int, str)
+
+    @strict(check_return=True)
+    def foo(a: int, b: float) -> int | str:
+        return b if b else a
+
+    @strict(check_return=True)
+    def bar(a: T, b: T) -> T:
+        return b if a else str(b)
+
+    @strict(check_return=True)
+    def baz(a: bool) -> U:
+        return 1 if a else 1.25
+
+    @strict(check_return=True)
+    def qux(a: bool) -> None:
+        return None if a else a
+
+    @strict
+    def unchecked(a: int) -> str:
+        return a
+
+    assert foo(1, 0.0) == 1
+    assert bar(1, 2) == 2
+    assert baz(True) == 1
+    assert qux(True) is None
+    assert unchecked(1) == 1
+    for call in (
+        lambda: foo(1, 1.25),
+        lambda: bar(0, 2),
+        lambda: baz(False),
+        lambda: qux(False),
+    ):
+        with pytest.raises(TypeError, match="^(TypeVar r|R)eturn value"):
+            call()
+
+
+def test_check_return_coroutine_function():
+    @strict(check_return=True)
+    async def foo(a: int) -> str:
+        return str(a) if a else a
+
+    assert inspect.iscoroutinefunction(foo)
+    assert asyncio.run(foo(1)) == "1"
+    with pytest.raises(TypeError):
+        asyncio.run(foo(0))
+
+
+def test_check_return_generator_function():
+    @strict(check_return=True)
+    def foo(a: int) -> Iterator[int]:
+        yield a
+
+    @strict(check_return=True)
+    def bar(a: int) -> Generator[int, None, str]:
+        yield a
+        return str(a)
+
+    @strict(check_return=True)
+    async def baz(a: int) -> AsyncIterator[int]:
+        yield a
+
+    async def collect(items):
+        return [item async for item in items]
+
+    assert list(foo(1)) == [1]
+    assert list(bar(1)) == [1]
+    assert asyncio.run(collect(baz(1))) == [1]
+    for call in (lambda: foo("1"), lambda: bar("1"), lambda: baz("1")):
+        with pytest.raises(TypeError):
+            call()
+
+
+def test_strict_class_check_return_generator_method():
+    @strict_class(check_return=True)
+    class Foo:
+        def items(self, a: int) -> Iterator[int]:
+            yield a
+
+        async def async_items(self, a: int) -> AsyncIterator[int]:
+            yield a
+
+    async def collect(items):
+        return [item async for item in items]
+
+    assert list(Foo().items(1)) == [1]
+    assert asyncio.run(collect(Foo().async_items(1))) == [1]
+    with pytest.raises(TypeError):
+        Foo().items("1")
+
+
+def test_check_return_stats():
+    @strict(check_return=True, stats=True)
+    def foo(a: int) -> int:
+        return a if a else str(a)
+
+    foo(1)
+    with pytest.raises(TypeError):
+        foo(0)
+    stats = task1.solution.get_strict_stats()[f"{__name__}.{foo.__qualname__}"]
+    assert stats["rejections_by_argument"] == {"return": 1}
+
+
+@pytest.mark.parametrize("invalid_type", INVALID_TYPES)
+def test_check_return_invalid_annotation(invalid_type):
+    def foo(a: int) -> invalid_type:
+        pass
+
+    strict(foo)
+    with pytest.raises(TypeError):
+        strict(foo, check_return=True)
@@ -0,0 +1,504 @@
+import asyncio
+import random
+import tempfile
+import time
+import tracemalloc
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    Iterable,
+)
+
+from task2.fake_api_for_task2 import FakeMediaWikiApi
+from task2.solution import (
+    CountingJob,
+    LetterFolding,
+    RequestScheduler,
+    ResponseCache,
+    _crawl_category_members,
+    _create_session,
+    _extend_letters_to_animals_count,
+    _MediaWikiClient,
+    _PageIdSet,
+    async_get_animals_count_for_each_letter,
+    async_get_animals_counts_for_each_letter,
+    async_update_category_snapshot,
+    create_sink,
+)
+
+
+RUSSIAN_LETTERS = "АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
+ENGLISH_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+WIKI_PAGE_TITLE = "Категория:Животные_по_алфавиту"
+
+
+def _generate_titles(titles_count: int) -> list[str]:
+    letters = RUSSIAN_LETTERS + ENGLISH_LETTERS
+    return [f"{letters[i % len(letters)]}{i}" for i in range(titles_count)]
+
+
+def _seconds(run: Callable[[], Coroutine[Any, Any, Any]]) -> float:
+    start = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - start
+
+
+def _print_results(title: str, results: dict[str, str]) -> None:
+    print(title)
+    for name, result in results.items():
+        print(f"    {name:<32}{result:>24}")
+
+
+def benchmark_partitioned_crawl() -> None:
+    titles_count = 20_000
+    page_size = 200
+    latency = 0.02
+    sort_key_prefixes = "".join(sorted(RUSSIAN_LETTERS + ENGLISH_LETTERS))
+    runs: list[tuple[str, dict[str, Any]]] = [("sequential", {})]
+    for concurrency in (4, 16, 64):
+        runs.append(
+            (
+                f"partitioned, concurrency {concurrency}",
+                {
+                    "partitioned": True,
+                    "concurrency": concurrency,
+                    "sort_key_prefixes": sort_key_prefixes,
+                },
+            )
+        )
+    results = {}
+    for name, kwargs in runs:
+
+        async def run() -> None:
+            async with FakeMediaWikiApi(
+                _generate_titles(titles_count), latency=latency, page_size=page_size
+            ) as fake_api:
+                await async_get_animals_count_for_each_letter(
+                    WIKI_PAGE_TITLE,
+                    RUSSIAN_LETTERS + ENGLISH_LETTERS,
+                    "benchmark-agent",
+                    "ru",
+                    api_url=fake_api.url,
+                    **kwargs,
+                )
+            requests_counts.append(fake_api.requests_count)
+
+        requests_counts: list[int] = []
+        seconds = _seconds(run)
+        results[name] = f"{seconds:.2f} s, {requests_counts[0]} requests"
+    _print_results(
+        f"Crawl of {titles_count} members, {page_size} per page, "
+        f"{latency * 1000:.0f} ms latency",
+        results,
+    )
+
+
+def benchmark_snapshot_update() -> None:
+    titles_count = 50_000
+    changes_count = 200
+    results = {}
+
+    async def run() -> None:
+        async with FakeMediaWikiApi(
+            _generate_titles(titles_count), latency=0.02
+        ) as fake_api:
+            start = time.perf_counter()
+            snapshot = await async_update_category_snapshot(
+                None, WIKI_PAGE_TITLE, "benchmark-agent", "ru", api_url=fake_api.url
+            )
+            results["full crawl"] = (
+                f"{time.perf_counter() - start:.2f} s, "
+                f"{snapshot.full_crawl_requests_count} requests"
+            )
+
+            for i in range(changes_count):
+                if i % 2:
+                    fake_api.add_member(f"Новый{i}")
+                else:
+                    fake_api.remove_member(i + 1)
+            start = time.perf_counter()
+            snapshot = await async_update_category_snapshot(
+                snapshot,
+                WIKI_PAGE_TITLE,
+                "benchmark-agent",
+                "ru",
+                api_url=fake_api.url,
+            )
+            results[f"delta, {changes_count} changes"] = (
+                f"{time.perf_counter() - start:.2f} s, "
+                f"{snapshot.last_update_requests_count} requests"
+            )
+
+    asyncio.run(run())
+    _print_results(
+        f"Snapshot of {titles_count} members, 500 per page, 20 ms latency", results
+    )
+
+
+def benchmark_streamed_response() -> None:
+    # A single page of a size the real API never returns, sent in 64 KiB chunks
+    titles_count = 100_000
+    titles = [f"{title} (животное)" for title in _generate_titles(titles_count)]
+    params = {
+        "action": "query",
+        "list": "categorymembers",
+        "cmtitle": WIKI_PAGE_TITLE,
+        "cmlimit": titles_count,
+        "format": "json",
+    }
+    results = {}
+    for streamed in (False, True):
+        first_count_seconds = 0.0
+
+        # Created beforehand to keep the server's members out of the heap peak
+        fake_api = FakeMediaWikiApi(
+            titles, page_size=titles_count, chunk_size=64 * 1024, chunk_delay=0.001
+        )
+
+        async def run(start: float) -> None:
+            async with fake_api:
+                async with _create_session("benchmark-agent", 60.0) as session:
+
+                    def on_categorymembers(categorymembers: Any) -> None:
+                        nonlocal first_count_seconds
+                        if not first_count_seconds:
+                            first_count_seconds = time.perf_counter() - start
+
+                    await _crawl_category_members(
+                        _MediaWikiClient(session, fake_api.url),
+                        params,
+                        on_categorymembers,
+                        streamed=streamed,
+                    )
+
+        seconds = _seconds(lambda: run(time.perf_counter()))
+        tracemalloc.start()
+        asyncio.run(run(time.perf_counter()))
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results["streamed" if streamed else "response.json()"] = (
+            f"first count {first_count_seconds:.3f} s, total {seconds:.2f} s, "
+            f"peak {peak_memory / 2**20:.1f} MiB"
+        )
+    _print_results(
+        f"Response of {titles_count} members, Python heap peak by tracemalloc",
+        results,
+    )
+
+
+def benchmark_response_cache() -> None:
+    titles_count = 20_000
+    latency = 0.02
+    results = {}
+    runs: list[tuple[str, dict[str, Any], dict[str, Any] | None]] = [
+        ("no cache", {}, None),
+        ("fresh cache", {}, {}),
+        ("stale cache, ETag", {"etags": True}, {"ttl": 0}),
+    ]
+    for name, fake_api_kwargs, cache_kwargs in runs:
+        cache = None if cache_kwargs is None else ResponseCache(**cache_kwargs)
+
+        async def run() -> None:
+            async with FakeMediaWikiApi(
+                _generate_titles(titles_count), latency=latency, **fake_api_kwargs
+            ) as fake_api:
+                for run_name in ("first run", "second run"):
+                    requests_count = fake_api.requests_count
+                    start = time.perf_counter()
+                    await async_get_animals_count_for_each_letter(
+                        WIKI_PAGE_TITLE,
+                        RUSSIAN_LETTERS + ENGLISH_LETTERS,
+                        "benchmark-agent",
+                        "ru",
+                        api_url=fake_api.url,
+                        cache=cache,
+                    )
+                    results[f"{name}, {run_name}"] = (
+                        f"{time.perf_counter() - start:.2f} s, "
+                        f"{fake_api.requests_count - requests_count} requests"
+                    )
+
+        asyncio.run(run())
+        if cache is not None:
+            cache.close()
+    _print_results(
+        f"Two crawls of {titles_count} members, 500 per page, "
+        f"{latency * 1000:.0f} ms latency",
+        results,
+    )
+
+
+def benchmark_batch() -> None:
+    titles_count = 5_000
+    latency = 0.02
+    languages = ("ru", "en", "uk", "de")
+    categories_count = 4
+    letters = RUSSIAN_LETTERS + ENGLISH_LETTERS
+    jobs = [
+        CountingJob(language, f"{WIKI_PAGE_TITLE}_{i}", letters)
+        for language in languages
+        for i in range(categories_count)
+    ]
+    results = {}
+
+    async def run(batched: bool) -> None:
+        async with AsyncExitStack() as stack:
+            api_urls = {}
+            for language in languages:
+                fake_api = await stack.enter_async_context(
+                    FakeMediaWikiApi(
+                        _generate_titles(titles_count), latency=latency, page_size=200
+                    )
+                )
+                api_urls[language] = fake_api.url
+            start = time.perf_counter()
+            if batched:
+                await async_get_animals_counts_for_each_letter(
+                    jobs, "benchmark-agent", api_urls=api_urls, partitioned=True
+                )
+            else:
+                for job in jobs:
+                    await async_get_animals_count_for_each_letter(
+                        job.wiki_page_title,
+                        job.letters,
+                        "benchmark-agent",
+                        job.wiki_page_language,
+                        api_url=api_urls[job.wiki_page_language],
+                        partitioned=True,
+                    )
+            results["batch" if batched else "one call per job"] = (
+                f"{time.perf_counter() - start:.2f} s"
+            )
+
+    asyncio.run(run(False))
+    asyncio.run(run(True))
+    _print_results(
+        f"{len(jobs)} jobs on {len(languages)} hosts, {titles_count} members each, "
+        f"{latency * 1000:.0f} ms latency",
+        results,
+    )
+
+
+def benchmark_request_scheduler() -> None:
+    # Every 10th request is throttled, every 4th one is slow
+    titles_count = 20_000
+    page_size = 100
+    runs: list[tuple[str, dict[str, Any]]] = [
+        ("retries only", {"max_concurrency": 32}),
+        ("adaptive concurrency", {"max_concurrency": 32, "target_latency": 0.05}),
+        ("rate 100/s, burst 10", {"max_concurrency": 32, "rate": 100, "burst": 10}),
+    ]
+    results = {}
+    for name, scheduler_kwargs in runs:
+        scheduler = RequestScheduler(backoff_base=0.05, **scheduler_kwargs)
+
+        async def run() -> None:
+            async with FakeMediaWikiApi(
+                _generate_titles(titles_count),
+                latency=0.02,
+                page_size=page_size,
+                throttle_every=10,
+                retry_after="0.1",
+                slow_every=4,
+                slow_latency=0.1,
+            ) as fake_api:
+                await async_get_animals_count_for_each_letter(
+                    WIKI_PAGE_TITLE,
+                    RUSSIAN_LETTERS + ENGLISH_LETTERS,
+                    "benchmark-agent",
+                    "ru",
+                    api_url=fake_api.url,
+                    partitioned=True,
+                    sort_key_prefixes="".join(
+                        sorted(RUSSIAN_LETTERS + ENGLISH_LETTERS)
+                    ),
+                    concurrency=32,
+                    scheduler=scheduler,
+                )
+            requests_counts.append(fake_api.requests_count)
+
+        requests_counts: list[int] = []
+        seconds = _seconds(run)
+        results[name] = (
+            f"{seconds:.2f} s, {requests_counts[0]} requests, "
+            f"{scheduler.retries_count} retries, "
+            f"final concurrency {scheduler.concurrency}"
+        )
+    _print_results(
+        f"Crawl of {titles_count} members, {page_size} per page, with 429s and "
+        "slow responses",
+        results,
+    )
+
+
+def benchmark_seen_page_ids() -> None:
+    # Page IDs of ruwiki are below 12 million
+    page_ids_count = 2_000_000
+    page_ids = random.Random(0).sample(range(12_000_000), page_ids_count)
+    results = {}
+    for name, create_seen_page_ids in (
+        ("set", set),
+        ("bitmap", _PageIdSet),
+    ):
+        start = time.perf_counter()
+        seen_page_ids: set[int] | _PageIdSet = create_seen_page_ids()
+        for page_id in page_ids:
+            seen_page_ids.add(page_id)
+        seconds = time.perf_counter() - start
+        del seen_page_ids
+        tracemalloc.start()
+        seen_page_ids = create_seen_page_ids()
+        for page_id in page_ids:
+            seen_page_ids.add(page_id)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del seen_page_ids
+        results[name] = f"{seconds:.2f} s, {memory / 2**20:.1f} MiB"
+    _print_results(
+        f"{page_ids_count} random page IDs below 12 million, "
+        "memory traced by tracemalloc",
+        results,
+    )
+
+
+def benchmark_recursive_crawl() -> None:
+    # A tree of subcategories, 3 levels deep, with pages repeated in branches
+    branching = 4
+    pages_per_category = 2_000
+    titles = _generate_titles(pages_per_category)
+    subcategories: dict[str, list[str]] = {}
+    level = ["Категория:0"]
+    for depth in range(3):
+        next_level = []
+        for category_title in level:
+            children = [f"{category_title}.{i}" for i in range(branching)]
+            subcategories[category_title] = [
+                *children,
+                *random.Random(category_title).sample(titles, pages_per_category // 2),
+                *(f"Вид {category_title}-{i}" for i in range(pages_per_category // 2)),
+            ]
+            next_level.extend(children)
+        level = next_level
+    for category_title in level:
+        subcategories[category_title] = [f"Вид {category_title}-{i}" for i in range(10)]
+    results = {}
+    for concurrency in (1, 8, 32):
+        fake_api = FakeMediaWikiApi(
+            ["Категория:0"], latency=0.02, subcategories=subcategories
+        )
+
+        async def run() -> None:
+            async with fake_api:
+                await async_get_animals_count_for_each_letter(
+                    WIKI_PAGE_TITLE,
+                    RUSSIAN_LETTERS + ENGLISH_LETTERS,
+                    "benchmark-agent",
+                    "ru",
+                    api_url=fake_api.url,
+                    recursive=True,
+                    concurrency=concurrency,
+                )
+
+        seconds = _seconds(run)
+        results[f"concurrency {concurrency}"] = (
+            f"{seconds:.2f} s, {fake_api.requests_count} requests"
+        )
+    _print_results(
+        f"Recursive crawl of {len(subcategories)} categories, 20 ms latency", results
+    )
+
+
+def _extend_letters_to_animals_count_in_loop(
+    letters_to_animals_count: dict[str, int], animal_names: Iterable[str]
+) -> None:
+    # The original exact match of the first letter
+    for animal_name in animal_names:
+        if animal_name:
+            if (first_letter := animal_name[0]) in letters_to_animals_count:
+                letters_to_animals_count[first_letter] += 1
+
+
+def benchmark_letters_counting() -> None:
+    titles_count = 3_000_000
+    page_size = 500
+    letters = RUSSIAN_LETTERS + ENGLISH_LETTERS
+    titles = [f"{title} (животное)" for title in _generate_titles(titles_count)]
+    # Pages are sorted by sort key, like the API returns them
+    unsorted_pages = [
+        titles[i : i + page_size] for i in range(0, titles_count, page_size)
+    ]
+    titles.sort()
+    pages = [titles[i : i + page_size] for i in range(0, titles_count, page_size)]
+    results = {}
+    for name, extend in (
+        ("loop", _extend_letters_to_animals_count_in_loop),
+        (
+            "table, exact",
+            lambda counts, page: _extend_letters_to_animals_count(
+                counts, page, LetterFolding(casefold=False, normalization=None)
+            ),
+        ),
+        (
+            "table, case folded",
+            lambda counts, page: _extend_letters_to_animals_count(
+                counts, page, LetterFolding(normalization=None)
+            ),
+        ),
+        (
+            "table, NFC, case folded",
+            lambda counts, page: _extend_letters_to_animals_count(counts, page),
+        ),
+    ):
+        letters_to_animals_count = dict.fromkeys(letters, 0)
+        start = time.perf_counter()
+        for page in pages:
+            extend(letters_to_animals_count, page)
+        results[name] = f"{time.perf_counter() - start:.2f} s"
+    for name, extend in (
+        ("loop, unsorted pages", _extend_letters_to_animals_count_in_loop),
+        ("table, NFC, unsorted pages", _extend_letters_to_animals_count),
+    ):
+        letters_to_animals_count = dict.fromkeys(letters, 0)
+        start = time.perf_counter()
+        for page in unsorted_pages:
+            extend(letters_to_animals_count, page)
+        results[name] = f"{time.perf_counter() - start:.2f} s"
+    _print_results(
+        f"Counting of {titles_count} titles in pages of {page_size}", results
+    )
+
+
+def benchmark_sinks() -> None:
+    jobs_count = 2000
+    letters = RUSSIAN_LETTERS + ENGLISH_LETTERS
+    letters_to_animals_count = dict.fromkeys(letters, 1000)
+    jobs = [CountingJob("ru", f"Категория:{i}", letters) for i in range(jobs_count)]
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for suffix in (".csv", ".jsonl", ".sqlite"):
+            for batch_size in (10, 100, 1000):
+                path = Path(temp_dir) / f"beasts_{batch_size}{suffix}"
+                start = time.perf_counter()
+                with create_sink(path, batch_size) as sink:
+                    for job in jobs:
+                        sink.append(job, letters_to_animals_count)
+                results[f"{suffix[1:]}, batches of {batch_size}"] = (
+                    f"{time.perf_counter() - start:.2f} s"
+                )
+    _print_results(f"Appending counts of {jobs_count} jobs", results)
+
+
+if __name__ == "__main__":
+    benchmark_partitioned_crawl()
+    benchmark_snapshot_update()
+    benchmark_streamed_response()
+    benchmark_response_cache()
+    benchmark_batch()
+    benchmark_request_scheduler()
+    benchmark_seen_page_ids()
+    benchmark_recursive_crawl()
+    benchmark_letters_counting()
+    benchmark_sinks()
@@ -0,0 +1,375 @@
+import asyncio
+import hashlib
+import json
+from bisect import bisect_left
+from datetime import (
+    datetime,
+    timedelta,
+)
+from types import TracebackType
+from typing import (
+    Any,
+    Iterable,
+    Mapping,
+    Self,
+)
+
+from aiohttp import web
+
+
+START_TIME = datetime(2025, 1, 1)
+CATEGORY_NAMESPACE = 14
+CATEGORY_PREFIX = "Категория:"
+
+
+# Local stand-in for the MediaWiki Action API, enough of it for the task2 crawler:
+# `list=categorymembers` with sort key prefix ranges, `list=recentchanges` of the
+# categorization type, `list=logevents`, `prop=categories` and `curtimestamp`.
+# Category members are sorted by sort key, which is the upper-cased title. Every
+# change of the category advances the server clock by a second. Responses are
+# written without escaping non-ASCII characters, like with `utf8=1`. Members of
+# `subcategories` are only listed, and pages with the same title have the same ID
+# in all the categories
+class FakeMediaWikiApi:
+    def __init__(
+        self,
+        titles: Iterable[str],
+        *,
+        latency: float = 0.0,
+        page_size: int = 500,
+        chunk_size: int = 0,
+        chunk_delay: float = 0.0,
+        etags: bool = False,
+        max_requests_count: int | None = None,
+        error_status: int | None = None,
+        throttle_every: int = 0,
+        lag_every: int = 0,
+        retry_after: str | None = None,
+        slow_every: int = 0,
+        slow_latency: float = 0.0,
+        subcategories: Mapping[str, Iterable[str]] | None = None,
+        wiki_page_title: str = "Категория:Животные_по_алфавиту",
+    ) -> None:
+        self.wiki_page_title = wiki_page_title
+        self.latency = latency
+        self.page_size = page_size
+        # With `chunk_size` responses are sent in chunks, `chunk_delay` apart
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        # With `etags` responses have an ETag, and "304 Not Modified" is returned
+        # when it matches If-None-Match
+        self.etags = etags
+        # Requests beyond `max_requests_count` fail with an API error, or with an
+        # HTML page with the `error_status` status, like from a proxy, if given
+        self.max_requests_count = max_requests_count
+        self.error_status = error_status
+        # Every `throttle_every`-th request gets "429 Too Many Requests", every
+        # `lag_every`-th one with `maxlag` a maxlag error, both with `retry_after`
+        # in Retry-After, and every `slow_every`-th one takes `slow_latency` more
+        self.throttle_every = throttle_every
+        self.lag_every = lag_every
+        self.retry_after = retry_after
+        self.slow_every = slow_every
+        self.slow_latency = slow_latency
+        self.throttled_count = 0
+        self.lagged_count = 0
+        self.requests_count = 0
+        self.not_modified_count = 0
+        self.active_requests_count = 0
+        self.max_active_requests_count = 0
+        self.url = ""
+        self.now = START_TIME
+        # Page ID to title, for the existing pages only
+        self.pages: dict[int, str] = {}
+        self.category_page_ids: set[int] = set()
+        self.revisions_page_ids: dict[int, int] = {}
+        self.recent_changes: list[dict[str, Any]] = []
+        self.log_events: list[dict[str, Any]] = []
+        for title in titles:
+            page_id = len(self.pages) + 1
+            self.pages[page_id] = title
+            self.category_page_ids.add(page_id)
+        self._update_members()
+        self.subcategories: dict[str, tuple[list[dict[str, Any]], list[str]]] = {}
+        page_ids = {title: page_id for page_id, title in self.pages.items()}
+
+        def get_page_id(title: str) -> int:
+            if title not in page_ids:
+                page_ids[title] = len(self.pages) + 1
+                self.pages[page_ids[title]] = title
+            return page_ids[title]
+
+        for subcategory_title, subcategory_titles in (subcategories or {}).items():
+            members = sorted(
+                (self._get_member(get_page_id(title)) for title in subcategory_titles),
+                key=self.get_sort_key,
+            )
+            self.subcategories[subcategory_title] = (
+                members,
+                [self.get_sort_key(member) for member in members],
+            )
+        self._runner: web.AppRunner | None = None
+
+    @staticmethod
+    def get_sort_key(member: Mapping[str, Any]) -> str:
+        return str(member["title"]).upper()
+
+    def _get_member(self, page_id: int) -> dict[str, Any]:
+        title = self.pages[page_id]
+        ns = CATEGORY_NAMESPACE if title.startswith(CATEGORY_PREFIX) else 0
+        return {"pageid": page_id, "ns": ns, "title": title}
+
+    def _update_members(self) -> None:
+        self.members = sorted(
+            map(self._get_member, self.category_page_ids), key=self.get_sort_key
+        )
+        self.sort_keys = [self.get_sort_key(member) for member in self.members]
+
+    def _get_timestamp(self) -> str:
+        return self.now.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def _tick(self) -> str:
+        self.now += timedelta(seconds=1)
+        return self._get_timestamp()
+
+    def _categorize(self, page_id: int) -> None:
+        rev_id = len(self.revisions_page_ids) + 1
+        self.revisions_page_ids[rev_id] = page_id
+        self.recent_changes.append(
+            {"type": "categorize", "revid": rev_id, "timestamp": self._tick()}
+        )
+        self._update_members()
+
+    def add_member(self, title: str) -> int:
+        page_id = max(self.pages, default=0) + 1
+        self.pages[page_id] = title
+        self.category_page_ids.add(page_id)
+        self._categorize(page_id)
+        return page_id
+
+    def remove_member(self, page_id: int) -> None:
+        self.category_page_ids.discard(page_id)
+        self._categorize(page_id)
+
+    def delete_page(self, page_id: int) -> None:
+        title = self.pages.pop(page_id)
+        self.category_page_ids.discard(page_id)
+        self.log_events.append(
+            {
+                "type": "delete",
+                "logpage": page_id,
+                "title": title,
+                "params": {},
+                "timestamp": self._tick(),
+            }
+        )
+        self._update_members()
+
+    def move_page(self, page_id: int, title: str) -> None:
+        self.log_events.append(
+            {
+                "type": "move",
+                "logpage": page_id,
+                "title": self.pages[page_id],
+                "params": {"target_ns": 0, "target_title": title},
+                "timestamp": self._tick(),
+            }
+        )
+        self.pages[page_id] = title
+        self._update_members()
+
+    async def __aenter__(self) -> Self:
+        app = web.Application()
+        app.router.add_get("/w/api.php", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", 0).start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}/w/api.php"
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        self.requests_count += 1
+        self.active_requests_count += 1
+        self.max_active_requests_count = max(
+            self.max_active_requests_count, self.active_requests_count
+        )
+        try:
+            return await self._handle(request)
+        finally:
+            self.active_requests_count -= 1
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        request_number = self.requests_count
+
+        def is_every(every: int) -> bool:
+            return bool(every) and request_number % every == 0
+
+        latency = self.latency
+        if is_every(self.slow_every):
+            latency += self.slow_latency
+        if latency:
+            await asyncio.sleep(latency)
+        params = request.query
+        retry_headers = (
+            {} if self.retry_after is None else {"Retry-After": self.retry_after}
+        )
+        if is_every(self.throttle_every):
+            self.throttled_count += 1
+            return web.Response(status=429, headers=retry_headers)
+        if (
+            self.error_status is not None
+            and self.max_requests_count is not None
+            and self.requests_count > self.max_requests_count
+        ):
+            return web.Response(
+                status=self.error_status,
+                text="<html><body>Bad Gateway</body></html>",
+                content_type="text/html",
+            )
+        raw: dict[str, Any]
+        headers = {}
+        if "maxlag" in params and is_every(self.lag_every):
+            self.lagged_count += 1
+            raw = {"error": {"code": "maxlag", "info": "Waiting for a replica"}}
+            headers.update(retry_headers)
+            headers["MediaWiki-API-Error"] = "maxlag"
+        elif (
+            self.max_requests_count is not None
+            and self.requests_count > self.max_requests_count
+        ):
+            raw = {"error": {"code": "internal_api_error", "info": "Request failed"}}
+        elif params.get("list") == "categorymembers":
+            raw = self.get_category_members(params)
+        elif params.get("list") == "recentchanges":
+            raw = self.get_recent_changes(params)
+        elif params.get("list") == "logevents":
+            raw = self.get_log_events(params)
+        elif params.get("prop") == "categories":
+            raw = self.get_categories(params)
+        elif params.get("action") == "query":
+            raw = {"batchcomplete": ""}
+        else:
+            raw = {"error": {"code": "badvalue", "info": "Unsupported request"}}
+        if params.get("curtimestamp"):
+            raw["curtimestamp"] = self._get_timestamp()
+        body = json.dumps(raw, ensure_ascii=False).encode()
+        if self.etags:
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if request.headers.get("If-None-Match") == etag:
+                self.not_modified_count += 1
+                return web.Response(status=304, headers={"ETag": etag})
+            headers["ETag"] = etag
+        if not self.chunk_size:
+            return web.Response(
+                body=body, content_type="application/json", headers=headers
+            )
+
+        response = web.StreamResponse(headers=headers)
+        response.content_type = "application/json"
+        await response.prepare(request)
+        for i in range(0, len(body), self.chunk_size):
+            await response.write(body[i : i + self.chunk_size])
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+        await response.write_eof()
+        return response
+
+    def _get_page(
+        self,
+        items: list[dict[str, Any]],
+        params: Mapping[str, str],
+        prefix: str,
+        start: int = 0,
+        end: int | None = None,
+    ) -> tuple[list[dict[str, Any]], dict[str, str] | None]:
+        # The continuation token is the index of the next item
+        end = len(items) if end is None else end
+        offset = int(params.get(f"{prefix}continue", start))
+        limit = min(int(params.get(f"{prefix}limit", 10)), self.page_size)
+        if offset + limit < end:
+            return items[offset : offset + limit], {
+                f"{prefix}continue": str(offset + limit),
+                "continue": "-||",
+            }
+        return items[offset:end], None
+
+    def _get_response(
+        self, name: str, items: list[dict[str, Any]], continue_: dict[str, str] | None
+    ) -> dict[str, Any]:
+        raw: dict[str, Any] = {"batchcomplete": "", "query": {name: items}}
+        if continue_ is not None:
+            raw["continue"] = continue_
+        return raw
+
+    def get_category_members(self, params: Mapping[str, str]) -> dict[str, Any]:
+        members, sort_keys = self.subcategories.get(
+            params.get("cmtitle", "").replace("_", " "), (self.members, self.sort_keys)
+        )
+        start = bisect_left(sort_keys, params.get("cmstartsortkeyprefix", "").upper())
+        end = (
+            bisect_left(sort_keys, end_prefix.upper())
+            if (end_prefix := params.get("cmendsortkeyprefix"))
+            else len(members)
+        )
+        return self._get_response(
+            "categorymembers", *self._get_page(members, params, "cm", start, end)
+        )
+
+    def get_recent_changes(self, params: Mapping[str, str]) -> dict[str, Any]:
+        recent_changes = [
+            {"ns": 14, "title": self.wiki_page_title, **recent_change}
+            for recent_change in self.recent_changes
+            if recent_change["timestamp"] >= params.get("rcstart", "")
+            and params.get("rctitle") == self.wiki_page_title
+        ]
+        return self._get_response(
+            "recentchanges", *self._get_page(recent_changes, params, "rc")
+        )
+
+    def get_log_events(self, params: Mapping[str, str]) -> dict[str, Any]:
+        log_events = [
+            {"ns": 0, **log_event}
+            for log_event in self.log_events
+            if log_event["timestamp"] >= params.get("lestart", "")
+            and log_event["type"] == params.get("letype")
+        ]
+        return self._get_response(
+            "logevents", *self._get_page(log_events, params, "le")
+        )
+
+    def get_categories(self, params: Mapping[str, str]) -> dict[str, Any]:
+        pages: dict[str, Any] = {}
+        bad_rev_ids: dict[str, Any] = {}
+        for rev_id in map(int, params["revids"].split("|")):
+            page_id = self.revisions_page_ids.get(rev_id, 0)
+            if page_id not in self.pages:
+                bad_rev_ids[str(rev_id)] = {"revid": rev_id}
+                continue
+            page: dict[str, Any] = {
+                "pageid": page_id,
+                "ns": 0,
+                "title": self.pages[page_id],
+            }
+            if (
+                page_id in self.category_page_ids
+                and params.get("clcategories") == self.wiki_page_title
+            ):
+                page["categories"] = [{"ns": 14, "title": self.wiki_page_title}]
+            pages[str(page_id)] = page
+        raw: dict[str, Any] = {"batchcomplete": "", "query": {}}
+        if pages:
+            raw["query"]["pages"] = pages
+        if bad_rev_ids:
+            raw["query"]["badrevids"] = bad_rev_ids
+        return raw
@@ -1,80 +1,1765 @@
+import asyncio
+import base64
+import codecs
+import csv
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import unicodedata
+import zlib
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from bisect import bisect_right
+from contextlib import (
+    asynccontextmanager,
+    nullcontext,
+)
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from http import HTTPStatus
+from itertools import chain
 from typing import (
+    IO,
     Any,
+    AsyncIterator,
+    Callable,
     Iterable,
+    Iterator,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Self,
+)
+from urllib.parse import (
+    urlencode,
+    urlsplit,
 )
 
 import aiohttp
 import wikipediaapi
 
 
+DEFAULT_CONCURRENCY = 8
+FIRST_LETTERS_CACHE_SIZE = 65536
+CATEGORY_NAMESPACE = 14
+DEFAULT_BATCH_CONCURRENCY = 32
+DEFAULT_SINK_BATCH_SIZE = 100
+# How long Wikimedia wikis keep recent changes
+RECENT_CHANGES_MAX_AGE = timedelta(days=30)
+REV_IDS_BATCH_SIZE = 50
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_BATCH_SIZE = 50
+DEFAULT_CACHE_TTL = 24 * 60 * 60
+DEFAULT_CACHE_MAX_SIZE = 256 * 1024 * 1024
+# Responses to these change on every request
+_UNCACHEABLE_PARAMS = frozenset(("curtimestamp",))
+DEFAULT_CHECKPOINT_INTERVAL = 10
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_MAXLAG = 5
+_RETRYABLE_STATUSES = frozenset(
+    (
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.INTERNAL_SERVER_ERROR,
+        HTTPStatus.BAD_GATEWAY,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        HTTPStatus.GATEWAY_TIMEOUT,
+    )
+)
+# Codes of the API errors that go away by themselves, from the
+# MediaWiki-API-Error header
+_RETRYABLE_API_ERRORS = frozenset(("maxlag", "ratelimited"))
+
+
+# Rules of matching the first letters of titles to the counted letters
+class LetterFolding(NamedTuple):
+    # Lower case letters are counted as the upper case ones and vice versa
+    casefold: bool = True
+    # Normal form the titles are brought to, so that a letter with combining marks
+    # is counted like the precomposed one
+    normalization: Literal["NFC", "NFKC"] | None = "NFC"
+    # Letters counted as other letters, as pairs like ("Ё", "Е")
+    aliases: tuple[tuple[str, str], ...] = ()
+
+
+DEFAULT_LETTER_FOLDING = LetterFolding()
+
+# The greatest character, so a prefix followed by it is greater than the strings
+# with the prefix, except the ones continued with it
+_LAST_CHARACTER = chr(sys.maxunicode)
+
+
+# Counts titles by the first letter, batch by batch. The titles of a batch are
+# sorted, so the ones with the same beginning are adjacent and counted at once by
+# bisection, then each distinct beginning is matched to a counted letter, by the
+# translation table from first letters to counted letters. API pages are sorted
+# by sort key already, which makes sorting them almost free
+class _FirstLettersCounter:
+    __slots__ = ("_head_length", "_heads_counted_letters", "folding", "table")
+
+    def __init__(self, letters: str, folding: LetterFolding) -> None:
+        counted_letters = dict.fromkeys(letters, "")
+        for letter, counted_letter in folding.aliases:
+            if counted_letter not in counted_letters:
+                raise ValueError(
+                    f"Alias {letter!r} of an uncounted letter {counted_letter!r}"
+                )
+        first_letters_to_counted_letters = {
+            letter: letter for letter in counted_letters
+        }
+        first_letters_to_counted_letters.update(folding.aliases)
+
+        self.folding = folding
+        self.table: dict[int, str] = {}
+        for first_letter, counted_letter in first_letters_to_counted_letters.items():
+            self.table[ord(first_letter)] = counted_letter
+        if folding.casefold:
+            # Exact matches take precedence over other cases
+            for (
+                first_letter,
+                counted_letter,
+            ) in first_letters_to_counted_letters.items():
+                for other_case_letter in (first_letter.lower(), first_letter.upper()):
+                    if len(other_case_letter) == 1:
+                        self.table.setdefault(ord(other_case_letter), counted_letter)
+        # A letter may be followed by combining marks, which are normalized into it
+        self._head_length = 1 if folding.normalization is None else 2
+        # "" for heads that aren't counted
+        self._heads_counted_letters: dict[str, str] = {}
+
+    def _get_counted_letter(self, head: str) -> str:
+        normalization = self.folding.normalization
+        if (
+            normalization is not None
+            and not head.isascii()
+            and not unicodedata.is_normalized(normalization, head)
+        ):
+            head = unicodedata.normalize(normalization, head)
+        return self.table.get(ord(head[0]), "") if head else ""
+
+    def extend(
+        self, letters_to_animals_count: dict[str, int], animal_names: Iterable[str]
+    ) -> None:
+        heads_counted_letters = self._heads_counted_letters
+        head_length = self._head_length
+        animal_names = sorted(animal_names)
+        end = len(animal_names)
+        start = 0
+        while start < end:
+            head = animal_names[start][:head_length]
+            # A title shorter than a head is counted only with the equal titles
+            stop = bisect_right(
+                animal_names,
+                head + _LAST_CHARACTER if len(head) == head_length else head,
+                start,
+            )
+            if (counted_letter := heads_counted_letters.get(head)) is None:
+                counted_letter = self._get_counted_letter(head)
+                if len(heads_counted_letters) >= FIRST_LETTERS_CACHE_SIZE:
+                    heads_counted_letters.clear()
+                heads_counted_letters[head] = counted_letter
+            if counted_letter:
+                letters_to_animals_count[counted_letter] += stop - start
+            start = stop
+
+
+@lru_cache(maxsize=64)
+def _get_first_letters_counter(
+    letters: str, folding: LetterFolding
+) -> _FirstLettersCounter:
+    return _FirstLettersCounter(letters, folding)
+
+
 def _extend_letters_to_animals_count(
-    letters_to_animals_count: dict[str, int], animal_names: Iterable[str]
+    letters_to_animals_count: dict[str, int],
+    animal_names: Iterable[str],
+    folding: LetterFolding = DEFAULT_LETTER_FOLDING,
 ) -> None:
-    for animal_name in animal_names:
-        if animal_name:
-            if (first_letter := animal_name[0]) in letters_to_animals_count:
-                letters_to_animals_count[first_letter] += 1
+    _get_first_letters_counter("".join(letters_to_animals_count), folding).extend(
+        letters_to_animals_count, animal_names
+    )
 
 
 def get_animals_count_for_each_letter(
-    wiki_page: wikipediaapi.WikipediaPage, letters: str
+    wiki_page: wikipediaapi.WikipediaPage,
+    letters: str,
+    folding: LetterFolding = DEFAULT_LETTER_FOLDING,
 ) -> dict[str, int]:
     letters_to_animals_count = dict.fromkeys(letters, 0)
     _extend_letters_to_animals_count(
-        letters_to_animals_count, wiki_page.categorymembers
+        letters_to_animals_count, wiki_page.categorymembers, folding
     )
     return letters_to_animals_count
 
 
+def _get_api_url(wiki_page_language: str) -> str:
+    return "https://" + wiki_page_language + ".wikipedia.org/w/api.php"
+
+
+def _get_used_params(query_params: dict[str, Any]) -> dict[str, Any]:
+    _used_params = query_params
+    _used_params.setdefault("timeout", 10.0)
+    _used_params.setdefault("format", "json")
+    _used_params.setdefault("redirects", 1)
+    return _used_params
+
+
+def _create_session(
+    user_agent: str, timeout: float, connector: aiohttp.BaseConnector | None = None
+) -> aiohttp.ClientSession:
+    headers = {"User-Agent": user_agent}
+    return aiohttp.ClientSession(
+        headers=headers, timeout=aiohttp.ClientTimeout(timeout), connector=connector
+    )
+
+
+def _write_atomically(
+    path: str | os.PathLike[str],
+    write: Callable[[IO[str]], None],
+    *,
+    encoding: str = "utf-8",
+) -> None:
+    # Written to a temporary file next to the file and renamed, so a crash can't
+    # corrupt it. Every writer has its own temporary file
+    directory, name = os.path.split(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(
+        "w",
+        encoding=encoding,
+        newline="",
+        dir=directory,
+        prefix=f"{name}.",
+        suffix=".tmp",
+        delete=False,
+    ) as f:
+        try:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+            if os.path.exists(path):
+                shutil.copymode(path, f.name)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+def _save_json(path: str | os.PathLike[str], raw: dict[str, Any]) -> None:
+    _write_atomically(path, lambda f: json.dump(raw, f, ensure_ascii=False))
+
+
+_json_decoder = json.JSONDecoder()
+
+
+# Incremental reader of a JSON document from a stream of bytes, which keeps only
+# the not yet consumed part of the text. Containers are walked key by key or item
+# by item, so that a large array can be processed before it's received entirely
+class _JsonStream:
+    def __init__(self, chunks: AsyncIterator[bytes]) -> None:
+        self.chunks = chunks
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.position = 0
+        self.is_exhausted = False
+
+    async def _read_more(self) -> bool:
+        if self.is_exhausted:
+            return False
+        try:
+            chunk = await anext(self.chunks)
+        except StopAsyncIteration:
+            self.is_exhausted = True
+            text = self.decoder.decode(b"", final=True)
+        else:
+            text = self.decoder.decode(chunk)
+        self.buffer = self.buffer[self.position :] + text
+        self.position = 0
+        return True
+
+    # Skips whitespace and returns the next character without consuming it
+    async def peek(self) -> str:
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in " \t\n\r"
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not await self._read_more():
+                raise ValueError("Unexpected end of JSON document")
+
+    async def expect(self, characters: str) -> str:
+        character = await self.peek()
+        if character not in characters:
+            raise ValueError(
+                f"Expected one of {characters!r} in JSON document, "
+                f"but found {character!r} instead"
+            )
+        self.position += 1
+        return character
+
+    async def read_value(self) -> Any:
+        await self.peek()
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not await self._read_more():
+                    raise
+                continue
+            # A number cut by the end of the buffer is parsed only partially
+            if (
+                self.buffer[self.position] in "-0123456789"
+                and (end == len(self.buffer) or self.buffer[end] in ".eE+-")
+                and await self._read_more()
+            ):
+                continue
+            self.position = end
+            return value
+
+    # Yields keys, the value of each key must be consumed before the next one
+    async def iterate_object(self) -> AsyncIterator[str]:
+        await self.expect("{")
+        if await self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = await self.read_value()
+            await self.expect(":")
+            yield key
+            if await self.expect(",}") == "}":
+                return
+
+    async def iterate_array(self) -> AsyncIterator[Any]:
+        await self.expect("[")
+        if await self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield await self.read_value()
+            if await self.expect(",]") == "]":
+                return
+
+
+class MediaWikiApiError(Exception):
+    def __init__(self, error: dict[str, Any]) -> None:
+        super().__init__(f"{error.get('code')}: {error.get('info')}")
+        self.code = error.get("code")
+        self.error = error
+
+
+class _CachedResponse(NamedTuple):
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+    is_fresh: bool
+
+
+# On-disk cache of API responses, compressed, in an SQLite database. Fresh
+# responses (younger than `ttl` seconds) are served without requests, stale ones
+# with a validator are revalidated with a conditional request, the least
+# recently used ones are evicted when the bodies exceed `max_size` bytes
+class ResponseCache:
+    def __init__(
+        self,
+        path: str | os.PathLike[str] = ":memory:",
+        *,
+        ttl: float = DEFAULT_CACHE_TTL,
+        max_size: int = DEFAULT_CACHE_MAX_SIZE,
+    ) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, "
+            "body BLOB NOT NULL, "
+            "etag TEXT, "
+            "last_modified TEXT, "
+            "stored_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @staticmethod
+    def get_key(url: str, params: dict[str, Any]) -> str:
+        return f"{url}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+
+    def get(self, key: str) -> _CachedResponse | None:
+        row = self.connection.execute(
+            "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, stored_at = row
+        now = time.time()
+        self.connection.execute(
+            "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+        )
+        self.connection.commit()
+        return _CachedResponse(
+            zlib.decompress(body), etag, last_modified, now - stored_at < self.ttl
+        )
+
+    def set(
+        self, key: str, body: bytes, etag: str | None, last_modified: str | None
+    ) -> None:
+        now = time.time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (key, zlib.compress(body), etag, last_modified, now, now),
+        )
+        self._evict()
+        self.connection.commit()
+
+    # After a "304 Not Modified" the response is fresh again
+    def refresh(self, key: str) -> None:
+        now = time.time()
+        self.connection.execute(
+            "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?",
+            (now, now, key),
+        )
+        self.connection.commit()
+
+    def delete(self, key: str) -> None:
+        self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self.connection.commit()
+
+    def get_size(self) -> int:
+        size: int = self.connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses"
+        ).fetchone()[0]
+        return size
+
+    def _evict(self) -> None:
+        # Stale responses that can't be revalidated are useless
+        self.connection.execute(
+            "DELETE FROM responses WHERE stored_at <= ? "
+            "AND etag IS NULL AND last_modified IS NULL",
+            (time.time() - self.ttl,),
+        )
+        size = self.get_size()
+        if size <= self.max_size:
+            return
+        evicted_keys = []
+        for key, body_size in self.connection.execute(
+            "SELECT key, LENGTH(body) FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            evicted_keys.append((key,))
+            size -= body_size
+            if size <= self.max_size:
+                break
+        self.connection.executemany("DELETE FROM responses WHERE key = ?", evicted_keys)
+
+
+async def _iterate_body(body: bytes) -> AsyncIterator[bytes]:
+    for i in range(0, len(body), STREAM_CHUNK_SIZE):
+        yield body[i : i + STREAM_CHUNK_SIZE]
+
+
+def _get_retry_after(response: aiohttp.ClientResponse) -> float | None:
+    if (retry_after := response.headers.get("Retry-After")) is None:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _is_retryable(response: aiohttp.ClientResponse) -> bool:
+    return (
+        response.status in _RETRYABLE_STATUSES
+        or response.headers.get("MediaWiki-API-Error") in _RETRYABLE_API_ERRORS
+    )
+
+
+# Paces the requests to an API server: at most `rate` requests per second, in
+# bursts of at most `burst` (a token bucket), and at most `concurrency` at a
+# time. The concurrency is adjusted to the server: it grows by one with every
+# `concurrency` successful requests, up to `max_concurrency`, and is halved, down
+# to `min_concurrency`, when a request fails or takes longer than
+# `target_latency` seconds. Failed requests are retried after Retry-After
+# seconds or an exponential backoff with jitter, and meanwhile no requests are
+# sent. `maxlag` is passed to the API to be told to wait when its database
+# replicas lag behind
+class RequestScheduler:
+    def __init__(
+        self,
+        *,
+        rate: float | None = None,
+        burst: int = 1,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        min_concurrency: int = 1,
+        target_latency: float | None = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = 0.5,
+        backoff_max: float = 60.0,
+        jitter: float = 0.5,
+        maxlag: int | None = DEFAULT_MAXLAG,
+    ) -> None:
+        if rate is not None and rate <= 0:
+            raise ValueError(f"Rate must be positive, but got {rate}")
+        if not 1 <= min_concurrency <= max_concurrency:
+            raise ValueError(
+                "Concurrency must be at least 1 and at most the maximum, but got "
+                f"{min_concurrency} and {max_concurrency}"
+            )
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.maxlag = maxlag
+        self.retries_count = 0
+        self._concurrency = float(max_concurrency)
+        self._active_requests_count = 0
+        self._condition = asyncio.Condition()
+        self._tokens = float(burst)
+        self._tokens_updated_at = time.monotonic()
+        self._paused_until = 0.0
+
+    @property
+    def concurrency(self) -> int:
+        return int(self._concurrency)
+
+    async def _take_token(self) -> None:
+        if self.rate is None:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._tokens_updated_at) * self.rate
+            )
+            self._tokens_updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    # Waits for a turn to send a request, yielding a function to be called when
+    # the response headers are received
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[Callable[[], None]]:
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self._active_requests_count < self.concurrency
+            )
+            self._active_requests_count += 1
+        try:
+            while (pause := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(pause)
+            await self._take_token()
+            start = time.monotonic()
+
+            def on_response() -> None:
+                if (
+                    self.target_latency is not None
+                    and time.monotonic() - start > self.target_latency
+                ):
+                    self._decrease_concurrency()
+                else:
+                    self._concurrency = min(
+                        self._concurrency + 1 / self.concurrency, self.max_concurrency
+                    )
+
+            yield on_response
+        finally:
+            async with self._condition:
+                self._active_requests_count -= 1
+                self._condition.notify_all()
+
+    def _decrease_concurrency(self) -> None:
+        self._concurrency = max(self._concurrency / 2, self.min_concurrency)
+
+    # Returns the delay before the retry number `attempt` (counted from 0)
+    def on_failure(self, attempt: int, retry_after: float | None) -> float:
+        self.retries_count += 1
+        self._decrease_concurrency()
+        delay = (
+            min(self.backoff_base * 2**attempt, self.backoff_max)
+            if retry_after is None
+            else retry_after
+        ) * (1 + random.uniform(0, self.jitter))
+        if retry_after is not None:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+
+class _MediaWikiClient:
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        semaphore: asyncio.Semaphore | None = None,
+        cache: ResponseCache | None = None,
+        scheduler: RequestScheduler | None = None,
+    ) -> None:
+        self.session = session
+        self.url = url
+        self.semaphore = semaphore
+        self.cache = cache
+        self.scheduler = scheduler
+        self.requests_count = 0
+
+    # Sends a request, retried by the scheduler if it fails. An HTTP error is
+    # raised (after the last retry), an API error is left to the response body
+    @asynccontextmanager
+    async def _get(
+        self, params: dict[str, Any], headers: dict[str, str] | None = None
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        scheduler = self.scheduler
+        if scheduler is None:
+            self.requests_count += 1
+            async with self.session.get(
+                self.url, params=params, headers=headers
+            ) as response:
+                response.raise_for_status()
+                yield response
+            return
+
+        if scheduler.maxlag is not None:
+            params = {"maxlag": scheduler.maxlag, **params}
+        attempt = 0
+        while True:
+            async with scheduler.slot() as on_response:
+                self.requests_count += 1
+                try:
+                    response = await self.session.get(
+                        self.url, params=params, headers=headers
+                    )
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if attempt == scheduler.max_retries:
+                        raise
+                    delay = scheduler.on_failure(attempt, None)
+                else:
+                    async with response:
+                        if not _is_retryable(response):
+                            on_response()
+                            response.raise_for_status()
+                            yield response
+                            return
+                        if attempt == scheduler.max_retries:
+                            response.raise_for_status()
+                            yield response
+                            return
+                        delay = scheduler.on_failure(
+                            attempt, _get_retry_after(response)
+                        )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    # Yields the chunks of the response body, from the cache when possible.
+    # A response is cached only if its body was consumed without errors
+    @asynccontextmanager
+    async def _open_body(
+        self, params: dict[str, Any]
+    ) -> AsyncIterator[AsyncIterator[bytes]]:
+        async with self.semaphore or nullcontext():
+            cache = self.cache
+            if cache is None or _UNCACHEABLE_PARAMS.intersection(params):
+                async with self._get(params) as response:
+                    yield response.content.iter_chunked(STREAM_CHUNK_SIZE)
+                    # Lets the connection be reused
+                    await response.content.read()
+                return
+
+            key = cache.get_key(self.url, params)
+            cached_response = cache.get(key)
+            if cached_response is not None and cached_response.is_fresh:
+                cache.hits += 1
+                yield _iterate_body(cached_response.body)
+                return
+
+            headers = {}
+            if cached_response is not None:
+                if cached_response.etag is not None:
+                    headers["If-None-Match"] = cached_response.etag
+                if cached_response.last_modified is not None:
+                    headers["If-Modified-Since"] = cached_response.last_modified
+            async with self._get(params, headers) as response:
+                if (
+                    response.status == HTTPStatus.NOT_MODIFIED
+                    and cached_response is not None
+                ):
+                    cache.revalidations += 1
+                    cache.refresh(key)
+                    yield _iterate_body(cached_response.body)
+                    return
+
+                cache.misses += 1
+                chunks = []
+
+                async def iterate_and_keep_chunks() -> AsyncIterator[bytes]:
+                    async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                        chunks.append(chunk)
+                        yield chunk
+
+                yield iterate_and_keep_chunks()
+                chunks.append(await response.content.read())
+                if response.status == HTTPStatus.OK:
+                    cache.set(
+                        key,
+                        b"".join(chunks),
+                        response.headers.get("ETag"),
+                        response.headers.get("Last-Modified"),
+                    )
+
+    async def get_json(self, params: dict[str, Any]) -> dict[str, Any]:
+        async with self._open_body(params) as chunks:
+            body = b"".join([chunk async for chunk in chunks])
+            try:
+                raw: dict[str, Any] = json.loads(body)
+            except ValueError as e:
+                raise MediaWikiApiError({"code": "invalidjson", "info": str(e)}) from e
+            if "error" in raw:
+                raise MediaWikiApiError(raw["error"])
+        return raw
+
+    # Follows the MediaWiki continuation protocol, yielding every response
+    async def iterate_json(
+        self, params: dict[str, Any]
+    ) -> AsyncIterator[dict[str, Any]]:
+        params = dict(params)
+        _do_while_flag = True
+        # Do-While Loop Emulating
+        while _do_while_flag:
+            raw = await self.get_json(params)
+            yield raw
+            if "continue" in raw:
+                params.update(raw["continue"])
+            else:
+                _do_while_flag = False
+
+    # Like `iterate_json()`, but yields the items of the `list_name` list in
+    # batches as soon as they are parsed from the response body. `on_continue` is
+    # called with the continuation of every response after all its items are
+    # consumed, or with None after the last one
+    async def stream_list(
+        self,
+        params: dict[str, Any],
+        list_name: str,
+        on_continue: Callable[[dict[str, Any] | None], None] | None = None,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        params = dict(params)
+        _do_while_flag = True
+        # Do-While Loop Emulating
+        while _do_while_flag:
+            continue_params = None
+            async with self._open_body(params) as chunks:
+                stream = _JsonStream(chunks)
+                async for key in stream.iterate_object():
+                    if key == "continue":
+                        continue_params = await stream.read_value()
+                        continue
+                    elif key == "error":
+                        raise MediaWikiApiError(await stream.read_value())
+                    elif key != "query":
+                        await stream.read_value()
+                        continue
+                    async for query_key in stream.iterate_object():
+                        if query_key != list_name:
+                            await stream.read_value()
+                            continue
+                        items = []
+                        async for item in stream.iterate_array():
+                            items.append(item)
+                            if len(items) == STREAM_BATCH_SIZE:
+                                yield items
+                                items = []
+                        if items:
+                            yield items
+            if on_continue is not None:
+                on_continue(continue_params)
+            if continue_params is not None:
+                params.update(continue_params)
+            else:
+                _do_while_flag = False
+
+
+# Ranges of sort keys that cover the whole category: (-inf, prefixes[0]),
+# [prefixes[0], prefixes[1]), ..., [prefixes[-1], +inf)
+def _get_sort_key_ranges(
+    sort_key_prefixes: str,
+) -> list[tuple[str | None, str | None]]:
+    boundaries: list[str | None] = list(dict.fromkeys(sort_key_prefixes))
+    return list(zip([None, *boundaries], [*boundaries, None]))
+
+
+async def _crawl_category_members(
+    client: _MediaWikiClient,
+    params: dict[str, Any],
+    on_categorymembers: Callable[[list[dict[str, Any]]], None],
+    sort_key_prefixes: str | None = None,
+    streamed: bool = False,
+    continue_params: list[dict[str, Any] | None] | None = None,
+    on_page: Callable[[int, dict[str, Any] | None], None] | None = None,
+) -> None:
+    # With `sort_key_prefixes` the sort key ranges are crawled concurrently, so the
+    # same page may be passed to `on_categorymembers` more than once. With
+    # `streamed=True` members are passed in small batches while a response is
+    # still being received. `continue_params` are the continuations to start the
+    # ranges from, {} for the beginning and None for a finished range. `on_page`
+    # is called with the range index and the continuation of every response once
+    # its members are passed
+    async def crawl(index: int, params: dict[str, Any]) -> None:
+        if continue_params is not None:
+            if (range_continue_params := continue_params[index]) is None:
+                return
+            params = {**params, **range_continue_params}
+
+        def on_continue(next_continue_params: dict[str, Any] | None) -> None:
+            if on_page is not None:
+                on_page(index, next_continue_params)
+
+        if streamed:
+            async for categorymembers in client.stream_list(
+                params, "categorymembers", on_continue
+            ):
+                on_categorymembers(categorymembers)
+        else:
+            async for raw in client.iterate_json(params):
+                on_categorymembers(raw["query"]["categorymembers"])
+                on_continue(raw.get("continue"))
+
+    if sort_key_prefixes is None:
+        await crawl(0, params)
+        return
+
+    async def crawl_sort_key_range(
+        index: int, start_sort_key_prefix: str | None, end_sort_key_prefix: str | None
+    ) -> None:
+        range_params = dict(params)
+        if start_sort_key_prefix is not None:
+            range_params["cmstartsortkeyprefix"] = start_sort_key_prefix
+        if end_sort_key_prefix is not None:
+            range_params["cmendsortkeyprefix"] = end_sort_key_prefix
+        await crawl(index, range_params)
+
+    tasks = [
+        asyncio.ensure_future(crawl_sort_key_range(index, *sort_key_range))
+        for index, sort_key_range in enumerate(_get_sort_key_ranges(sort_key_prefixes))
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Nothing may be passed to the callbacks after the crawl failed
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+# Set of page IDs as a bitmap, a bit per ID up to the largest one. Page IDs are
+# dense, so millions of them take a few megabytes, unlike a `set` of `int`s
+class _PageIdSet:
+    __slots__ = ("_bits", "_length")
+
+    def __init__(self, bits: bytes = b"") -> None:
+        self._bits = bytearray(bits)
+        self._length = int.from_bytes(self._bits, "little").bit_count()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, page_id: int) -> bool:
+        index, bit = divmod(page_id, 8)
+        return index < len(self._bits) and bool(self._bits[index] >> bit & 1)
+
+    def __bytes__(self) -> bytes:
+        return bytes(self._bits)
+
+    # Returns whether the ID wasn't in the set
+    def add(self, page_id: int) -> bool:
+        index, bit = divmod(page_id, 8)
+        if index >= len(self._bits):
+            # Grows geometrically, so adding increasing IDs takes linear time
+            self._bits.extend(
+                bytes(max(index + 1, 2 * len(self._bits)) - len(self._bits))
+            )
+        if self._bits[index] >> bit & 1:
+            return False
+        self._bits[index] |= 1 << bit
+        self._length += 1
+        return True
+
+
+# Progress of `async_get_animals_count_for_each_letter()`: the continuation of
+# every sort key range, the partial counts and, for a partitioned crawl, the
+# counted pages. It's consistent at the end of every response
+class CrawlCheckpoint:
+    __slots__ = (
+        "continue_params",
+        "folding",
+        "letters_to_animals_count",
+        "pages_count",
+        "seen_page_ids",
+        "sort_key_prefixes",
+        "wiki_page_language",
+        "wiki_page_title",
+    )
+
+    def __init__(
+        self,
+        wiki_page_title: str,
+        wiki_page_language: str,
+        sort_key_prefixes: str | None,
+        continue_params: list[dict[str, Any] | None],
+        letters_to_animals_count: dict[str, int],
+        seen_page_ids: _PageIdSet | None = None,
+        pages_count: int = 0,
+        folding: LetterFolding = DEFAULT_LETTER_FOLDING,
+    ) -> None:
+        self.wiki_page_title = wiki_page_title
+        self.wiki_page_language = wiki_page_language
+        self.sort_key_prefixes = sort_key_prefixes
+        self.continue_params = continue_params
+        self.letters_to_animals_count = letters_to_animals_count
+        self.seen_page_ids = _PageIdSet() if seen_page_ids is None else seen_page_ids
+        self.pages_count = pages_count
+        self.folding = folding
+
+    def is_resumable(
+        self,
+        wiki_page_title: str,
+        wiki_page_language: str,
+        sort_key_prefixes: str | None,
+        letters: str,
+        folding: LetterFolding = DEFAULT_LETTER_FOLDING,
+    ) -> bool:
+        return (
+            self.wiki_page_title == wiki_page_title
+            and self.wiki_page_language == wiki_page_language
+            and self.sort_key_prefixes == sort_key_prefixes
+            and list(self.letters_to_animals_count) == list(dict.fromkeys(letters))
+            and self.folding == folding
+        )
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> Self:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        return cls(
+            raw["wiki_page_title"],
+            raw["wiki_page_language"],
+            raw["sort_key_prefixes"],
+            raw["continue_params"],
+            raw["letters_to_animals_count"],
+            _PageIdSet(zlib.decompress(base64.b64decode(raw["seen_page_ids"]))),
+            raw["pages_count"],
+            LetterFolding(
+                raw["folding"]["casefold"],
+                raw["folding"]["normalization"],
+                tuple(
+                    (letter, counted_letter)
+                    for letter, counted_letter in raw["folding"]["aliases"]
+                ),
+            ),
+        )
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        _save_json(
+            path,
+            {
+                "wiki_page_title": self.wiki_page_title,
+                "wiki_page_language": self.wiki_page_language,
+                "sort_key_prefixes": self.sort_key_prefixes,
+                "continue_params": self.continue_params,
+                "letters_to_animals_count": self.letters_to_animals_count,
+                "seen_page_ids": base64.b64encode(
+                    zlib.compress(bytes(self.seen_page_ids))
+                ).decode(),
+                "pages_count": self.pages_count,
+                "folding": self.folding._asdict(),
+            },
+        )
+
+
 async def async_get_animals_count_for_each_letter(
     wiki_page_title: str,
     letters: str,
     user_agent: str,
     wiki_page_language: str,
+    *,
+    api_url: str | None = None,
+    partitioned: bool = False,
+    sort_key_prefixes: str | None = None,
+    recursive: bool = False,
+    folding: LetterFolding = DEFAULT_LETTER_FOLDING,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    streamed: bool = False,
+    cache: ResponseCache | None = None,
+    scheduler: RequestScheduler | None = None,
+    checkpoint_path: str | os.PathLike[str] | None = None,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
     **query_params: Any,
 ) -> dict[str, int]:
-    default_params = {
+    # `partitioned=True` splits the category into sort key ranges bounded by
+    # `sort_key_prefixes` (`letters` by default), which are crawled concurrently,
+    # at most `concurrency` requests at a time. Members are counted by the first
+    # letter of the title, and pages found in several ranges are counted once, so
+    # the result is the same as of the sequential crawl. The prefixes should be
+    # ordered like the wiki collation, otherwise ranges overlap and some pages are
+    # requested more than once. `recursive=True` counts the pages of the
+    # subcategories instead of the subcategories themselves, crawling them
+    # concurrently, once each, and counting every page once. Titles are matched
+    # to `letters` by the `folding` rules. `streamed=True`
+    # counts the members while responses are received, without keeping a whole
+    # response in memory. Responses are taken from and stored to `cache`, if
+    # given, and requests are paced and retried by `scheduler`, if given. With
+    # `checkpoint_path` the progress is saved every `checkpoint_interval`
+    # responses, a crawl is resumed from the saved checkpoint of the same crawl,
+    # and the checkpoint is removed when the crawl is finished
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be at least 1, but got {concurrency}")
+    if checkpoint_interval < 1:
+        raise ValueError(
+            f"Checkpoint interval must be at least 1, but got {checkpoint_interval}"
+        )
+    if recursive and checkpoint_path is not None:
+        raise ValueError("A recursive crawl can't be checkpointed")
+
+    _used_params = _get_used_params(query_params)
+    url = api_url or _get_api_url(wiki_page_language)
+
+    async with _create_session(user_agent, _used_params["timeout"]) as session:
+        return await _count_animals_for_each_letter(
+            _MediaWikiClient(
+                session, url, asyncio.Semaphore(concurrency), cache, scheduler
+            ),
+            wiki_page_title,
+            letters,
+            wiki_page_language,
+            _used_params,
+            partitioned=partitioned,
+            sort_key_prefixes=sort_key_prefixes,
+            recursive=recursive,
+            folding=folding,
+            streamed=streamed,
+            checkpoint_path=checkpoint_path,
+            checkpoint_interval=checkpoint_interval,
+        )
+
+
+async def _count_animals_for_each_letter(
+    client: _MediaWikiClient,
+    wiki_page_title: str,
+    letters: str,
+    wiki_page_language: str,
+    _used_params: dict[str, Any],
+    *,
+    partitioned: bool = False,
+    sort_key_prefixes: str | None = None,
+    recursive: bool = False,
+    folding: LetterFolding = DEFAULT_LETTER_FOLDING,
+    streamed: bool = False,
+    checkpoint_path: str | os.PathLike[str] | None = None,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+) -> dict[str, int]:
+    default_params: dict[str, Any] = {
         "action": "query",
         "list": "categorymembers",
         "cmtitle": wiki_page_title,
         "cmlimit": 500,
     }
+    if recursive:
+        default_params["cmtype"] = "subcat|page"
 
-    _used_params = query_params
-    _used_params.setdefault("timeout", 10.0)
-    _used_params.setdefault("format", "json")
-    _used_params.setdefault("redirects", 1)
-    _used_params.update(default_params)
+    _used_params = {**_used_params, **default_params}
 
-    headers = {"User-Agent": user_agent}
+    if partitioned and sort_key_prefixes is None:
+        sort_key_prefixes = letters
+    elif not partitioned:
+        sort_key_prefixes = None
+    checkpoint = None
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        checkpoint = CrawlCheckpoint.load(checkpoint_path)
+        if not checkpoint.is_resumable(
+            wiki_page_title, wiki_page_language, sort_key_prefixes, letters, folding
+        ):
+            checkpoint = None
+    if checkpoint is None:
+        ranges_count = (
+            1
+            if sort_key_prefixes is None
+            else len(_get_sort_key_ranges(sort_key_prefixes))
+        )
+        checkpoint = CrawlCheckpoint(
+            wiki_page_title,
+            wiki_page_language,
+            sort_key_prefixes,
+            [{} for _ in range(ranges_count)],
+            dict.fromkeys(letters, 0),
+            folding=folding,
+        )
+    letters_to_animals_count = checkpoint.letters_to_animals_count
+    seen_page_ids = checkpoint.seen_page_ids
+    # Titles of the crawled categories, which breaks cycles of subcategories
+    seen_category_titles = {wiki_page_title.replace("_", " ")}
+    subcategories_crawls: list[asyncio.Task[None]] = []
 
-    url = "https://" + wiki_page_language + ".wikipedia.org/w/api.php"
+    def count_animals(categorymembers: list[dict[str, Any]]) -> None:
+        if recursive:
+            pages = []
+            for categorymember in categorymembers:
+                if categorymember["ns"] != CATEGORY_NAMESPACE:
+                    pages.append(categorymember)
+                elif categorymember["title"] not in seen_category_titles:
+                    seen_category_titles.add(categorymember["title"])
+                    subcategories_crawls.append(
+                        asyncio.ensure_future(
+                            _crawl_category_members(
+                                client,
+                                {**_used_params, "cmtitle": categorymember["title"]},
+                                count_animals,
+                                streamed=streamed,
+                            )
+                        )
+                    )
+            categorymembers = pages
+        if partitioned or recursive:
+            categorymembers = [
+                categorymember
+                for categorymember in categorymembers
+                if seen_page_ids.add(categorymember["pageid"])
+            ]
+        animal_names = [categorymember["title"] for categorymember in categorymembers]
+        _extend_letters_to_animals_count(
+            letters_to_animals_count, animal_names, folding
+        )
 
-    letters_to_animals_count = dict.fromkeys(letters, 0)
-    _do_while_flag = True
-    async with aiohttp.ClientSession(
-        headers=headers, timeout=aiohttp.ClientTimeout(_used_params["timeout"])
+    def save_checkpoint(index: int, continue_params: dict[str, Any] | None) -> None:
+        checkpoint.continue_params[index] = continue_params
+        checkpoint.pages_count += 1
+        if checkpoint_path is not None and (
+            checkpoint.pages_count % checkpoint_interval == 0
+        ):
+            checkpoint.save(checkpoint_path)
+
+    try:
+        await _crawl_category_members(
+            client,
+            _used_params,
+            count_animals,
+            sort_key_prefixes,
+            streamed,
+            checkpoint.continue_params,
+            save_checkpoint,
+        )
+        # Crawls of subcategories start crawls of their subcategories
+        while subcategories_crawls:
+            await subcategories_crawls.pop()
+    except BaseException:
+        for subcategories_crawl in subcategories_crawls:
+            subcategories_crawl.cancel()
+        await asyncio.gather(*subcategories_crawls, return_exceptions=True)
+        raise
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return letters_to_animals_count
+
+
+class CountingJob(NamedTuple):
+    wiki_page_language: str
+    wiki_page_title: str
+    letters: str
+    # For a partitioned crawl, `letters` by default
+    sort_key_prefixes: str | None = None
+
+
+# Output of counts as rows of a letter and its count, preceded by the language
+# and the category of the job for appended counts. `write()` replaces the output
+# with the counts of a single category, `append()` adds the counts of a job to
+# the output, in batches of `batch_size` jobs, and `flush()` writes the rest.
+# Appended counts of a job replace its previous counts, in the output or pending
+class CountsSink(ABC):
+    def __init__(self, batch_size: int = DEFAULT_SINK_BATCH_SIZE) -> None:
+        self.batch_size = batch_size
+        self._pending_jobs_rows: dict[
+            tuple[str, str], list[tuple[str, str, str, int]]
+        ] = {}
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @abstractmethod
+    def write(self, letters_to_animals_count: dict[str, int]) -> None: ...
+
+    @abstractmethod
+    def _append_rows(self, rows: list[tuple[str, str, str, int]]) -> None: ...
+
+    def append(
+        self, job: CountingJob, letters_to_animals_count: dict[str, int]
+    ) -> None:
+        self._pending_jobs_rows[job.wiki_page_language, job.wiki_page_title] = [
+            (job.wiki_page_language, job.wiki_page_title, letter, animals_count)
+            for letter, animals_count in letters_to_animals_count.items()
+        ]
+        if len(self._pending_jobs_rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending_jobs_rows:
+            self._append_rows(
+                list(chain.from_iterable(self._pending_jobs_rows.values()))
+            )
+        self._pending_jobs_rows = {}
+
+    def close(self) -> None:
+        self.flush()
+
+
+# Output in a text file of records, one or more lines each. `write()` is atomic,
+# appended rows are written at the end of the file in place and synced, so a
+# crash may leave a partial record there. The file is rewritten atomically only
+# to replace the counts of a job it already has
+class _TextFileCountsSink(CountsSink):
+    encoding = "utf-8"
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        batch_size: int = DEFAULT_SINK_BATCH_SIZE,
+    ) -> None:
+        super().__init__(batch_size)
+        self.path = path
+        # Jobs with counts in the file, read on the first append
+        self._jobs: set[tuple[str, str]] | None = None
+
+    @abstractmethod
+    def _read_records(self, f: IO[str]) -> Iterator[Any]: ...
+
+    @abstractmethod
+    def _write_records(self, f: IO[str], records: Iterable[Any]) -> None: ...
+
+    # None for the records of written counts
+    @abstractmethod
+    def _get_job(self, record: Any) -> tuple[str, str] | None: ...
+
+    @abstractmethod
+    def _get_records(
+        self, letters_to_animals_count: dict[str, int]
+    ) -> Iterable[Any]: ...
+
+    @abstractmethod
+    def _get_appended_records(
+        self, rows: list[tuple[str, str, str, int]]
+    ) -> Iterable[Any]: ...
+
+    def _open(self, mode: str) -> IO[str]:
+        return open(self.path, mode, newline="", encoding=self.encoding)
+
+    def _read_jobs(self) -> set[tuple[str, str]]:
+        if not os.path.exists(self.path):
+            return set()
+        with self._open("r") as f:
+            return {
+                job
+                for record in self._read_records(f)
+                if (job := self._get_job(record)) is not None
+            }
+
+    def write(self, letters_to_animals_count: dict[str, int]) -> None:
+        _write_atomically(
+            self.path,
+            lambda f: self._write_records(
+                f, self._get_records(letters_to_animals_count)
+            ),
+            encoding=self.encoding,
+        )
+        self._jobs = set()
+
+    def _append_rows(self, rows: list[tuple[str, str, str, int]]) -> None:
+        if self._jobs is None:
+            self._jobs = self._read_jobs()
+        appended_jobs = {(row[0], row[1]) for row in rows}
+        records = self._get_appended_records(rows)
+        if self._jobs.isdisjoint(appended_jobs):
+            with self._open("a") as f:
+                self._write_records(f, records)
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            with self._open("r") as f:
+                kept_records = [
+                    record
+                    for record in self._read_records(f)
+                    if self._get_job(record) not in appended_jobs
+                ]
+            _write_atomically(
+                self.path,
+                lambda f: self._write_records(f, chain(kept_records, records)),
+                encoding=self.encoding,
+            )
+        self._jobs.update(appended_jobs)
+
+
+# `beasts.csv` format, with a byte order mark for spreadsheets
+class CsvSink(_TextFileCountsSink):
+    encoding = "utf-8-sig"
+
+    def _read_records(self, f: IO[str]) -> Iterator[list[str]]:
+        return csv.reader(f)
+
+    def _write_records(self, f: IO[str], records: Iterable[Any]) -> None:
+        csv.writer(f).writerows(records)
+
+    def _get_job(self, record: list[str]) -> tuple[str, str] | None:
+        return (record[0], record[1]) if len(record) == 4 else None
+
+    def _get_records(
+        self, letters_to_animals_count: dict[str, int]
+    ) -> Iterable[tuple[str, int]]:
+        return letters_to_animals_count.items()
+
+    def _get_appended_records(
+        self, rows: list[tuple[str, str, str, int]]
+    ) -> Iterable[tuple[str, str, str, int]]:
+        return rows
+
+
+_APPENDED_JSON_LINE_KEYS = ("wiki_page_language", "wiki_page_title", "letter", "count")
+
+
+# A JSON object per row
+class JsonLinesSink(_TextFileCountsSink):
+    def _read_records(self, f: IO[str]) -> Iterator[dict[str, Any]]:
+        return (json.loads(line) for line in f)
+
+    def _write_records(self, f: IO[str], records: Iterable[Any]) -> None:
+        f.writelines(f"{json.dumps(raw, ensure_ascii=False)}\n" for raw in records)
+
+    def _get_job(self, record: dict[str, Any]) -> tuple[str, str] | None:
+        if "wiki_page_language" not in record:
+            return None
+        return record["wiki_page_language"], record["wiki_page_title"]
+
+    def _get_records(
+        self, letters_to_animals_count: dict[str, int]
+    ) -> Iterator[dict[str, Any]]:
+        return (
+            {"letter": letter, "count": animals_count}
+            for letter, animals_count in letters_to_animals_count.items()
+        )
+
+    def _get_appended_records(
+        self, rows: list[tuple[str, str, str, int]]
+    ) -> Iterator[dict[str, Any]]:
+        return (dict(zip(_APPENDED_JSON_LINE_KEYS, row)) for row in rows)
+
+
+# Table `counts` keyed by the language, the category and the letter, which are
+# empty strings for written counts
+class SqliteSink(CountsSink):
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        batch_size: int = DEFAULT_SINK_BATCH_SIZE,
+    ) -> None:
+        super().__init__(batch_size)
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS counts ("
+                "wiki_page_language TEXT NOT NULL, "
+                "wiki_page_title TEXT NOT NULL, "
+                "letter TEXT NOT NULL, "
+                "count INTEGER NOT NULL, "
+                "PRIMARY KEY (wiki_page_language, wiki_page_title, letter))"
+            )
+
+    def write(self, letters_to_animals_count: dict[str, int]) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM counts")
+            self.connection.executemany(
+                "INSERT INTO counts VALUES ('', '', ?, ?)",
+                letters_to_animals_count.items(),
+            )
+
+    def _append_rows(self, rows: list[tuple[str, str, str, int]]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM counts "
+                "WHERE wiki_page_language = ? AND wiki_page_title = ?",
+                dict.fromkeys(row[:2] for row in rows),
+            )
+            self.connection.executemany("INSERT INTO counts VALUES (?, ?, ?, ?)", rows)
+
+    def close(self) -> None:
+        super().close()
+        self.connection.close()
+
+
+_SINKS_BY_SUFFIX: dict[str, type[CsvSink | JsonLinesSink | SqliteSink]] = {
+    ".csv": CsvSink,
+    ".jsonl": JsonLinesSink,
+    ".sqlite": SqliteSink,
+    ".db": SqliteSink,
+}
+
+
+def create_sink(
+    path: str | os.PathLike[str], batch_size: int = DEFAULT_SINK_BATCH_SIZE
+) -> CountsSink:
+    # The sink is chosen by the file extension
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in _SINKS_BY_SUFFIX:
+        raise ValueError(
+            f"Unsupported output file extension {suffix!r}, "
+            f"expected one of {', '.join(_SINKS_BY_SUFFIX)}"
+        )
+    return _SINKS_BY_SUFFIX[suffix](path, batch_size)
+
+
+async def async_get_animals_counts_for_each_letter(
+    jobs: Iterable[CountingJob],
+    user_agent: str,
+    *,
+    api_urls: Mapping[str, str] | None = None,
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    host_concurrency: int = DEFAULT_CONCURRENCY,
+    partitioned: bool = False,
+    recursive: bool = False,
+    folding: LetterFolding = DEFAULT_LETTER_FOLDING,
+    streamed: bool = False,
+    cache: ResponseCache | None = None,
+    create_scheduler: Callable[[], RequestScheduler] | None = None,
+    sink: CountsSink | None = None,
+    **query_params: Any,
+) -> list[dict[str, int] | Exception]:
+    # Counts all the jobs concurrently in one session, with a connection pool per
+    # host. At most `concurrency` requests are sent at a time, and at most
+    # `host_concurrency` of them to the same host. `api_urls` maps languages to
+    # API URLs, Wikipedia is used for the others. Each host gets a scheduler from
+    # `create_scheduler`, if given. The result of a job is its counts, or the
+    # exception it failed with. The counts are appended to `sink`, if given, as
+    # soon as a job is done, and the sink is flushed in the end
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be at least 1, but got {concurrency}")
+    if host_concurrency < 1:
+        raise ValueError(
+            f"Host concurrency must be at least 1, but got {host_concurrency}"
+        )
+
+    _used_params = _get_used_params(query_params)
+    api_urls = api_urls or {}
+    hosts_semaphores: dict[str, asyncio.Semaphore] = {}
+    hosts_schedulers: dict[str, RequestScheduler | None] = {}
+
+    async def count(
+        session: aiohttp.ClientSession, job: CountingJob
+    ) -> dict[str, int] | Exception:
+        url = api_urls.get(job.wiki_page_language) or _get_api_url(
+            job.wiki_page_language
+        )
+        host = urlsplit(url).netloc
+        if host not in hosts_semaphores:
+            hosts_semaphores[host] = asyncio.Semaphore(host_concurrency)
+            hosts_schedulers[host] = (
+                None if create_scheduler is None else create_scheduler()
+            )
+        try:
+            letters_to_animals_count = await _count_animals_for_each_letter(
+                _MediaWikiClient(
+                    session,
+                    url,
+                    hosts_semaphores[host],
+                    cache,
+                    hosts_schedulers[host],
+                ),
+                job.wiki_page_title,
+                job.letters,
+                job.wiki_page_language,
+                _used_params,
+                partitioned=partitioned,
+                sort_key_prefixes=job.sort_key_prefixes,
+                recursive=recursive,
+                folding=folding,
+                streamed=streamed,
+            )
+        except Exception as e:
+            # Any failure is the result of its job only, the other jobs go on
+            return e
+        if sink is not None:
+            sink.append(job, letters_to_animals_count)
+        return letters_to_animals_count
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=host_concurrency)
+    async with _create_session(
+        user_agent, _used_params["timeout"], connector
     ) as session:
-        # Do-While Loop Emulating
-        while _do_while_flag:
-            async with session.get(url, params=_used_params) as response:
-                raw = await response.json()
-            animal_names = (
-                categorymember["title"]
-                for categorymember in raw["query"]["categorymembers"]
+        try:
+            return await asyncio.gather(*(count(session, job) for job in jobs))
+        finally:
+            if sink is not None:
+                sink.flush()
+
+
+# Members of a category at `timestamp` (server time of the last update), which
+# can be brought up to date by requesting only the changes since then
+class CategorySnapshot:
+    __slots__ = (
+        "full_crawl_requests_count",
+        "last_update_requests_count",
+        "members",
+        "timestamp",
+        "wiki_page_title",
+    )
+
+    def __init__(
+        self,
+        wiki_page_title: str,
+        timestamp: str,
+        members: dict[int, str],
+        full_crawl_requests_count: int = 0,
+        last_update_requests_count: int = 0,
+    ) -> None:
+        self.wiki_page_title = wiki_page_title
+        self.timestamp = timestamp
+        # Page ID to title
+        self.members = members
+        self.full_crawl_requests_count = full_crawl_requests_count
+        self.last_update_requests_count = last_update_requests_count
+
+    def get_animals_count_for_each_letter(
+        self, letters: str, folding: LetterFolding = DEFAULT_LETTER_FOLDING
+    ) -> dict[str, int]:
+        letters_to_animals_count = dict.fromkeys(letters, 0)
+        _extend_letters_to_animals_count(
+            letters_to_animals_count, self.members.values(), folding
+        )
+        return letters_to_animals_count
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> Self:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        return cls(
+            raw["wiki_page_title"],
+            raw["timestamp"],
+            {int(page_id): title for page_id, title in raw["members"].items()},
+            raw["full_crawl_requests_count"],
+            raw["last_update_requests_count"],
+        )
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        _save_json(
+            path,
+            {
+                "wiki_page_title": self.wiki_page_title,
+                "timestamp": self.timestamp,
+                "members": self.members,
+                "full_crawl_requests_count": self.full_crawl_requests_count,
+                "last_update_requests_count": self.last_update_requests_count,
+            },
+        )
+
+
+def _is_recent_timestamp(timestamp: str, current_timestamp: str) -> bool:
+    return (
+        datetime.fromisoformat(current_timestamp) - datetime.fromisoformat(timestamp)
+        < RECENT_CHANGES_MAX_AGE
+    )
+
+
+async def _apply_category_changes(
+    client: _MediaWikiClient,
+    snapshot: CategorySnapshot,
+    _used_params: dict[str, Any],
+) -> None:
+    # Deleted and moved pages don't get categorization entries in the recent
+    # changes, so they are taken from the logs. Categorization entries refer to
+    # revisions of the (un)categorized pages, whose membership is then checked
+    members = snapshot.members
+    for log_type in ("delete", "move"):
+        async for raw in client.iterate_json(
+            {
+                **_used_params,
+                "action": "query",
+                "list": "logevents",
+                "letype": log_type,
+                "lestart": snapshot.timestamp,
+                "ledir": "newer",
+                "leprop": "ids|title|details|timestamp",
+                "lelimit": 500,
+            }
+        ):
+            for log_event in raw["query"]["logevents"]:
+                page_id = log_event.get("logpage")
+                if page_id not in members:
+                    continue
+                if log_type == "delete":
+                    del members[page_id]
+                else:
+                    members[page_id] = log_event["params"]["target_title"]
+
+    rev_ids: list[int] = []
+    async for raw in client.iterate_json(
+        {
+            **_used_params,
+            "action": "query",
+            "list": "recentchanges",
+            "rctype": "categorize",
+            "rctitle": snapshot.wiki_page_title,
+            "rcstart": snapshot.timestamp,
+            "rcdir": "newer",
+            "rcprop": "ids|timestamp",
+            "rclimit": 500,
+        }
+    ):
+        rev_ids.extend(
+            recent_change["revid"] for recent_change in raw["query"]["recentchanges"]
+        )
+
+    rev_ids = list(dict.fromkeys(rev_ids))
+    for i in range(0, len(rev_ids), REV_IDS_BATCH_SIZE):
+        async for raw in client.iterate_json(
+            {
+                **_used_params,
+                "action": "query",
+                "prop": "categories",
+                "clcategories": snapshot.wiki_page_title,
+                "cllimit": "max",
+                "revids": "|".join(map(str, rev_ids[i : i + REV_IDS_BATCH_SIZE])),
+            }
+        ):
+            for page in raw["query"].get("pages", {}).values():
+                if "missing" in page:
+                    continue
+                if page.get("categories"):
+                    members[page["pageid"]] = page["title"]
+                else:
+                    members.pop(page["pageid"], None)
+
+
+async def async_update_category_snapshot(
+    snapshot: CategorySnapshot | None,
+    wiki_page_title: str,
+    user_agent: str,
+    wiki_page_language: str,
+    *,
+    api_url: str | None = None,
+    sort_key_prefixes: str | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    streamed: bool = False,
+    cache: ResponseCache | None = None,
+    scheduler: RequestScheduler | None = None,
+    **query_params: Any,
+) -> CategorySnapshot:
+    # A snapshot of another category or older than the recent changes are kept
+    # is replaced with a full crawl, partitioned by `sort_key_prefixes` if given
+    _used_params = _get_used_params(query_params)
+    url = api_url or _get_api_url(wiki_page_language)
+
+    async with _create_session(user_agent, _used_params["timeout"]) as session:
+        client = _MediaWikiClient(
+            session, url, asyncio.Semaphore(concurrency), cache, scheduler
+        )
+        # The server time before any change is requested becomes the new
+        # timestamp. Only this request is left uncached, so the others may be
+        # served from `cache`
+        current_timestamp = (
+            await client.get_json(
+                {**_used_params, "action": "query", "curtimestamp": 1}
             )
-            _extend_letters_to_animals_count(letters_to_animals_count, animal_names)
-            if "continue" in raw:
-                _used_params["cmcontinue"] = raw["continue"]["cmcontinue"]
-            else:
-                _do_while_flag = False
-    return letters_to_animals_count
+        )["curtimestamp"]
+        if (
+            snapshot is not None
+            and snapshot.wiki_page_title == wiki_page_title
+            and _is_recent_timestamp(snapshot.timestamp, current_timestamp)
+        ):
+            await _apply_category_changes(client, snapshot, _used_params)
+            snapshot.timestamp = current_timestamp
+            snapshot.last_update_requests_count = client.requests_count
+            return snapshot
+
+        members: dict[int, str] = {}
+
+        def add_members(categorymembers: list[dict[str, Any]]) -> None:
+            for categorymember in categorymembers:
+                members[categorymember["pageid"]] = categorymember["title"]
+
+        await _crawl_category_members(
+            client,
+            {
+                **_used_params,
+                "action": "query",
+                "list": "categorymembers",
+                "cmtitle": wiki_page_title,
+                "cmprop": "ids|title",
+                "cmlimit": 500,
+            },
+            add_members,
+            sort_key_prefixes,
+            streamed,
+        )
+    return CategorySnapshot(
+        wiki_page_title,
+        current_timestamp,
+        members,
+        client.requests_count,
+        client.requests_count,
+    )
+
+
+async def async_get_animals_count_for_each_letter_from_snapshot(
+    snapshot_path: str | os.PathLike[str],
+    wiki_page_title: str,
+    letters: str,
+    user_agent: str,
+    wiki_page_language: str,
+    *,
+    folding: LetterFolding = DEFAULT_LETTER_FOLDING,
+    **kwargs: Any,
+) -> dict[str, int]:
+    # Loads the snapshot if it exists, brings it up to date and saves it back
+    snapshot = (
+        CategorySnapshot.load(snapshot_path) if os.path.exists(snapshot_path) else None
+    )
+    snapshot = await async_update_category_snapshot(
+        snapshot, wiki_page_title, user_agent, wiki_page_language, **kwargs
+    )
+    snapshot.save(snapshot_path)
+    return snapshot.get_animals_count_for_each_letter(letters, folding)
 
 
 if __name__ == "__main__":
-    import asyncio
-    import csv
-    import os
+    import sys
     from pathlib import Path
 
     from dotenv import load_dotenv
@@ -91,17 +1776,28 @@ if __name__ == "__main__":
     # wiki_page = wiki_wiki.page(WIKI_PAGE_TITLE)
     # animal_names = get_animals_count_for_each_letter(wiki_page, RUSSIAN_LETTERS)
 
+    module_dir = Path(__file__).parent.resolve()
+    # The output format is chosen by the extension
+    result_file_path = (
+        Path(sys.argv[1]) if len(sys.argv) > 1 else module_dir / "beasts.csv"
+    )
+    # Later runs request only the changes made since the snapshot, kept next to
+    # the output, e.g. `beasts_snapshot.json` for `beasts.csv`
+    snapshot_file_path = result_file_path.with_name(
+        f"{result_file_path.stem}_snapshot.json"
+    )
+
     animal_names = asyncio.run(
-        async_get_animals_count_for_each_letter(
+        async_get_animals_count_for_each_letter_from_snapshot(
+            snapshot_file_path,
             WIKI_PAGE_TITLE,
             RUSSIAN_LETTERS + ENGLISH_LETTERS,
             USER_AGENT,
             WIKI_PAGE_LANGUAGE,
+            # Latin sorts before Cyrillic in the wiki collation
+            sort_key_prefixes=ENGLISH_LETTERS + RUSSIAN_LETTERS,
         )
     )
 
-    module_dir = Path(__file__).parent.resolve()
-    result_file_path = module_dir / "beasts.csv"
-
-    with open(result_file_path, "w", newline="", encoding="utf-8-sig") as f:
-        csv.writer(f).writerows(animal_names.items())
+    with create_sink(result_file_path) as sink:
+        sink.write(animal_names)
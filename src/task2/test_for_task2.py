@@ -1,6 +1,84 @@
+import asyncio
+import csv
+import json
+import sqlite3
+import time
+
+import aiohttp
 import pytest
 
-from task2.solution import _extend_letters_to_animals_count
+import task2.solution
+from task2.fake_api_for_task2 import FakeMediaWikiApi
+from task2.solution import (
+    DEFAULT_CONCURRENCY,
+    CategorySnapshot,
+    CountingJob,
+    CrawlCheckpoint,
+    LetterFolding,
+    MediaWikiApiError,
+    RequestScheduler,
+    ResponseCache,
+    _extend_letters_to_animals_count,
+    _JsonStream,
+    _MediaWikiClient,
+    _PageIdSet,
+    async_get_animals_count_for_each_letter,
+    async_get_animals_count_for_each_letter_from_snapshot,
+    async_get_animals_counts_for_each_letter,
+    async_update_category_snapshot,
+    create_sink,
+)
+
+
+RUSSIAN_LETTERS = "АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
+ENGLISH_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+LETTERS = RUSSIAN_LETTERS + ENGLISH_LETTERS
+
+TITLES = tuple(
+    f"{first_letter}{suffix}"
+    for first_letter in LETTERS + "ёaz1«"
+    for suffix in ("", "кула", "ist", " (животное)")
+) + ("",)
+
+
+def get_expected_count(letters, titles):
+    letters_to_animals_count = dict.fromkeys(letters, 0)
+    _extend_letters_to_animals_count(letters_to_animals_count, titles)
+    return letters_to_animals_count
+
+
+async def walk_json_stream(body, chunk_size):
+    async def iterate_chunks():
+        encoded_body = body.encode()
+        for i in range(0, len(encoded_body), chunk_size):
+            yield encoded_body[i : i + chunk_size]
+
+    stream = _JsonStream(iterate_chunks())
+    raw = {}
+    async for key in stream.iterate_object():
+        if key == "query":
+            raw[key] = {}
+            async for query_key in stream.iterate_object():
+                raw[key][query_key] = [item async for item in stream.iterate_array()]
+        else:
+            raw[key] = await stream.read_value()
+    return raw
+
+
+def count_with_fake_api(fake_api_kwargs, letters=LETTERS, titles=TITLES, **kwargs):
+    async def count():
+        async with FakeMediaWikiApi(titles, **fake_api_kwargs) as fake_api:
+            result = await async_get_animals_count_for_each_letter(
+                "Категория:Животные_по_алфавиту",
+                letters,
+                "test-agent",
+                "ru",
+                api_url=fake_api.url,
+                **kwargs,
+            )
+        return result, fake_api.requests_count
+
+    return asyncio.run(count())
 
 
 def test_extend_letters_to_animals_count():
@@ -24,3 +102,723 @@ def test_extend_letters_to_animals_count_empty_names():
     names = []
     _extend_letters_to_animals_count(counter, names)
     assert counter["A"] == 0
+
+
+@pytest.mark.parametrize(
+    "folding, expected_counter",
+    [
+        (LetterFolding(), {"A": 2, "Е": 1, "Ё": 3, "Б": 1}),
+        (LetterFolding(normalization="NFKC"), {"A": 3, "Е": 1, "Ё": 3, "Б": 1}),
+        (LetterFolding(casefold=False), {"A": 1, "Е": 1, "Ё": 2, "Б": 0}),
+        (LetterFolding(normalization=None), {"A": 2, "Е": 2, "Ё": 2, "Б": 1}),
+        (LetterFolding(aliases=(("Ё", "Е"),)), {"A": 2, "Е": 4, "Ё": 0, "Б": 1}),
+    ],
+)
+def test_extend_letters_to_animals_count_folding(folding, expected_counter):
+    counter = dict.fromkeys("AЕЁБ", 0)
+    names = [
+        "apple",
+        "Ant",
+        "\uff21nt",
+        "ёж",
+        "Ёж",
+        "Е\u0308ж",
+        "Ель",
+        "банан",
+        "",
+        "1",
+    ]
+    _extend_letters_to_animals_count(counter, names, folding)
+    assert counter == expected_counter
+    with pytest.raises(ValueError):
+        _extend_letters_to_animals_count(
+            counter, names, LetterFolding(aliases=(("Ё", "Ж"),))
+        )
+
+
+def test_extend_letters_to_animals_count_heads():
+    counter = dict.fromkeys("ЕЁЙ", 0)
+    names = ["Й", "Е\u0308", "Е", "Ель", "Е\u0308ж", "И\u0306", "Е", "Ель", "Ё"]
+    _extend_letters_to_animals_count(counter, iter(names))
+    assert counter == {"Е": 4, "Ё": 3, "Й": 2}
+
+
+def test_extend_letters_to_animals_count_cache_size(monkeypatch):
+    monkeypatch.setattr(task2.solution, "FIRST_LETTERS_CACHE_SIZE", 10)
+    folding = LetterFolding(aliases=(("Q", "A"),))
+    counter = dict.fromkeys("AB", 0)
+    names = [f"{letter}{i}" for letter in "AB" for i in range(10)]
+    _extend_letters_to_animals_count(counter, names, folding)
+    assert counter == {"A": 10, "B": 10}
+    heads_counted_letters = task2.solution._get_first_letters_counter(
+        "AB", folding
+    )._heads_counted_letters
+    assert 0 < len(heads_counted_letters) <= 10
+
+
+@pytest.mark.parametrize("page_size", (1, 7, 500))
+def test_async_get_animals_count_for_each_letter(page_size):
+    result, requests_count = count_with_fake_api({"page_size": page_size})
+    assert result == get_expected_count(LETTERS, TITLES)
+    assert requests_count == max(1, -(-len(TITLES) // page_size))
+
+
+@pytest.mark.parametrize(
+    "sort_key_prefixes", (None, "".join(sorted(LETTERS)), "ZYX", "АA", "")
+)
+@pytest.mark.parametrize("concurrency", (1, 4))
+def test_async_get_animals_count_for_each_letter_partitioned(
+    sort_key_prefixes, concurrency
+):
+    result, _ = count_with_fake_api(
+        {"page_size": 3},
+        partitioned=True,
+        sort_key_prefixes=sort_key_prefixes,
+        concurrency=concurrency,
+    )
+    assert result == get_expected_count(LETTERS, TITLES)
+
+
+def test_async_get_animals_count_for_each_letter_partitioned_requests():
+    # With prefixes in the sort key order, ranges don't overlap
+    result, requests_count = count_with_fake_api(
+        {"page_size": 500},
+        partitioned=True,
+        sort_key_prefixes="".join(sorted(LETTERS)),
+    )
+    assert result == get_expected_count(LETTERS, TITLES)
+    assert requests_count == len(LETTERS) + 1
+
+
+def test_async_get_animals_count_for_each_letter_invalid_concurrency():
+    with pytest.raises(ValueError):
+        count_with_fake_api({}, partitioned=True, concurrency=0)
+
+
+@pytest.mark.parametrize("chunk_size", (0, 1, 5, 4096))
+@pytest.mark.parametrize("partitioned", (False, True))
+def test_async_get_animals_count_for_each_letter_streamed(chunk_size, partitioned):
+    result, _ = count_with_fake_api(
+        {"page_size": 7, "chunk_size": chunk_size},
+        partitioned=partitioned,
+        sort_key_prefixes="".join(sorted(LETTERS)),
+        streamed=True,
+    )
+    assert result == get_expected_count(LETTERS, TITLES)
+
+
+@pytest.mark.parametrize(
+    "body",
+    (
+        '{"continue": {"cmcontinue": "x"}, "query": {"categorymembers": []}}',
+        '{"query": {"pages": [], "categorymembers": [1, 2.5e3, "Ёж", null]}, "a": 1}',
+        " { } ",
+    ),
+)
+@pytest.mark.parametrize("chunk_size", (1, 3, 1000))
+def test_json_stream(body, chunk_size):
+    assert asyncio.run(walk_json_stream(body, chunk_size)) == json.loads(body)
+
+
+@pytest.mark.parametrize(
+    "body",
+    (
+        '{"batchcomplete": "", "query": {"categorymembers": [{"title": 1}]} ',
+        '{"query": {"categorymembers": [1 2]}}',
+        "[]",
+        "",
+    ),
+)
+@pytest.mark.parametrize("chunk_size", (1, 3, 1000))
+def test_json_stream_invalid(body, chunk_size):
+    with pytest.raises(ValueError):
+        asyncio.run(walk_json_stream(body, chunk_size))
+
+
+def test_async_update_category_snapshot(tmp_path):
+    snapshot_path = tmp_path / "snapshot.json"
+
+    async def update(fake_api):
+        return await async_get_animals_count_for_each_letter_from_snapshot(
+            snapshot_path,
+            fake_api.wiki_page_title,
+            LETTERS,
+            "test-agent",
+            "ru",
+            api_url=fake_api.url,
+        )
+
+    async def run():
+        async with FakeMediaWikiApi(TITLES, page_size=10) as fake_api:
+            assert await update(fake_api) == get_expected_count(LETTERS, TITLES)
+            full_crawl_requests_count = fake_api.requests_count
+
+            titles = dict(enumerate(TITLES, 1))
+            titles[fake_api.add_member("Ёж")] = "Ёж"
+            titles[fake_api.add_member("Zebra")] = "Zebra"
+            for page_id in (1, 2):
+                fake_api.remove_member(page_id)
+                del titles[page_id]
+            fake_api.delete_page(5)
+            del titles[5]
+            fake_api.move_page(6, "Кит")
+            titles[6] = "Кит"
+            fake_api.move_page(7, "Yak")
+            fake_api.remove_member(7)
+            del titles[7]
+            page_id = fake_api.add_member("Угорь")
+            fake_api.move_page(page_id, "Рыба")
+            titles[page_id] = "Рыба"
+
+            fake_api.requests_count = 0
+            expected_count = get_expected_count(LETTERS, titles.values())
+            assert await update(fake_api) == expected_count
+            delta_requests_count = fake_api.requests_count
+            assert delta_requests_count < full_crawl_requests_count
+
+            fake_api.requests_count = 0
+            assert await update(fake_api) == expected_count
+            # The server time and the lists of deletions, moves and categorizations
+            assert fake_api.requests_count == 4
+
+        snapshot = CategorySnapshot.load(snapshot_path)
+        assert snapshot.members == titles
+        assert snapshot.full_crawl_requests_count == full_crawl_requests_count
+        assert snapshot.last_update_requests_count == 4
+
+    asyncio.run(run())
+
+
+def test_async_update_category_snapshot_full_crawl():
+    async def run():
+        async with FakeMediaWikiApi(TITLES, page_size=10) as fake_api:
+            snapshot = await async_update_category_snapshot(
+                None,
+                fake_api.wiki_page_title,
+                "test-agent",
+                "ru",
+                api_url=fake_api.url,
+                sort_key_prefixes=LETTERS,
+            )
+            assert snapshot.members == dict(enumerate(TITLES, 1))
+            assert snapshot.timestamp == "2025-01-01T00:00:00Z"
+
+            for old_snapshot in (
+                CategorySnapshot("Категория:Другая", snapshot.timestamp, {}),
+                CategorySnapshot(fake_api.wiki_page_title, "2024-01-01T00:00:00Z", {}),
+            ):
+                new_snapshot = await async_update_category_snapshot(
+                    old_snapshot,
+                    fake_api.wiki_page_title,
+                    "test-agent",
+                    "ru",
+                    api_url=fake_api.url,
+                )
+                assert new_snapshot is not old_snapshot
+                assert new_snapshot.members == snapshot.members
+
+    asyncio.run(run())
+
+
+def test_async_update_category_snapshot_cache():
+    async def run():
+        async with FakeMediaWikiApi(TITLES, page_size=10) as fake_api:
+            for _ in range(2):
+                snapshot = await async_update_category_snapshot(
+                    None,
+                    fake_api.wiki_page_title,
+                    "test-agent",
+                    "ru",
+                    api_url=fake_api.url,
+                    cache=cache,
+                )
+                assert snapshot.members == dict(enumerate(TITLES, 1))
+
+    with ResponseCache() as cache:
+        asyncio.run(run())
+        assert cache.misses > 0 and cache.hits == cache.misses
+
+
+def count_with_cache(cache, fake_api_kwargs, counts_count, **kwargs):
+    async def count():
+        results = []
+        async with FakeMediaWikiApi(TITLES, **fake_api_kwargs) as fake_api:
+            for _ in range(counts_count):
+                results.append(
+                    await async_get_animals_count_for_each_letter(
+                        fake_api.wiki_page_title,
+                        LETTERS,
+                        "test-agent",
+                        "ru",
+                        api_url=fake_api.url,
+                        cache=cache,
+                        **kwargs,
+                    )
+                )
+        return results, fake_api
+
+    return asyncio.run(count())
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+def test_response_cache(streamed):
+    with ResponseCache() as cache:
+        results, fake_api = count_with_cache(
+            cache, {"page_size": 10}, 3, streamed=streamed
+        )
+        assert results == [get_expected_count(LETTERS, TITLES)] * 3
+        assert cache.misses == fake_api.requests_count
+        assert cache.hits == 2 * fake_api.requests_count
+        assert cache.revalidations == 0
+
+
+@pytest.mark.parametrize("etags", [False, True])
+def test_response_cache_stale(etags):
+    with ResponseCache(ttl=0) as cache:
+        results, fake_api = count_with_cache(
+            cache, {"page_size": 10, "etags": etags}, 2
+        )
+        assert results == [get_expected_count(LETTERS, TITLES)] * 2
+        assert cache.hits == 0
+        if etags:
+            assert fake_api.requests_count == 2 * cache.misses
+            assert cache.revalidations == fake_api.not_modified_count == cache.misses
+        else:
+            assert fake_api.requests_count == cache.misses
+            assert cache.revalidations == 0
+            assert cache.get_size() == 0
+
+
+def test_response_cache_file(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    with ResponseCache(path) as cache:
+        count_with_cache(cache, {"page_size": 10}, 1)
+        size = cache.get_size()
+    with ResponseCache(path) as cache:
+        assert cache.get_size() == size
+        cache.delete(cache.get_key("url", {}))
+        assert cache.get_size() == size
+
+
+def test_response_cache_eviction():
+    with ResponseCache(max_size=1000) as cache:
+        for i in range(100):
+            cache.set(cache.get_key("url", {"i": i}), str(i).encode() * 100, None, None)
+            assert cache.get_size() <= 1000
+        assert cache.get(cache.get_key("url", {"i": 0})) is None
+        cached_response = cache.get(cache.get_key("url", {"i": 99}))
+        assert cached_response.body == b"99" * 100
+        assert cached_response.is_fresh
+
+
+def test_response_cache_error():
+    async def run():
+        async with FakeMediaWikiApi(TITLES) as fake_api:
+            async with aiohttp.ClientSession() as session:
+                client = _MediaWikiClient(session, fake_api.url, cache=cache)
+                for _ in range(2):
+                    with pytest.raises(MediaWikiApiError, match="badvalue"):
+                        await client.get_json({"action": "unknown"})
+                    with pytest.raises(MediaWikiApiError, match="badvalue"):
+                        async for _ in client.stream_list({"action": "unknown"}, "x"):
+                            pass
+        return fake_api.requests_count
+
+    with ResponseCache() as cache:
+        assert asyncio.run(run()) == 4
+        assert cache.get_size() == 0
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_async_get_animals_count_for_each_letter_checkpoint(
+    tmp_path, streamed, partitioned
+):
+    checkpoint_path = tmp_path / "checkpoint.json"
+
+    async def count(fake_api):
+        return await async_get_animals_count_for_each_letter(
+            fake_api.wiki_page_title,
+            LETTERS,
+            "test-agent",
+            "ru",
+            api_url=fake_api.url,
+            partitioned=partitioned,
+            concurrency=1,
+            streamed=streamed,
+            checkpoint_path=checkpoint_path,
+            checkpoint_interval=3,
+        )
+
+    async def run():
+        async with FakeMediaWikiApi(TITLES, page_size=5) as fake_api:
+            assert await count(fake_api) == get_expected_count(LETTERS, TITLES)
+            assert not checkpoint_path.exists()
+            full_crawl_requests_count = fake_api.requests_count
+
+            fake_api.requests_count = 0
+            fake_api.max_requests_count = 10
+            with pytest.raises(MediaWikiApiError, match="internal_api_error"):
+                await count(fake_api)
+            checkpoint = CrawlCheckpoint.load(checkpoint_path)
+            assert checkpoint.pages_count == 9
+            assert sum(checkpoint.letters_to_animals_count.values()) > 0
+
+            fake_api.requests_count = 0
+            fake_api.max_requests_count = None
+            assert await count(fake_api) == get_expected_count(LETTERS, TITLES)
+            assert not checkpoint_path.exists()
+            assert (
+                fake_api.requests_count
+                == full_crawl_requests_count - checkpoint.pages_count
+            )
+
+    asyncio.run(run())
+
+
+def test_async_get_animals_count_for_each_letter_other_checkpoint(tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    CrawlCheckpoint(
+        "Категория:Другая", "ru", None, [None], {letter: 100 for letter in LETTERS}
+    ).save(checkpoint_path)
+    result, _ = count_with_fake_api({}, checkpoint_path=checkpoint_path)
+    assert result == get_expected_count(LETTERS, TITLES)
+    assert not checkpoint_path.exists()
+    with pytest.raises(ValueError):
+        count_with_fake_api({}, checkpoint_interval=0)
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_async_get_animals_counts_for_each_letter(partitioned):
+    languages_titles = {
+        "ru": TITLES,
+        "en": TITLES[: len(TITLES) // 2],
+        "uk": TITLES[len(TITLES) // 2 :],
+    }
+    jobs = [
+        CountingJob(language, f"Категория:{i}", letters)
+        for language in languages_titles
+        for i, letters in enumerate((LETTERS, RUSSIAN_LETTERS, ENGLISH_LETTERS))
+    ]
+
+    async def run():
+        async with (
+            FakeMediaWikiApi(languages_titles["ru"], page_size=10, latency=0.01) as ru,
+            FakeMediaWikiApi(languages_titles["en"], page_size=10, latency=0.01) as en,
+            FakeMediaWikiApi(languages_titles["uk"], max_requests_count=0) as uk,
+        ):
+            results = await async_get_animals_counts_for_each_letter(
+                jobs,
+                "test-agent",
+                api_urls={"ru": ru.url, "en": en.url, "uk": uk.url},
+                concurrency=5,
+                host_concurrency=3,
+                partitioned=partitioned,
+            )
+        return results, (ru, en, uk)
+
+    results, fake_apis = asyncio.run(run())
+    for job, result in zip(jobs, results):
+        if job.wiki_page_language == "uk":
+            assert isinstance(result, MediaWikiApiError)
+        else:
+            assert result == get_expected_count(
+                job.letters, languages_titles[job.wiki_page_language]
+            )
+    for fake_api in fake_apis:
+        assert 1 <= fake_api.max_active_requests_count <= 3
+    assert fake_apis[0].max_active_requests_count == 3
+
+
+def test_async_get_animals_counts_for_each_letter_http_error():
+    jobs = [
+        CountingJob(language, f"Категория:{i}", letters)
+        for language in ("ru", "uk")
+        for i, letters in enumerate((LETTERS, RUSSIAN_LETTERS))
+    ]
+
+    async def run():
+        async with (
+            FakeMediaWikiApi(TITLES, page_size=10, latency=0.01) as ru,
+            FakeMediaWikiApi(TITLES, max_requests_count=0, error_status=502) as uk,
+        ):
+            return await async_get_animals_counts_for_each_letter(
+                jobs, "test-agent", api_urls={"ru": ru.url, "uk": uk.url}
+            )
+
+    results = asyncio.run(run())
+    for job, result in zip(jobs, results):
+        if job.wiki_page_language == "uk":
+            assert isinstance(result, aiohttp.ClientResponseError)
+            assert result.status == 502
+        else:
+            assert result == get_expected_count(job.letters, TITLES)
+
+
+def test_get_json_invalid_json():
+    async def run():
+        async with (
+            FakeMediaWikiApi(TITLES, max_requests_count=0, error_status=200) as api,
+            aiohttp.ClientSession() as session,
+        ):
+            await _MediaWikiClient(session, api.url).get_json({"action": "query"})
+
+    with pytest.raises(MediaWikiApiError) as exc_info:
+        asyncio.run(run())
+    assert exc_info.value.code == "invalidjson"
+
+
+def test_async_get_animals_counts_for_each_letter_invalid_concurrency():
+    for kwargs in ({"concurrency": 0}, {"host_concurrency": 0}):
+        with pytest.raises(ValueError):
+            asyncio.run(
+                async_get_animals_counts_for_each_letter([], "test-agent", **kwargs)
+            )
+
+
+def test_async_get_animals_counts_for_each_letter_global_concurrency():
+    async def run():
+        async with (
+            FakeMediaWikiApi(TITLES, page_size=10, latency=0.01) as ru,
+            FakeMediaWikiApi(TITLES, page_size=10, latency=0.01) as en,
+        ):
+            results = await async_get_animals_counts_for_each_letter(
+                [
+                    CountingJob(language, "Категория:0", LETTERS)
+                    for language in ("ru", "en")
+                ],
+                "test-agent",
+                api_urls={"ru": ru.url, "en": en.url},
+                concurrency=2,
+                host_concurrency=3,
+                partitioned=True,
+            )
+        assert results == [get_expected_count(LETTERS, TITLES)] * 2
+        assert max(ru.max_active_requests_count, en.max_active_requests_count) <= 2
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+@pytest.mark.parametrize("retry_after", [None, "0.01", "Wed, 21 Oct 2015 07:28:00 GMT"])
+def test_request_scheduler_retries(streamed, retry_after):
+    scheduler = RequestScheduler(max_retries=10, backoff_base=0.001)
+    result, requests_count = count_with_fake_api(
+        {
+            "page_size": 10,
+            "throttle_every": 7,
+            "lag_every": 11,
+            "retry_after": retry_after,
+        },
+        partitioned=True,
+        streamed=streamed,
+        scheduler=scheduler,
+    )
+    assert result == get_expected_count(LETTERS, TITLES)
+    assert 0 < scheduler.retries_count < requests_count
+
+
+def test_request_scheduler_retries_exhausted():
+    scheduler = RequestScheduler(max_retries=2, backoff_base=0.001)
+
+    async def run():
+        async with FakeMediaWikiApi(TITLES, throttle_every=1) as fake_api:
+            async with aiohttp.ClientSession() as session:
+                client = _MediaWikiClient(session, fake_api.url, scheduler=scheduler)
+                with pytest.raises(aiohttp.ClientResponseError) as exc_info:
+                    await client.get_json({"action": "query"})
+                assert exc_info.value.status == 429
+                assert fake_api.requests_count == client.requests_count == 3
+
+    asyncio.run(run())
+
+
+def test_request_scheduler_rate():
+    scheduler = RequestScheduler(rate=200, burst=5)
+    start = time.perf_counter()
+    _, requests_count = count_with_fake_api({"page_size": 5}, scheduler=scheduler)
+    assert time.perf_counter() - start >= (requests_count - 5) / 200
+    with pytest.raises(ValueError):
+        RequestScheduler(rate=0)
+    with pytest.raises(ValueError):
+        RequestScheduler(min_concurrency=4, max_concurrency=2)
+
+
+def test_request_scheduler_concurrency():
+    async def run():
+        scheduler = RequestScheduler(max_concurrency=8, min_concurrency=2)
+        scheduler.on_failure(0, None)
+        assert scheduler.concurrency == 4
+        for _ in range(2):
+            scheduler.on_failure(0, None)
+        assert scheduler.concurrency == 2
+        for _ in range(5):
+            async with scheduler.slot() as on_response:
+                on_response()
+        assert scheduler.concurrency == 4
+        for _ in range(100):
+            async with scheduler.slot() as on_response:
+                on_response()
+        assert scheduler.concurrency == 8
+
+        scheduler = RequestScheduler(target_latency=0.01)
+        async with FakeMediaWikiApi(
+            TITLES, page_size=10, slow_every=1, slow_latency=0.02
+        ) as fake_api:
+            async with aiohttp.ClientSession() as session:
+                client = _MediaWikiClient(session, fake_api.url, scheduler=scheduler)
+                await client.get_json({"action": "query"})
+                assert scheduler.concurrency == DEFAULT_CONCURRENCY // 2
+                await asyncio.gather(
+                    *(client.get_json({"action": "query"}) for _ in range(10))
+                )
+                assert scheduler.concurrency == 1
+                assert fake_api.max_active_requests_count <= DEFAULT_CONCURRENCY // 2
+
+    asyncio.run(run())
+
+
+SUBCATEGORIES = {
+    "Категория:Млекопитающие": ("Волк", "Барсук", "Аист", "Категория:Хищные"),
+    "Категория:Птицы": ("Аист", "Ворона", "Категория:Млекопитающие"),
+    "Категория:Хищные": ("Волк", "Лиса", "Категория:Животные по алфавиту"),
+}
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_async_get_animals_count_for_each_letter_recursive(streamed, partitioned):
+    result, requests_count = count_with_fake_api(
+        {"page_size": 10, "subcategories": SUBCATEGORIES},
+        titles=TITLES + ("Категория:Млекопитающие", "Категория:Птицы"),
+        recursive=True,
+        partitioned=partitioned,
+        streamed=streamed,
+    )
+    assert result == get_expected_count(
+        LETTERS, TITLES + ("Волк", "Барсук", "Аист", "Ворона", "Лиса")
+    )
+    _, root_requests_count = count_with_fake_api(
+        {"page_size": 10, "subcategories": SUBCATEGORIES},
+        titles=TITLES + ("Категория:Млекопитающие", "Категория:Птицы"),
+        partitioned=partitioned,
+    )
+    assert requests_count == root_requests_count + len(SUBCATEGORIES)
+    with pytest.raises(ValueError):
+        count_with_fake_api({}, recursive=True, checkpoint_path="checkpoint.json")
+
+
+def test_page_id_set():
+    page_ids = _PageIdSet()
+    assert len(page_ids) == 0 and 0 not in page_ids and 10**6 not in page_ids
+    for page_id in (5, 0, 10**6, 5, 7, 10**6):
+        page_ids.add(page_id)
+    assert len(page_ids) == 4
+    assert [page_id for page_id in range(10**6 + 10) if page_id in page_ids] == [
+        0,
+        5,
+        7,
+        10**6,
+    ]
+    assert not page_ids.add(7) and page_ids.add(8)
+    copied_page_ids = _PageIdSet(bytes(page_ids))
+    assert len(copied_page_ids) == 5 and 8 in copied_page_ids
+
+
+def read_sink(path):
+    if not path.exists():
+        return []
+    if path.suffix == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return [tuple(row) for row in csv.reader(f)]
+    if path.suffix == ".jsonl":
+        with open(path, encoding="utf-8") as f:
+            return [tuple(json.loads(line).values()) for line in f]
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute("SELECT * FROM counts ORDER BY rowid").fetchall()
+    connection.close()
+    return [row[2:] if row[0] == "" else row for row in rows]
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl", ".sqlite"])
+def test_sink(tmp_path, suffix):
+    path = tmp_path / f"beasts{suffix}"
+    in_text = suffix == ".csv"
+    with create_sink(path) as sink:
+        sink.write({"А": 1, "Б": 0})
+        sink.write({"А": 2, "Б": 3})
+    expected_rows = [("А", 2), ("Б", 3)]
+    if in_text:
+        expected_rows = [(letter, str(count)) for letter, count in expected_rows]
+    assert read_sink(path) == expected_rows
+    assert list(tmp_path.iterdir()) == [path]
+
+    path.unlink()
+    jobs = [CountingJob("ru", f"Категория:{i}", "АБ") for i in range(5)]
+    with create_sink(path, batch_size=2) as sink:
+        for i, job in enumerate(jobs):
+            sink.append(job, {"А": i, "Б": i + 1})
+            assert len(read_sink(path)) == (i + 1) // 2 * 4
+    expected_rows = [
+        (job.wiki_page_language, job.wiki_page_title, letter, animals_count)
+        for i, job in enumerate(jobs)
+        for letter, animals_count in (("А", i), ("Б", i + 1))
+    ]
+    if in_text:
+        expected_rows = [(*row[:3], str(row[3])) for row in expected_rows]
+    assert read_sink(path) == expected_rows
+    assert list(tmp_path.iterdir()) == [path]
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl", ".sqlite"])
+def test_sink_replaces_counts_of_same_job(tmp_path, suffix):
+    path = tmp_path / f"beasts{suffix}"
+    jobs = [CountingJob("ru", f"Категория:{i}", "АБ") for i in range(3)]
+    with create_sink(path, batch_size=2) as sink:
+        sink.write({"А": 1})
+        sink.append(jobs[0], {"А": 1, "Б": 2})
+        sink.append(jobs[0], {"А": 2, "Б": 3})
+        sink.append(jobs[1], {"А": 4})
+        sink.append(jobs[0], {"А": 5})
+    with create_sink(path, batch_size=1) as sink:
+        sink.append(jobs[2], {"Б": 6})
+        sink.append(jobs[1], {"Б": 7})
+    expected_rows = [
+        ("А", 1),
+        ("ru", "Категория:0", "А", 5),
+        ("ru", "Категория:2", "Б", 6),
+        ("ru", "Категория:1", "Б", 7),
+    ]
+    if suffix == ".csv":
+        expected_rows = [(*row[:-1], str(row[-1])) for row in expected_rows]
+    assert read_sink(path) == expected_rows
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_create_sink_unsupported(tmp_path):
+    with pytest.raises(ValueError):
+        create_sink(tmp_path / "beasts.parquet")
+
+
+def test_async_get_animals_counts_for_each_letter_sink(tmp_path):
+    path = tmp_path / "beasts.jsonl"
+    jobs = [CountingJob("ru", f"Категория:{i}", RUSSIAN_LETTERS) for i in range(3)]
+
+    async def run():
+        async with FakeMediaWikiApi(TITLES, page_size=10) as fake_api:
+            with create_sink(path, batch_size=2) as sink:
+                return await async_get_animals_counts_for_each_letter(
+                    jobs,
+                    "test-agent",
+                    api_urls={"ru": fake_api.url},
+                    sink=sink,
+                )
+
+    results = asyncio.run(run())
+    expected_count = get_expected_count(RUSSIAN_LETTERS, TITLES)
+    assert results == [expected_count] * len(jobs)
+    assert sorted(read_sink(path)) == sorted(
+        (job.wiki_page_language, job.wiki_page_title, letter, animals_count)
+        for job in jobs
+        for letter, animals_count in expected_count.items()
+    )
@@ -0,0 +1,155 @@
+import os
+import random
+import time
+from importlib.util import find_spec
+from typing import (
+    Any,
+    Callable,
+)
+
+from task3.solution import (
+    appearance,
+    appearance_many,
+    appearance_parallel,
+)
+
+
+LESSON_DURATION = 3600
+# NumPy isn't a dependency of the project
+NUMPY_INSTALLED = find_spec("numpy") is not None
+
+
+def _generate_lessons(
+    lessons_count: int, max_intervals_count: int, seed: int = 0
+) -> list[dict[str, list[int]]]:
+    # Pupils and tutors reconnect a few times around a lesson of an hour
+    rng = random.Random(seed)
+    lessons = []
+    for _ in range(lessons_count):
+        start = rng.randrange(1_500_000_000, 1_700_000_000)
+        intervals = {"lesson": [start, start + LESSON_DURATION]}
+        for entity in ("pupil", "tutor"):
+            intervals[entity] = sorted(
+                rng.randrange(start - 600, start + LESSON_DURATION + 600)
+                for _ in range(2 * rng.randint(1, max_intervals_count))
+            )
+        lessons.append(intervals)
+    return lessons
+
+
+def _seconds(call: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+def _print_results(title: str, results: dict[str, str]) -> None:
+    print(title)
+    for name, result in results.items():
+        print(f"    {name:<40}{result:>16}")
+
+
+def benchmark_appearance_many() -> None:
+    lessons_count = 1_000_000
+    lessons = _generate_lessons(lessons_count, 6)
+    results = {}
+    for name, call in (
+        (
+            "appearance in a loop",
+            lambda: [appearance(intervals) for intervals in lessons],
+        ),
+        ("appearance_many", lambda: appearance_many(lessons)),
+    ):
+        results[name] = f"{_seconds(call):.2f} s"
+    _print_results(f"Overlap of {lessons_count} lessons", results)
+
+
+def benchmark_numpy_backend() -> None:
+    results = {}
+    for lessons_count, max_intervals_count in (
+        (100_000, 6),
+        (1000, 1000),
+        (20, 50_000),
+    ):
+        lessons = _generate_lessons(lessons_count, max_intervals_count)
+        for name, call in (
+            (
+                "appearance in a loop",
+                lambda: [appearance(intervals) for intervals in lessons],
+            ),
+            ("python", lambda: appearance_many(lessons)),
+            ("numpy", lambda: appearance_many(lessons, "numpy")),
+        ):
+            if name == "numpy" and not NUMPY_INSTALLED:
+                continue
+            results[f"{name}, {lessons_count} lessons"] = f"{_seconds(call):.2f} s"
+    _print_results(
+        "Backends of appearance_many, up to 6, 1000 and 50000 intervals per entity",
+        results,
+    )
+
+
+def _generate_sessions(
+    lessons_count: int, intervals_count: int, sorted_: bool, seed: int = 0
+) -> list[dict[str, list[int]]]:
+    # Long sessions as logged, i.e. reconnects sorted by time, overlapping the
+    # previous connections now and then
+    rng = random.Random(seed)
+    lessons = []
+    for _ in range(lessons_count):
+        start = rng.randrange(1_500_000_000, 1_700_000_000)
+        duration = 10 * intervals_count
+        intervals = {"lesson": [start, start + duration]}
+        for entity in ("pupil", "tutor"):
+            entity_intervals = []
+            connection_start = start - 60
+            for _ in range(intervals_count):
+                connection_start += rng.randrange(1, 20)
+                entity_intervals.append(
+                    (connection_start, connection_start + rng.randrange(1, 25))
+                )
+            if not sorted_:
+                rng.shuffle(entity_intervals)
+            intervals[entity] = [
+                bound for bounds in entity_intervals for bound in bounds
+            ]
+        lessons.append(intervals)
+    return lessons
+
+
+def benchmark_merge_backend() -> None:
+    results = {}
+    for sorted_ in (True, False):
+        lessons = _generate_sessions(200, 5000, sorted_)
+        order = "sorted" if sorted_ else "shuffled"
+        for backend in ("python", "numpy", "merge"):
+            if backend == "numpy" and not NUMPY_INSTALLED:
+                continue
+            results[f"{backend}, {order}"] = (
+                f"{_seconds(lambda: appearance_many(lessons, backend)):.2f} s"
+            )
+    _print_results(
+        "Backends of appearance_many, 200 sessions of 5000 intervals per entity",
+        results,
+    )
+
+
+def benchmark_parallel() -> None:
+    lessons_count = 400_000
+    lessons = _generate_lessons(lessons_count, 6)
+    results = {"appearance_many": f"{_seconds(lambda: appearance_many(lessons)):.2f} s"}
+    for max_workers in (1, 2, 4, 8):
+        seconds = _seconds(
+            lambda: list(appearance_parallel(lessons, max_workers=max_workers))
+        )
+        results[f"appearance_parallel, {max_workers} workers"] = f"{seconds:.2f} s"
+    _print_results(
+        f"Overlap of {lessons_count} lessons, {os.process_cpu_count()} CPUs", results
+    )
+
+
+if __name__ == "__main__":
+    benchmark_appearance_many()
+    benchmark_numpy_backend()
+    benchmark_merge_backend()
+    benchmark_parallel()
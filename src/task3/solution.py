@@ -1,16 +1,62 @@
+import json
+import os
+from array import array
+from bisect import (
+    bisect_left,
+    bisect_right,
+)
+from collections import deque
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+)
+from copy import copy
 from datetime import (
     datetime,
     timedelta,
     timezone,
 )
 from decimal import Decimal
+from heapq import (
+    heappop,
+    heappush,
+)
+from itertools import (
+    accumulate,
+    batched,
+    chain,
+    compress,
+)
+from operator import (
+    gt,
+    le,
+    lt,
+)
 from typing import (
+    Any,
+    Callable,
+    Collection,
     Iterable,
+    Iterator,
+    Literal,
     Mapping,
+    Sequence,
+    cast,
 )
 
 
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+
+DEFAULT_PARALLEL_CHUNK_SIZE = 2000
+
 _unix_epoch_start = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Integer timestamps which `appearance` accepts, i.e. of the `datetime` range
+_MIN_INT_TIMESTAMP = -62135596800
+_MAX_INT_TIMESTAMP = 253402300799
 
 
 def appearance(
@@ -57,19 +103,464 @@ def appearance(
 
     appearance_counts = dict.fromkeys(validated_intervals, 0)
     total_overlap_time = Decimal(0)
-    start_time = Decimal(-1)
+    # Not a sentinel timestamp, as timestamps before the epoch are negative
+    start_time: Decimal | None = None
     for enter_or_exit in enters_or_exits:
         appearance_counts[enter_or_exit[2]] += enter_or_exit[1]
         if all(appearance_counts.values()):
-            if start_time == -1:
+            if start_time is None:
                 start_time = enter_or_exit[0]
-        elif start_time > -1:
+        elif start_time is not None:
             total_overlap_time += enter_or_exit[0] - start_time
-            start_time = Decimal(-1)
+            start_time = None
 
     return total_overlap_time
 
 
+# The sweep line of `appearance` over integer timestamps. An event is encoded
+# as a single int, `timestamp * (2 * entities_count) + 2 * entity + is_exit`,
+# as ints sort much faster than tuples, and the order of events of the same
+# timestamp doesn't affect the total. Instead of checking all the counts at
+# every event, the number of entities with a zero count is kept
+def _int_appearance(timestamps_of_entities: list[list[int]]) -> int:
+    codes_count = 2 * len(timestamps_of_entities)
+    events = []
+    for entity, timestamps in enumerate(timestamps_of_entities):
+        enter_code = 2 * entity
+        events.extend(
+            [timestamp * codes_count + enter_code for timestamp in timestamps[::2]]
+        )
+        events.extend(
+            [timestamp * codes_count + enter_code + 1 for timestamp in timestamps[1::2]]
+        )
+    events.sort()
+
+    deltas = [1, -1] * len(timestamps_of_entities)
+    appearance_counts = [0] * len(timestamps_of_entities)
+    absent_count = len(timestamps_of_entities)
+    total_overlap_time = 0
+    start_time = None
+    for event in events:
+        timestamp, code = divmod(event, codes_count)
+        appearance_count = appearance_counts[code >> 1]
+        new_appearance_count = appearance_count + deltas[code]
+        appearance_counts[code >> 1] = new_appearance_count
+        if not appearance_count:
+            absent_count -= 1
+        elif not new_appearance_count:
+            absent_count += 1
+        if not absent_count:
+            if start_time is None:
+                start_time = timestamp
+        elif start_time is not None:
+            total_overlap_time += timestamp - start_time
+            start_time = None
+
+    return total_overlap_time
+
+
+# The same sweep line vectorized. The enters and exits of every entity are
+# sorted by time, and as every entity has as many exits as enters, a single
+# cumulative sum gives the counts of all the entities. The times an entity
+# appears or disappears, after all its events of a time, are then merged and
+# sorted, and the overlap is the sum of the gaps after the times when all the
+# entities are present
+def _numpy_appearance(timestamps_of_entities: list[list[int]]) -> int:
+    if not timestamps_of_entities:
+        return 0
+    timestamps = np.concatenate(timestamps_of_entities, dtype=np.int64)
+    lengths = [len(timestamps) for timestamps in timestamps_of_entities]
+    entities = np.repeat(np.arange(len(timestamps_of_entities)), lengths)
+    deltas = np.tile(np.array([1, -1], dtype=np.int64), len(timestamps) // 2)
+
+    order = np.lexsort((timestamps, entities))
+    timestamps = timestamps[order]
+    entities = entities[order]
+    is_present = np.cumsum(deltas[order]) != 0
+    is_last_of_time = np.ones(len(timestamps), dtype=bool)
+    is_last_of_time[:-1] = (entities[1:] != entities[:-1]) | (
+        timestamps[1:] != timestamps[:-1]
+    )
+    timestamps = timestamps[is_last_of_time]
+    entities = entities[is_last_of_time]
+    is_present = is_present[is_last_of_time]
+    was_present = np.zeros(len(is_present), dtype=bool)
+    was_present[1:] = is_present[:-1] & (entities[1:] == entities[:-1])
+    is_changed = is_present != was_present
+
+    changes_timestamps = timestamps[is_changed]
+    changes_order = np.argsort(changes_timestamps)
+    changes_timestamps = changes_timestamps[changes_order]
+    present_counts = np.cumsum(np.where(is_present[is_changed], 1, -1)[changes_order])
+    is_last_of_time = np.ones(len(changes_timestamps), dtype=bool)
+    is_last_of_time[:-1] = changes_timestamps[1:] != changes_timestamps[:-1]
+    changes_timestamps = changes_timestamps[is_last_of_time]
+    is_all_present = present_counts[is_last_of_time] == len(timestamps_of_entities)
+    return int(np.diff(changes_timestamps)[is_all_present[:-1]].sum())
+
+
+# Union of the intervals of an entity as increasing bounds of disjoint intervals,
+# without sorting if the intervals are sorted by their starts, as in an event
+# log. An interval starts a new one of the union if it starts after the latest
+# end of the previous ones. None if an interval ends before it starts, as such
+# an entity isn't a union of intervals for `appearance`
+def _merge_intervals(timestamps: list[int]) -> list[int] | None:
+    starts = timestamps[::2]
+    ends = timestamps[1::2]
+    if not all(map(lt, starts, ends)):
+        if not all(map(le, starts, ends)):
+            return None
+        # Intervals of no length are of no entity presence
+        is_not_empty = list(map(lt, starts, ends))
+        starts = list(compress(starts, is_not_empty))
+        ends = list(compress(ends, is_not_empty))
+    if not all(map(le, starts, starts[1:])):
+        intervals = sorted(zip(starts, ends))
+        starts = [start for start, _ in intervals]
+        ends = [end for _, end in intervals]
+
+    latest_ends = list(accumulate(ends, max))
+    is_merged_start = [True, *map(gt, starts[1:], latest_ends)]
+    merged_starts = list(compress(starts, is_merged_start))
+    merged_bounds = [0] * (2 * len(merged_starts))
+    merged_bounds[::2] = merged_starts
+    merged_bounds[1::2] = compress(latest_ends, [*is_merged_start[1:], True])
+    return merged_bounds
+
+
+# Intersection of merged intervals, as each interval of the shorter ones clips
+# a slice of the longer ones found by bisection, which skips the intervals
+# far from any of the shorter ones
+def _intersect_merged_intervals(
+    shorter_bounds: list[int], longer_bounds: list[int]
+) -> list[int]:
+    intersection_bounds: list[int] = []
+    for start, end in zip(shorter_bounds[::2], shorter_bounds[1::2]):
+        i = bisect_right(longer_bounds, start)
+        j = bisect_left(longer_bounds, end, i)
+        if i % 2:
+            intersection_bounds.append(start)
+        intersection_bounds.extend(longer_bounds[i:j])
+        if j % 2:
+            intersection_bounds.append(end)
+    return intersection_bounds
+
+
+# The intersection of the unions of intervals of all the entities, from the
+# entity of the fewest intervals, usually the lesson itself
+def _merge_appearance(timestamps_of_entities: list[list[int]]) -> int:
+    bounds_of_entities = []
+    for timestamps in timestamps_of_entities:
+        merged_bounds = _merge_intervals(timestamps)
+        if merged_bounds is None:
+            return _int_appearance(timestamps_of_entities)
+        bounds_of_entities.append(merged_bounds)
+    if not bounds_of_entities:
+        return 0
+
+    bounds_of_entities.sort(key=len)
+    intersection_bounds = bounds_of_entities[0]
+    for merged_bounds in bounds_of_entities[1:]:
+        if not intersection_bounds:
+            break
+        intersection_bounds = _intersect_merged_intervals(
+            intersection_bounds, merged_bounds
+        )
+    return sum(intersection_bounds[1::2]) - sum(intersection_bounds[::2])
+
+
+def _are_int_timestamps(
+    timestamps: Sequence[int | float | Decimal | bool | str | datetime],
+) -> bool:
+    if set(map(type, timestamps)) != {int} or len(timestamps) % 2:
+        return False
+    int_timestamps = cast(Sequence[int], timestamps)
+    return (
+        _MIN_INT_TIMESTAMP <= min(int_timestamps)
+        and max(int_timestamps) <= _MAX_INT_TIMESTAMP
+    )
+
+
+def _get_int_appearance(
+    backend: Literal["python", "numpy", "merge"],
+) -> Callable[[list[list[int]]], int]:
+    if backend == "python":
+        return _int_appearance
+    if backend == "merge":
+        return _merge_appearance
+    if backend == "numpy":
+        if np is None:
+            raise ImportError('NumPy is required for the "numpy" backend')
+        return _numpy_appearance
+    raise ValueError(f"Unknown backend {backend!r}")
+
+
+# `appearance` of every lesson. Lessons of plain int timestamps take a fast
+# path without `Decimal`, and their totals are ints, the rest are passed to
+# `appearance`, which also reports invalid lessons. The "numpy" backend of the
+# fast path, which needs NumPy installed, pays off for lessons of thousands of
+# intervals, and the "merge" one, linear for intervals sorted by time, for long
+# sessions from event logs
+def appearance_many(
+    lessons: Iterable[
+        Mapping[str, Iterable[int | float | Decimal | bool | str | datetime]]
+    ],
+    backend: Literal["python", "numpy", "merge"] = "python",
+) -> list[int | Decimal]:
+    int_appearance = _get_int_appearance(backend)
+    totals: list[int | Decimal] = []
+    for intervals in lessons:
+        timestamps_of_entities = [
+            timestamps if type(timestamps) is list else list(timestamps)
+            for timestamps in intervals.values()
+        ]
+        if all(map(_are_int_timestamps, timestamps_of_entities)):
+            totals.append(int_appearance(cast(list[list[int]], timestamps_of_entities)))
+        else:
+            totals.append(appearance(dict(zip(intervals, timestamps_of_entities))))
+    return totals
+
+
+# A chunk of lessons packed for a worker process as arrays of the timestamps,
+# the numbers of timestamps of the entities and the numbers of entities of the
+# lessons, as arrays pickle much faster than dicts of lists. If some timestamps
+# aren't plain ints, which arrays would take bools for, or don't fit the arrays,
+# the lessons are packed one by one, and such a lesson has -1 entities and is
+# left to `appearance`
+def _pack_lessons(
+    lessons: list[Collection[list[Any]]],
+) -> tuple[array[int], array[int], array[int]]:
+    if set(map(type, chain.from_iterable(chain.from_iterable(lessons)))) <= {int}:
+        try:
+            timestamps = array("q", chain.from_iterable(chain.from_iterable(lessons)))
+        except OverflowError:
+            pass
+        else:
+            return (
+                timestamps,
+                array("q", map(len, chain.from_iterable(lessons))),
+                array("q", map(len, lessons)),
+            )
+
+    timestamps = array("q")
+    timestamps_counts = array("q")
+    entities_counts = array("q")
+    for timestamps_of_entities in lessons:
+        if not set(map(type, chain.from_iterable(timestamps_of_entities))) <= {int}:
+            entities_counts.append(-1)
+            continue
+        timestamps_count = len(timestamps)
+        try:
+            for entity_timestamps in timestamps_of_entities:
+                timestamps.extend(entity_timestamps)
+        except OverflowError:
+            del timestamps[timestamps_count:]
+            entities_counts.append(-1)
+            continue
+        timestamps_counts.extend(map(len, timestamps_of_entities))
+        entities_counts.append(len(timestamps_of_entities))
+    return timestamps, timestamps_counts, entities_counts
+
+
+# Totals of a packed chunk, and the indices of the lessons left to `appearance`
+def _appearance_of_packed_lessons(
+    packed_lessons: tuple[array[int], array[int], array[int]],
+    backend: Literal["python", "numpy", "merge"],
+) -> tuple[array[int], set[int]]:
+    int_appearance = _get_int_appearance(backend)
+    timestamps, timestamps_counts, entities_counts = (
+        packed_array.tolist() for packed_array in packed_lessons
+    )
+    totals = array("q")
+    fallback_indices = set()
+    timestamps_start = 0
+    entities_start = 0
+    for i, entities_count in enumerate(entities_counts):
+        if entities_count < 0:
+            fallback_indices.add(i)
+            totals.append(0)
+            continue
+        timestamps_of_entities = []
+        for timestamps_count in timestamps_counts[
+            entities_start : entities_start + entities_count
+        ]:
+            timestamps_of_entities.append(
+                timestamps[timestamps_start : timestamps_start + timestamps_count]
+            )
+            timestamps_start += timestamps_count
+        entities_start += entities_count
+        if all(map(_are_int_timestamps, timestamps_of_entities)):
+            totals.append(int_appearance(timestamps_of_entities))
+        else:
+            fallback_indices.add(i)
+            totals.append(0)
+    return totals, fallback_indices
+
+
+# `appearance_many` across worker processes, which get the lessons in chunks
+# of `chunk_size`, with up to two chunks per worker in flight. The totals are
+# yielded in the order of the lessons as soon as their chunk is done, and an
+# invalid lesson raises when its total is due. Invalid arguments raise at once
+def appearance_parallel(
+    lessons: Iterable[
+        Mapping[str, Iterable[int | float | Decimal | bool | str | datetime]]
+    ],
+    *,
+    max_workers: int | None = None,
+    chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE,
+    backend: Literal["python", "numpy", "merge"] = "python",
+) -> Iterator[int | Decimal]:
+    if max_workers is None:
+        max_workers = os.process_cpu_count() or 1
+    if max_workers < 1 or chunk_size < 1:
+        raise ValueError("Workers and chunk size must be positive")
+    _get_int_appearance(backend)
+    return _iterate_appearance_parallel(lessons, max_workers, chunk_size, backend)
+
+
+def _iterate_appearance_parallel(
+    lessons: Iterable[
+        Mapping[str, Iterable[int | float | Decimal | bool | str | datetime]]
+    ],
+    max_workers: int,
+    chunk_size: int,
+    backend: Literal["python", "numpy", "merge"],
+) -> Iterator[int | Decimal]:
+    def iterate_totals(
+        chunk: list[Mapping[str, list[Any]]],
+        future: Future[tuple[array[int], set[int]]],
+    ) -> Iterator[int | Decimal]:
+        totals, fallback_indices = future.result()
+        for i, total in enumerate(totals):
+            yield appearance(chunk[i]) if i in fallback_indices else total
+
+    chunks: deque[
+        tuple[list[Mapping[str, list[Any]]], Future[tuple[array[int], set[int]]]]
+    ] = deque()
+    executor = ProcessPoolExecutor(max_workers)
+    try:
+        for lessons_chunk in batched(lessons, chunk_size):
+            # Timestamps are read twice, so iterators are made lists
+            chunk = cast(
+                list[Mapping[str, list[Any]]],
+                [
+                    (
+                        intervals
+                        if all(
+                            type(timestamps) is list
+                            for timestamps in intervals.values()
+                        )
+                        else {
+                            entity: list(timestamps)
+                            for entity, timestamps in intervals.items()
+                        }
+                    )
+                    for intervals in lessons_chunk
+                ],
+            )
+            packed_lessons = _pack_lessons([intervals.values() for intervals in chunk])
+            chunks.append(
+                (
+                    chunk,
+                    executor.submit(
+                        _appearance_of_packed_lessons, packed_lessons, backend
+                    ),
+                )
+            )
+            if len(chunks) > 2 * max_workers:
+                yield from iterate_totals(*chunks.popleft())
+        while chunks:
+            yield from iterate_totals(*chunks.popleft())
+    finally:
+        # Also when the totals aren't read to the end
+        executor.shutdown(cancel_futures=True)
+
+
+# Lessons of a JSON Lines file, an object of the intervals per line
+def read_lessons(path: str | os.PathLike[str]) -> Iterator[dict[str, list[int]]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# `appearance` of a lesson in progress, fed by the enters and exits of the
+# entities as they happen. Events may arrive out of order by up to
+# `reorder_window`, so they are held until a `reorder_window` later event
+# arrives and then swept in order, and an event older than the swept ones is
+# rejected. The total of the swept events is `total_overlap_time`, and
+# `get_overlap_time()` adds the held events and the current overlap, if any
+class AppearanceTracker:
+    def __init__(
+        self, entities: Iterable[str], reorder_window: int | float = 0
+    ) -> None:
+        if reorder_window < 0:
+            raise ValueError("Reorder window must be non-negative")
+        self.reorder_window = reorder_window
+        self.total_overlap_time: int | float = 0
+        self._appearance_counts = dict.fromkeys(entities, 0)
+        self._absent_count = len(self._appearance_counts)
+        self._start_time: int | float | None = None
+        self._swept_time: int | float | None = None
+        self._latest_time: int | float | None = None
+        # Heap of timestamps, arrival numbers, entities and count changes
+        self._held_events: list[tuple[int | float, int, str, int]] = []
+        self._events_count = 0
+
+    def enter(self, entity: str, timestamp: int | float) -> None:
+        self._add_event(entity, timestamp, 1)
+
+    def exit(self, entity: str, timestamp: int | float) -> None:
+        self._add_event(entity, timestamp, -1)
+
+    def _add_event(self, entity: str, timestamp: int | float, delta: int) -> None:
+        if entity not in self._appearance_counts:
+            raise ValueError(f"Unknown entity '{entity}'")
+        if self._swept_time is not None and timestamp < self._swept_time:
+            raise ValueError(
+                f"Event of entity '{entity}' at {timestamp} is out of the reorder "
+                f"window, events are swept up to {self._swept_time}"
+            )
+        heappush(self._held_events, (timestamp, self._events_count, entity, delta))
+        self._events_count += 1
+        if self._latest_time is None or timestamp > self._latest_time:
+            self._latest_time = timestamp
+        self._sweep(self._latest_time - self.reorder_window)
+
+    def _sweep(self, until: int | float | None = None) -> None:
+        while self._held_events and (until is None or self._held_events[0][0] <= until):
+            timestamp, _, entity, delta = heappop(self._held_events)
+            appearance_count = self._appearance_counts[entity]
+            self._appearance_counts[entity] = appearance_count + delta
+            if not appearance_count:
+                self._absent_count -= 1
+            elif appearance_count == -delta:
+                self._absent_count += 1
+            if not self._absent_count:
+                if self._start_time is None:
+                    self._start_time = timestamp
+            elif self._start_time is not None:
+                self.total_overlap_time += timestamp - self._start_time
+                self._start_time = None
+            self._swept_time = timestamp
+
+    # Sweeps the held events, e.g. when the lesson is over, after which no
+    # events older than them are accepted
+    def flush(self) -> int | float:
+        self._sweep()
+        return self.total_overlap_time
+
+    # Provisional, as events arriving late may still change it
+    def get_overlap_time(self, now: int | float | None = None) -> int | float:
+        tracker = copy(self)
+        tracker._appearance_counts = self._appearance_counts.copy()
+        tracker._held_events = self._held_events.copy()
+        tracker._sweep()
+        if tracker._start_time is not None and now is not None:
+            return tracker.total_overlap_time + max(now - tracker._start_time, 0)
+        return tracker.total_overlap_time
+
+
 if __name__ == "__main__":
     tests = [
         {
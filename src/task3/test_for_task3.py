@@ -1,9 +1,18 @@
+import json
+import random
 from datetime import datetime
 from decimal import Decimal
 
 import pytest
 
-from task3.solution import appearance
+from task3.solution import (
+    AppearanceTracker,
+    appearance,
+    appearance_many,
+    appearance_parallel,
+    np,
+    read_lessons,
+)
 
 
 def test_correct_answers():
@@ -220,3 +229,250 @@ def test_less_than_two():
     for test_ in tests:
         with pytest.raises(ValueError):
             appearance(test_)
+
+
+def test_before_epoch():
+    assert appearance({"lesson": [-100, -50], "pupil": [-90, -60]}) == 30
+    assert appearance({"lesson": [-100, 50], "pupil": [-1, 10]}) == 11
+
+
+def generate_lessons(lessons_count, max_intervals_count, seed=0):
+    rng = random.Random(seed)
+    lessons = []
+    for _ in range(lessons_count):
+        # Also before the epoch, i.e. of negative timestamps
+        start = rng.randrange(-10_000, 10_000)
+        intervals = {"lesson": [start, start + 3600]}
+        for entity in ("pupil", "tutor"):
+            # Unordered as well, as in the second of the correct answers
+            intervals[entity] = [
+                rng.randrange(start - 600, start + 4200)
+                for _ in range(2 * rng.randint(1, max_intervals_count))
+            ]
+            if rng.random() < 0.5:
+                intervals[entity].sort()
+        lessons.append(intervals)
+    return lessons
+
+
+BACKENDS = (
+    "python",
+    pytest.param("numpy", marks=pytest.mark.skipif(np is None, reason="no NumPy")),
+    "merge",
+)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("max_intervals_count", (1, 3, 20))
+def test_appearance_many(max_intervals_count, backend):
+    lessons = generate_lessons(500, max_intervals_count)
+    totals = appearance_many(lessons, backend)
+    assert totals == [appearance(intervals) for intervals in lessons]
+    assert all(type(total) is int for total in totals)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_appearance_many_same_timestamps(backend):
+    # Many enters and exits of the same time, and intervals of no length
+    rng = random.Random(0)
+    lessons = [
+        {
+            entity: [rng.randrange(20) for _ in range(2 * rng.randint(1, 8))]
+            for entity in ("lesson", "pupil", "tutor")[: rng.randint(1, 3)]
+        }
+        for _ in range(2000)
+    ]
+    assert appearance_many(lessons, backend) == [
+        appearance(intervals) for intervals in lessons
+    ]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("shuffled", (False, True))
+def test_appearance_many_overlapping_intervals(backend, shuffled):
+    # Reconnects overlapping the previous connections, sorted by their starts
+    # as in the second of the correct answers, or not
+    rng = random.Random(0)
+    lessons = []
+    for _ in range(1000):
+        intervals = {}
+        for entity in ("lesson", "pupil", "tutor"):
+            entity_intervals = sorted(
+                (start, start + rng.randrange(30))
+                for start in (rng.randrange(100) for _ in range(rng.randint(1, 10)))
+            )
+            if shuffled:
+                rng.shuffle(entity_intervals)
+            intervals[entity] = [
+                bound for bounds in entity_intervals for bound in bounds
+            ]
+        lessons.append(intervals)
+    assert appearance_many(lessons, backend) == [
+        appearance(intervals) for intervals in lessons
+    ]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_appearance_many_not_ints(backend):
+    lessons = [
+        {"lesson": [1, 10], "pupil": [2, 8.5], "tutor": (3, 9)},
+        {"lesson": [1, 10], "pupil": ["2", 8], "tutor": iter((0, 9))},
+        {"lesson": [1, 10], "pupil": [datetime.fromtimestamp(2), 8]},
+        {"lesson": [1, 10], "pupil": [2, 8], "tutor": (3, 9)},
+        {},
+    ]
+    totals = appearance_many(lessons, backend)
+    assert totals == [
+        Decimal("5.5"),
+        Decimal(6),
+        Decimal(6),
+        5,
+        0,
+    ]
+    assert [type(total) for total in totals] == [
+        Decimal,
+        Decimal,
+        Decimal,
+        int,
+        int,
+    ]
+
+
+@pytest.mark.parametrize(
+    "intervals",
+    (
+        {"lesson": [1, 10, 11], "pupil": [2, 8]},
+        {"lesson": [], "pupil": [2, 8]},
+        {"lesson": [1, 10], "pupil": [[], 8]},
+        {"lesson": [1, 10**20], "pupil": [2, 8]},
+    ),
+)
+def test_appearance_many_invalid(intervals):
+    with pytest.raises((ValueError, OverflowError)):
+        appearance_many([{"lesson": [1, 10], "pupil": [2, 8]}, intervals])
+
+
+def test_appearance_many_unknown_backend():
+    with pytest.raises(ValueError):
+        appearance_many([], "fortran")
+
+
+def test_appearance_many_no_numpy(monkeypatch):
+    monkeypatch.setattr("task3.solution.np", None)
+    with pytest.raises(ImportError):
+        appearance_many([], "numpy")
+    assert appearance_many([{"lesson": [1, 10], "pupil": [2, 8]}]) == [6]
+
+
+def get_events(intervals):
+    return sorted(
+        (timestamp, entity, i % 2)
+        for entity, timestamps in intervals.items()
+        for i, timestamp in enumerate(timestamps)
+    )
+
+
+def feed_events(tracker, events):
+    for timestamp, entity, is_exit in events:
+        if is_exit:
+            tracker.exit(entity, timestamp)
+        else:
+            tracker.enter(entity, timestamp)
+
+
+@pytest.mark.parametrize("reorder_window", (0, 100, 10**6))
+def test_appearance_tracker(reorder_window):
+    rng = random.Random(0)
+    for intervals in generate_lessons(300, 10):
+        # Events arrive up to the reorder window late
+        events = sorted(
+            get_events(intervals),
+            key=lambda event: event[0] + rng.uniform(0, reorder_window),
+        )
+        tracker = AppearanceTracker(intervals, reorder_window)
+        feed_events(tracker, events)
+        assert tracker.flush() == appearance(intervals)
+        assert tracker.total_overlap_time == tracker.get_overlap_time(10**6)
+
+
+def test_appearance_tracker_live():
+    tracker = AppearanceTracker(("lesson", "pupil", "tutor"), reorder_window=10)
+    feed_events(tracker, [(0, "lesson", 0), (5, "tutor", 0), (20, "pupil", 0)])
+    assert tracker.total_overlap_time == 0
+    assert tracker.get_overlap_time() == 0
+    assert tracker.get_overlap_time(now=30) == 10
+    # The exit is late, but within the reorder window
+    tracker.enter("tutor", 28)
+    tracker.exit("tutor", 25)
+    assert tracker.total_overlap_time == 0
+    assert tracker.get_overlap_time(now=30) == 7
+    feed_events(tracker, [(40, "pupil", 1), (60, "lesson", 1)])
+    assert tracker.total_overlap_time == 17
+    tracker.exit("tutor", 60)
+    assert tracker.flush() == 17 == tracker.get_overlap_time(now=100)
+
+    with pytest.raises(ValueError):
+        tracker.enter("tutor", 59)
+    with pytest.raises(ValueError):
+        tracker.enter("parent", 70)
+    with pytest.raises(ValueError):
+        AppearanceTracker(("lesson",), reorder_window=-1)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("chunk_size", (1, 7, 5000))
+def test_appearance_parallel(chunk_size, backend):
+    lessons = generate_lessons(300, 5)
+    lessons[10] = {"lesson": [1, 10], "pupil": [2, 8.5], "tutor": iter((3, 9))}
+    lessons[20] = {"lesson": [1, 10], "pupil": [True, 8]}
+    lessons[30] = {}
+    totals = list(
+        appearance_parallel(
+            lessons, max_workers=2, chunk_size=chunk_size, backend=backend
+        )
+    )
+    assert totals == [appearance(intervals) for intervals in lessons[:10]] + [
+        Decimal("5.5")
+    ] + [appearance(intervals) for intervals in lessons[11:]]
+    assert totals == appearance_many(
+        generate_lessons(300, 5)[:10]
+        + [{"lesson": [1, 10], "pupil": [2, 8.5], "tutor": (3, 9)}]
+        + lessons[11:]
+    )
+    assert type(totals[20]) is Decimal
+
+
+@pytest.mark.parametrize(
+    "intervals",
+    (
+        {"lesson": [1, 10, 11], "pupil": [2, 8]},
+        {"lesson": [1, 10**20], "pupil": [2, 8]},
+        {"lesson": [1, 2**70], "pupil": [2, 8]},
+        {"lesson": [1, 10], "pupil": ["spam", 8]},
+    ),
+)
+def test_appearance_parallel_invalid(intervals):
+    lessons = [{"lesson": [1, 10], "pupil": [2, 8]}] * 10 + [intervals]
+    totals = appearance_parallel(lessons, max_workers=1, chunk_size=4)
+    assert [next(totals) for _ in range(10)] == [6] * 10
+    with pytest.raises((ValueError, OverflowError)):
+        next(totals)
+
+
+def test_appearance_parallel_invalid_arguments():
+    for kwargs in ({"max_workers": 0}, {"chunk_size": 0}, {"backend": "fortran"}):
+        with pytest.raises(ValueError):
+            appearance_parallel([], **kwargs)
+
+
+def test_read_lessons(tmp_path):
+    lessons = generate_lessons(50, 5)
+    path = tmp_path / "lessons.jsonl"
+    path.write_text(
+        "".join(f"{json.dumps(intervals)}\n" for intervals in lessons),
+        encoding="utf-8",
+    )
+    assert list(read_lessons(path)) == lessons
+    assert list(appearance_parallel(read_lessons(path), max_workers=2)) == (
+        appearance_many(lessons)
+    )